@@ -1,14 +1,30 @@
-from fastapi import FastAPI, HTTPException, Body
+from fastapi import FastAPI, HTTPException, Body, Request, Response
 from FlagEmbedding import BGEM3FlagModel
 import torch
 import numpy as np
 from typing import List, Dict, Optional
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+import os
+
+from batcher import BatcherOverloaded, MicroBatcher
+from wire import WIRE_MEDIA_TYPE, encode_wire, negotiate_wire_dtype
 
 # Model configuration
 MODEL_PATH = "BAAI/bge-m3"  # BGE-M3 model path
 device = "cuda" if torch.cuda.is_available() else "cpu"
 
+# Batch configuration
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))  # forward-pass batch size
+MAX_BATCH_ITEMS = int(os.getenv("EMBED_MAX_BATCH_ITEMS", "512"))  # max texts per /embed/batch call
+
+# Micro-batching window for concurrent single-text /embed requests
+MICROBATCH_MAX_SIZE = int(os.getenv("EMBED_MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("EMBED_MICROBATCH_MAX_WAIT_MS", "5"))
+MICROBATCH_METRICS_WINDOW = int(os.getenv("EMBED_MICROBATCH_METRICS_WINDOW", "2048"))
+# Texts allowed to wait for a micro-batch; more are answered 503 (the clients retry with backoff)
+MICROBATCH_MAX_QUEUE = int(os.getenv("EMBED_MICROBATCH_MAX_QUEUE", "1024"))
+
 # Initialize BGE-M3 model
 embedding_model = BGEM3FlagModel(
     MODEL_PATH,
@@ -16,8 +32,6 @@ embedding_model = BGEM3FlagModel(
     device=device
 )
 
-app = FastAPI(title="BGE-M3 Embedding Service", version="1.0.0")
-
 class EmbedRequest(BaseModel):
     content: str
     model: Optional[str] = "bge-m3"
@@ -25,85 +39,181 @@ class EmbedRequest(BaseModel):
     return_sparse: Optional[bool] = True
     return_colbert_vecs: Optional[bool] = True
 
-def document_to_embeddings_bge_m3(content: str, return_dense: bool = True, 
-                                 return_sparse: bool = True, 
-                                 return_colbert_vecs: bool = True) -> Dict:
+class EmbedBatchRequest(BaseModel):
+    contents: List[str]
+    model: Optional[str] = "bge-m3"
+    batch_size: Optional[int] = DEFAULT_BATCH_SIZE
+    return_dense: Optional[bool] = True
+    return_sparse: Optional[bool] = True
+    return_colbert_vecs: Optional[bool] = True
+
+def format_sparse_embeddings(lexical_weights) -> Dict[int, float]:
     """
-    Use BGE-M3 model that natively supports dense, sparse, and ColBERT embeddings
+    Convert BGE-M3 lexical weights to Milvus-compatible format
+    (integer keys, positive float weights only)
+    """
+    sparse_dict = {}
+
+    # Handle different possible formats of lexical_weights
+    if isinstance(lexical_weights, (list, tuple, np.ndarray)):
+        for i, weight in enumerate(lexical_weights):
+            try:
+                # Convert weight to float to handle string/numeric issues
+                weight_float = float(weight)
+                # Only include positive weights (Milvus requirement)
+                if weight_float > 0:
+                    sparse_dict[i] = weight_float  # Use integer key directly
+            except (ValueError, TypeError) as e:
+                print(f"Warning: Skipping invalid weight at index {i}: {weight} - {e}")
+                continue
+    elif isinstance(lexical_weights, dict):
+        for key, weight in lexical_weights.items():
+            try:
+                # Convert both key and weight to proper types
+                key_int = int(key) if isinstance(key, str) else key
+                weight_float = float(weight)
+                if weight_float > 0:
+                    sparse_dict[key_int] = weight_float
+            except (ValueError, TypeError) as e:
+                print(f"Warning: Skipping invalid sparse entry {key}:{weight} - {e}")
+                continue
+    else:
+        print(f"Warning: Unexpected lexical_weights format: {type(lexical_weights)}")
+
+    return sparse_dict
+
+def encode_contents(contents: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                    return_dense: bool = True,
+                    return_sparse: bool = True,
+                    return_colbert_vecs: bool = True) -> List[Dict]:
+    """
+    Run one batched BGE-M3 forward pass (dense, sparse and ColBERT natively supported).
+    Returns one raw result dict per input text, aligned with `contents`.
     """
     try:
         # BGE-M3 encode method returns dict with different embedding types
         embeddings = embedding_model.encode(
-            content,
+            contents,
+            batch_size=batch_size,
             return_dense=return_dense,
             return_sparse=return_sparse,
             return_colbert_vecs=return_colbert_vecs
         )
-        
-        result = {}
-        
-        if return_dense and 'dense_vecs' in embeddings:
-            dense_vecs = embeddings['dense_vecs']
-            if isinstance(dense_vecs, np.ndarray):
-                result["dense_embeddings"] = dense_vecs.tolist()
-            else:
-                result["dense_embeddings"] = dense_vecs
-            
-        if return_sparse and 'lexical_weights' in embeddings:
-            # Convert sparse embeddings to Milvus-compatible format
-            # Use INTEGER keys for compatibility with Milvus
-            sparse_dict = {}
-            lexical_weights = embeddings['lexical_weights']
-            
-            # Handle different possible formats of lexical_weights
-            if isinstance(lexical_weights, (list, tuple, np.ndarray)):
-                for i, weight in enumerate(lexical_weights):
-                    try:
-                        # Convert weight to float to handle string/numeric issues
-                        weight_float = float(weight)
-                        # Only include positive weights (Milvus requirement)
-                        if weight_float > 0:
-                            sparse_dict[i] = weight_float  # Use integer key directly
-                    except (ValueError, TypeError) as e:
-                        print(f"Warning: Skipping invalid weight at index {i}: {weight} - {e}")
-                        continue
-            elif isinstance(lexical_weights, dict):
-                for key, weight in lexical_weights.items():
-                    try:
-                        # Convert both key and weight to proper types
-                        key_int = int(key) if isinstance(key, str) else key
-                        weight_float = float(weight)
-                        if weight_float > 0:
-                            sparse_dict[key_int] = weight_float
-                    except (ValueError, TypeError) as e:
-                        print(f"Warning: Skipping invalid sparse entry {key}:{weight} - {e}")
-                        continue
-            else:
-                print(f"Warning: Unexpected lexical_weights format: {type(lexical_weights)}")
-                
-            result["sparse_embeddings"] = sparse_dict
-            
-        if return_colbert_vecs and 'colbert_vecs' in embeddings:
-            colbert_vecs = embeddings['colbert_vecs']
-            if isinstance(colbert_vecs, np.ndarray):
-                result["colbert_embeddings"] = colbert_vecs.tolist()
-            else:
-                result["colbert_embeddings"] = colbert_vecs
-            
-        return result
-        
+
+        results = [{} for _ in contents]
+
+        if return_dense and embeddings.get('dense_vecs') is not None:
+            for result, dense_vec in zip(results, embeddings['dense_vecs']):
+                result["dense_vecs"] = dense_vec
+
+        if return_sparse and embeddings.get('lexical_weights') is not None:
+            for result, weights in zip(results, embeddings['lexical_weights']):
+                result["lexical_weights"] = weights
+
+        if return_colbert_vecs and embeddings.get('colbert_vecs') is not None:
+            for result, colbert_vecs in zip(results, embeddings['colbert_vecs']):
+                result["colbert_vecs"] = colbert_vecs
+
+        return results
+
     except Exception as e:
-        print(f"Error in document_to_embeddings_bge_m3: {e}")
+        print(f"Error in encode_contents: {e}")
         print(f"Error type: {type(e)}")
         import traceback
         traceback.print_exc()
         raise Exception(f"Failed to generate embeddings: {str(e)}")
 
+def serialize_embeddings(embeddings: Dict) -> Dict:
+    """Convert one raw encode result into the JSON response format."""
+    result = {}
+
+    if "dense_vecs" in embeddings:
+        dense_vecs = embeddings["dense_vecs"]
+        result["dense_embeddings"] = dense_vecs.tolist() if isinstance(dense_vecs, np.ndarray) else dense_vecs
+
+    if "lexical_weights" in embeddings:
+        # Convert sparse embeddings to Milvus-compatible format
+        result["sparse_embeddings"] = format_sparse_embeddings(embeddings["lexical_weights"])
+
+    if "colbert_vecs" in embeddings:
+        colbert_vecs = embeddings["colbert_vecs"]
+        result["colbert_embeddings"] = colbert_vecs.tolist() if isinstance(colbert_vecs, np.ndarray) else colbert_vecs
+
+    return result
+
+def collate_embeddings(items: List[Dict]) -> Dict:
+    """Serialize a batch of raw results into lists aligned with the request order."""
+    serialized = [serialize_embeddings(item) for item in items]
+    result = {}
+    for key in ("dense_embeddings", "sparse_embeddings", "colbert_embeddings"):
+        if serialized and key in serialized[0]:
+            result[key] = [item[key] for item in serialized]
+    return result
+
+def render_embeddings(items: List[Dict], accept: Optional[str], single: bool = False):
+    """
+    Build the response for raw encode results: JSON by default, or the compact
+    binary format (see wire.py) when the client sends `Accept: application/x-bge-m3`.
+    """
+    dtype = negotiate_wire_dtype(accept)
+    if dtype is None:
+        return serialize_embeddings(items[0]) if single else collate_embeddings(items)
+
+    first = items[0] if items else {}
+    content = encode_wire(
+        dense=[item["dense_vecs"] for item in items] if "dense_vecs" in first else None,
+        sparse=[format_sparse_embeddings(item["lexical_weights"]) for item in items] if "lexical_weights" in first else None,
+        colbert=[item["colbert_vecs"] for item in items] if "colbert_vecs" in first else None,
+        dtype=dtype,
+    )
+    return Response(content=content, media_type=WIRE_MEDIA_TYPE, headers={"Vary": "Accept"})
+
+def document_to_embeddings_bge_m3(content: str, return_dense: bool = True,
+                                 return_sparse: bool = True,
+                                 return_colbert_vecs: bool = True) -> Dict:
+    """
+    Use BGE-M3 model that natively supports dense, sparse, and ColBERT embeddings
+    (synchronous helper, bypasses the micro-batcher)
+    """
+    return serialize_embeddings(
+        encode_contents([content], 1, return_dense, return_sparse, return_colbert_vecs)[0]
+    )
+
+def documents_to_embeddings_bge_m3(contents: List[str], batch_size: int = DEFAULT_BATCH_SIZE,
+                                   return_dense: bool = True,
+                                   return_sparse: bool = True,
+                                   return_colbert_vecs: bool = True) -> Dict:
+    """
+    Embed a list of texts in one batched BGE-M3 forward pass.
+    Every returned list is aligned with `contents` (index i belongs to contents[i]).
+    """
+    return collate_embeddings(
+        encode_contents(contents, batch_size, return_dense, return_sparse, return_colbert_vecs)
+    )
+
+# Concurrent /embed requests are collected into micro-batches and run on a worker thread
+batcher = MicroBatcher(
+    encode_fn=encode_contents,
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait_ms=MICROBATCH_MAX_WAIT_MS,
+    metrics_window=MICROBATCH_METRICS_WINDOW,
+    max_queue=MICROBATCH_MAX_QUEUE,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await batcher.start()
+    yield
+    await batcher.stop()
+
+app = FastAPI(title="BGE-M3 Embedding Service", version="1.0.0", lifespan=lifespan)
+
 @app.post("/embed")
-async def embed_text(request: EmbedRequest):
+async def embed_text(request: EmbedRequest, http_request: Request):
     """
     Generate embeddings using BGE-M3 model
     Supports dense, sparse, and ColBERT embeddings
+    Send `Accept: application/x-bge-m3[; dtype=float16]` for the binary response format
     """
     try:
         if not request.content.strip():
@@ -113,22 +223,62 @@ async def embed_text(request: EmbedRequest):
         if request.model and request.model != "bge-m3":
             raise HTTPException(status_code=400, detail="Only 'bge-m3' model is supported")
             
-        # Generate embeddings
-        embeddings = document_to_embeddings_bge_m3(
-            content=request.content,
+        # Generate embeddings (joins the next micro-batch)
+        embeddings = await batcher.submit(
+            request.content,
             return_dense=request.return_dense,
             return_sparse=request.return_sparse,
             return_colbert_vecs=request.return_colbert_vecs
         )
         
-        return embeddings
+        return render_embeddings([embeddings], http_request.headers.get("accept"), single=True)
         
     except HTTPException:
         raise
+    except BatcherOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         print(f"Error in embed_text: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/embed/batch")
+async def embed_batch(request: EmbedBatchRequest, http_request: Request):
+    """
+    Generate embeddings for many texts in a single batched forward pass.
+    Results are returned as lists aligned with `contents`.
+    Send `Accept: application/x-bge-m3[; dtype=float16]` for the binary response format
+    """
+    try:
+        if not request.contents:
+            raise HTTPException(status_code=400, detail="Contents cannot be empty")
+
+        if len(request.contents) > MAX_BATCH_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_ITEMS} contents are allowed per batch")
+
+        if any(not content.strip() for content in request.contents):
+            raise HTTPException(status_code=400, detail="Contents cannot contain empty strings")
+
+        if request.model and request.model != "bge-m3":
+            raise HTTPException(status_code=400, detail="Only 'bge-m3' model is supported")
+
+        batch_size = request.batch_size if request.batch_size and request.batch_size > 0 else DEFAULT_BATCH_SIZE
+
+        items = await batcher.run_batch(
+            request.contents,
+            batch_size,
+            return_dense=request.return_dense,
+            return_sparse=request.return_sparse,
+            return_colbert_vecs=request.return_colbert_vecs
+        )
+
+        return render_embeddings(items, http_request.headers.get("accept"))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error in embed_batch: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 # Backward compatibility endpoint
 @app.post("/embed/simple")
 async def embed_text_simple(content: str = Body(..., embed=True)):
@@ -139,12 +289,19 @@ async def embed_text_simple(content: str = Body(..., embed=True)):
         if not content.strip():
             raise HTTPException(status_code=400, detail="Content cannot be empty")
             
-        embeddings = document_to_embeddings_bge_m3(content, return_dense=True)
-        return {"embeddings": embeddings.get("dense_embeddings", [])}
+        embeddings = await batcher.submit(content, return_dense=True, return_sparse=False, return_colbert_vecs=False)
+        return {"embeddings": serialize_embeddings(embeddings).get("dense_embeddings", [])}
         
+    except BatcherOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics/batcher")
+async def batcher_metrics():
+    """Micro-batching statistics (p50/p99 latency, queue wait, batch fill) for tuning the window"""
+    return batcher.stats()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -157,7 +314,9 @@ async def root():
         "message": "BGE-M3 Embedding Service",
         "endpoints": {
             "/embed": "Main embedding endpoint with full BGE-M3 features",
+            "/embed/batch": "Batched embedding endpoint (list of texts, aligned results)",
             "/embed/simple": "Simple endpoint for backward compatibility",
+            "/metrics/batcher": "Micro-batching latency and batch-fill statistics",
             "/health": "Health check",
             "/docs": "API documentation"
         }
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# encode_fn(contents, batch_size, return_dense, return_sparse, return_colbert_vecs) -> per-item results
+EncodeFn = Callable[..., List[Dict[str, Any]]]
+Flags = Tuple[bool, bool, bool]
+
+
+class BatcherOverloaded(Exception):
+    """Raised by submit when `max_queue` texts are already waiting (the caller should answer 503)."""
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching scheduler for the embedding model.
+
+    Concurrent single-text requests are queued and collected for at most
+    `max_wait_ms` (or until `max_batch_size` texts are waiting), then embedded
+    in one batched forward pass on a dedicated worker thread. The event loop
+    never runs the model itself, and every forward pass (micro-batches and
+    explicit /embed/batch calls) goes through the same single worker so GPU
+    work is serialised instead of contending. At most `max_queue` texts wait
+    for a batch; past that submit fails fast instead of buffering without limit.
+    """
+
+    def __init__(self, encode_fn: EncodeFn, max_batch_size: int = 32, max_wait_ms: float = 5.0,
+                 metrics_window: int = 2048, max_queue: int = 1024):
+        self.encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max(1, max_queue)
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bge-m3-worker")
+
+        # Rolling windows for latency / batch-fill statistics
+        self._latencies = deque(maxlen=metrics_window)
+        self._queue_waits = deque(maxlen=metrics_window)
+        self._batch_sizes = deque(maxlen=metrics_window)
+        self._total_requests = 0
+        self._total_batches = 0
+        self._total_errors = 0
+        self._total_rejected = 0
+
+    async def start(self):
+        if self._collector is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._collector = asyncio.create_task(self._collect_loop())
+
+    async def stop(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            try:
+                await self._collector
+            except asyncio.CancelledError:
+                pass
+            self._collector = None
+        self._executor.shutdown(wait=False)
+
+    async def submit(self, content: str, return_dense: bool = True, return_sparse: bool = True,
+                     return_colbert_vecs: bool = True) -> Dict[str, Any]:
+        """Queue a single text and wait for its slice of the next batched forward pass."""
+        if self._queue is None:
+            raise RuntimeError("MicroBatcher is not started")
+
+        future = asyncio.get_running_loop().create_future()
+        flags = (bool(return_dense), bool(return_sparse), bool(return_colbert_vecs))
+        try:
+            self._queue.put_nowait((content, flags, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._total_rejected += 1
+            raise BatcherOverloaded(f"{self.max_queue} texts already waiting for the model")
+        return await future
+
+    async def run_batch(self, contents: List[str], batch_size: int, return_dense: bool = True,
+                        return_sparse: bool = True, return_colbert_vecs: bool = True) -> List[Dict[str, Any]]:
+        """Run an explicit client-side batch on the worker thread (bypasses the collection window)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor,
+            lambda: self.encode_fn(contents, batch_size, return_dense, return_sparse, return_colbert_vecs)
+        )
+
+    async def _collect_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            # Keep collecting until the batch is full or the window closes
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._dispatch(batch)
+            except Exception as e:
+                # Never let one failed batch kill the collector
+                print(f"Error in micro-batch dispatch: {e}")
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        dispatched_at = time.perf_counter()
+
+        # Requests asking for different outputs are encoded separately
+        groups: Dict[Flags, list] = {}
+        for item in batch:
+            groups.setdefault(item[1], []).append(item)
+
+        for flags, items in groups.items():
+            # Drop requests whose client already went away
+            items = [item for item in items if not item[2].done()]
+            if not items:
+                continue
+
+            contents = [item[0] for item in items]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor,
+                    lambda: self.encode_fn(contents, len(contents), *flags)
+                )
+            except Exception as e:
+                self._total_errors += len(items)
+                for _, _, future, _ in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            finished_at = time.perf_counter()
+            self._total_batches += 1
+            self._batch_sizes.append(len(items))
+            for (_, _, future, enqueued_at), result in zip(items, results):
+                self._total_requests += 1
+                self._queue_waits.append(dispatched_at - enqueued_at)
+                self._latencies.append(finished_at - enqueued_at)
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency percentiles and batch-fill statistics over the rolling window."""
+        def percentiles(values):
+            if not values:
+                return {"p50_ms": None, "p99_ms": None}
+            arr = np.fromiter(values, dtype=np.float64) * 1000.0
+            return {
+                "p50_ms": round(float(np.percentile(arr, 50)), 3),
+                "p99_ms": round(float(np.percentile(arr, 99)), 3),
+            }
+
+        batch_sizes = list(self._batch_sizes)
+        mean_batch = float(np.mean(batch_sizes)) if batch_sizes else 0.0
+
+        return {
+            "config": {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_queue": self.max_queue,
+            },
+            "latency": percentiles(self._latencies),
+            "queue_wait": percentiles(self._queue_waits),
+            "batch": {
+                "mean_size": round(mean_batch, 3),
+                "mean_fill_ratio": round(mean_batch / self.max_batch_size, 3),
+                "max_size": max(batch_sizes) if batch_sizes else 0,
+            },
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "totals": {
+                "requests": self._total_requests,
+                "batches": self._total_batches,
+                "errors": self._total_errors,
+                "rejected": self._total_rejected,
+            },
+        }
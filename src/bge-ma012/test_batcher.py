@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-batcher test with a fake encoder: concurrent requests share a forward
+pass up to max_batch_size, a lone request is flushed after max_wait_ms, an
+encoder error reaches every request of its batch only, and a full queue is
+rejected instead of buffered. Runs without the model.
+"""
+
+import asyncio
+import threading
+import time
+
+from batcher import BatcherOverloaded, MicroBatcher
+
+batches = []
+release = threading.Event()
+release.set()
+
+
+def fake_encode(contents, batch_size, return_dense, return_sparse, return_colbert_vecs):
+    release.wait(5)
+    batches.append((list(contents), return_sparse))
+    if "bad" in contents:
+        raise RuntimeError("encoder failed")
+    return [{"text": content, "sparse": return_sparse} for content in contents]
+
+
+async def with_batcher(test, **options):
+    batcher = MicroBatcher(fake_encode, **options)
+    await batcher.start()
+    try:
+        return await test(batcher)
+    finally:
+        await batcher.stop()
+
+
+# Test 1: concurrent requests are batched, results stay with their request
+print("=== Test 1: batching ===")
+
+
+async def concurrent(batcher):
+    return await asyncio.gather(*(batcher.submit(f"text {i}") for i in range(10)))
+
+
+results = asyncio.run(with_batcher(concurrent, max_batch_size=4, max_wait_ms=50))
+assert [result["text"] for result in results] == [f"text {i}" for i in range(10)]
+assert [len(contents) for contents, _ in batches] == [4, 4, 2], f"Batches {batches}"
+print(f"✓ 10 requests in batches of {[len(contents) for contents, _ in batches]}\n")
+
+# Test 2: a lone request is flushed when the window closes; other flags get their own pass
+print("=== Test 2: flush timeout ===")
+batches.clear()
+
+
+async def lone(batcher):
+    started = time.perf_counter()
+    result = await batcher.submit("alone")
+    elapsed = time.perf_counter() - started
+    mixed = await asyncio.gather(batcher.submit("dense only", return_sparse=False), batcher.submit("hybrid"))
+    return result, elapsed, mixed
+
+
+result, elapsed, mixed = asyncio.run(with_batcher(lone, max_batch_size=32, max_wait_ms=30))
+assert result["text"] == "alone" and 0.03 <= elapsed < 1.0, f"Flushed after {elapsed:.3f}s"
+assert [m["sparse"] for m in mixed] == [False, True] and len(batches) == 3, "Different flags are encoded separately"
+print(f"✓ Flushed after {elapsed * 1000:.0f} ms, mixed flags split\n")
+
+# Test 3: an encoder error fails its own batch only
+print("=== Test 3: error fan-out ===")
+
+
+async def failing(batcher):
+    outcomes = await asyncio.gather(batcher.submit("good"), batcher.submit("bad"), return_exceptions=True)
+    after = await batcher.submit("next batch")
+    return outcomes, after, batcher.stats()["totals"]
+
+
+outcomes, after, totals = asyncio.run(with_batcher(failing, max_batch_size=2, max_wait_ms=50))
+assert all(isinstance(outcome, RuntimeError) for outcome in outcomes), f"Both requests of the batch should fail: {outcomes}"
+assert after["text"] == "next batch" and totals["errors"] == 2, "The collector should keep running"
+print("✓ Every request of the failed batch got the error, the next batch succeeded\n")
+
+# Test 4: a full queue is rejected
+print("=== Test 4: backpressure ===")
+
+
+async def overloaded(batcher):
+    release.clear()
+    first = asyncio.ensure_future(batcher.submit("in flight"))
+    await asyncio.sleep(0.05)  # collected and blocked in the encoder
+    queued = [asyncio.ensure_future(batcher.submit(f"queued {i}")) for i in range(2)]
+    await asyncio.sleep(0)
+    try:
+        await batcher.submit("one too many")
+        raise AssertionError("A full queue should reject")
+    except BatcherOverloaded:
+        pass
+    release.set()
+    done = await asyncio.gather(first, *queued)
+    return done, batcher.stats()
+
+
+done, stats = asyncio.run(with_batcher(overloaded, max_batch_size=1, max_wait_ms=0, max_queue=2))
+assert [result["text"] for result in done] == ["in flight", "queued 0", "queued 1"]
+assert stats["totals"]["rejected"] == 1 and stats["config"]["max_queue"] == 2
+print("✓ Requests past max_queue rejected, the queued ones still served\n")
+
+print("=" * 60)
+print("✅ ALL BATCHER TESTS PASSED")
+print("=" * 60)
@@ -0,0 +1,103 @@
+import json
+import struct
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Compact binary response format, negotiated with `Accept: application/x-bge-m3`.
+# An optional `dtype=float16` media-type parameter halves the size of dense and
+# ColBERT vectors (sparse weights always stay float32).
+#
+# Layout (little-endian):
+#   magic   4 bytes   b"BGM3"
+#   version u8        WIRE_VERSION
+#   pad     3 bytes
+#   hlen    u32       length of the JSON header
+#   header  hlen      {"count": n, "arrays": {name: {"dtype", "shape", "offset"}}}
+#   pad     to an 8-byte boundary
+#   payload           raw array buffers, each starting at its 8-byte aligned `offset`
+#
+# Arrays (n = number of input texts):
+#   dense            (n, dim)
+#   sparse_indices   (nnz,) int32,  sparse_values (nnz,) float32,  sparse_offsets (n + 1,) int64
+#   colbert          (tokens, dim), colbert_offsets (n + 1,) int64
+# Item i owns rows/entries [offsets[i], offsets[i + 1]).
+
+WIRE_MEDIA_TYPE = "application/x-bge-m3"
+WIRE_MAGIC = b"BGM3"
+WIRE_VERSION = 1
+WIRE_DTYPES = {"float32": np.float32, "float16": np.float16}
+
+
+def negotiate_wire_dtype(accept: Optional[str]) -> Optional[str]:
+    """
+    Return the requested float dtype if the client accepts the binary format,
+    or None when the response should stay JSON.
+    """
+    if not accept:
+        return None
+    for media_range in accept.split(","):
+        parts = [part.strip() for part in media_range.split(";")]
+        if parts[0].lower() != WIRE_MEDIA_TYPE:
+            continue
+        dtype = "float32"
+        for param in parts[1:]:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "dtype" and value.strip().lower() in WIRE_DTYPES:
+                dtype = value.strip().lower()
+        return dtype
+    return None
+
+
+def _align(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def encode_wire(dense: Optional[List[np.ndarray]] = None,
+                sparse: Optional[List[Dict[int, float]]] = None,
+                colbert: Optional[List[np.ndarray]] = None,
+                dtype: str = "float32") -> bytes:
+    """Pack per-item dense / sparse / ColBERT results into one binary buffer."""
+    float_dtype = WIRE_DTYPES[dtype]
+    arrays = {}
+    count = 0
+
+    if dense is not None:
+        count = len(dense)
+        arrays["dense"] = np.asarray(np.stack(dense) if count else np.empty((0, 0)), dtype=float_dtype)
+
+    if sparse is not None:
+        count = len(sparse)
+        lengths = np.fromiter((len(weights) for weights in sparse), dtype=np.int64, count=count)
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        arrays["sparse_indices"] = np.fromiter(
+            (key for weights in sparse for key in weights.keys()), dtype=np.int32, count=int(offsets[-1]))
+        arrays["sparse_values"] = np.fromiter(
+            (value for weights in sparse for value in weights.values()), dtype=np.float32, count=int(offsets[-1]))
+        arrays["sparse_offsets"] = offsets
+
+    if colbert is not None:
+        count = len(colbert)
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum([len(vecs) for vecs in colbert], out=offsets[1:])
+        arrays["colbert"] = np.asarray(
+            np.concatenate(colbert, axis=0) if count else np.empty((0, 0)), dtype=float_dtype)
+        arrays["colbert_offsets"] = offsets
+
+    header = {"count": count, "arrays": {}}
+    offset = 0
+    for name, array in arrays.items():
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix = WIRE_MAGIC + struct.pack("<B3xI", WIRE_VERSION, len(header_bytes)) + header_bytes
+    prefix += b"\0" * (_align(len(prefix)) - len(prefix))
+
+    body = bytearray(offset)
+    for name, array in arrays.items():
+        start = header["arrays"][name]["offset"]
+        body[start:start + array.nbytes] = np.ascontiguousarray(array).tobytes()
+
+    return prefix + bytes(body)
@@ -11,6 +11,15 @@ os.environ["OPENAI_API_KEY"] = "test"
 # from llama_index.llms.ollama import Ollama
 # from llama_index.embeddings.langchain import LangchainEmbedding
 from .util.embedding import CustomAPIEmbeddings
+from .util.embedding_cache import EmbeddingCache
+from .util.colbert import ColbertStore
+from .util.jobs import JobStore
+from .util.milvus import CollectionRegistry
+from .util.admission import AdmissionController
+from .util.answer_cache import AnswerCache
+from .util.parse_cache import ParseCache
+from .util.sftp import SFTPPool, SFTPTransfer, FileCache, paramiko_connector
+from .util.kvstore import SQLiteKV
 # from llama_index.agent.openai import OpenAIAgent
 # from llama_index.core.agent.workflow import FunctionAgent
 
@@ -20,6 +29,18 @@ import threading
 
 from .config import config_by_name
 from .constant.llm import TEMPERATURE, MODEL, N_HYDE_INSTANCE, HYDE_LLM_URL, LLM_URL, MAX_TOKENS
+from .constant.llm import ANSWER_CACHE_ENABLED, ANSWER_CACHE_PATH, ANSWER_CACHE_MAX_MB, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY
+from .constant.llm import MINDMAP_CACHE_PATH, MINDMAP_CACHE_MAX_MB
+from .constant.embedding import EMBEDDING_API_URL, EMBEDDING_MODEL_NAME, EMBEDDING_TIMEOUT, EMBEDDING_BATCH_SIZE, EMBEDDING_WIRE_FORMAT, EMBEDDING_WIRE_DTYPE
+from .constant.embedding import EMBEDDING_MAX_CONNECTIONS, EMBEDDING_MAX_KEEPALIVE, EMBEDDING_KEEPALIVE_EXPIRY, EMBEDDING_MAX_RETRIES, EMBEDDING_RETRY_BACKOFF
+from .constant.embedding import EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_MAX_MB, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_DISK_MAX_MB
+from .constant.job import JOB_DB_PATH, JOB_MAX_ATTEMPTS, JOB_WORKERS
+from .constant.parse import PARSE_CACHE_ENABLED, PARSE_CACHE_PATH, PARSE_CACHE_MAX_MB
+from .constant.sftp import QNAP_SFTP_IP, QNAP_SFTP_PORT, QNAP_SFTP_USERNAME, QNAP_SFTP_PASSWORD, SFTP_CONNECT_TIMEOUT
+from .constant.sftp import SFTP_POOL_SIZE, SFTP_IDLE_CHECK_SECONDS, SFTP_PREFETCH_REQUESTS, SFTP_MAX_RETRIES, SFTP_CACHE_DIR, SFTP_CACHE_MAX_MB
+from .constant.milvus import MILVUS_REGISTRY_TTL, MILVUS_PRELOAD_COLLECTIONS
+from .constant.rerank import RERANKER, COLBERT_STORE_PATH, COLBERT_STORE_MAX_MB, COLBERT_STORE_DTYPE
+from .constant.admission import RETRIEVAL_CONCURRENCY, GENERATION_CONCURRENCY, TTS_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT
 from .metrics.config import ENABLE_METRICS
 
 # Conditional imports for metrics
@@ -29,9 +50,91 @@ if ENABLE_METRICS:
 
 # embedding_model = SentenceTransformer(EMBEDDING_MODEL, trust_remote_code=True, device='cuda' if torch.cuda.is_available() else 'cpu')
 
-EMBEDDING_API_URL = os.getenv('EMBEDDING_URL')
+langchain_embedding_model = CustomAPIEmbeddings(
+    api_url=EMBEDDING_API_URL,
+    model_name=EMBEDDING_MODEL_NAME,
+    timeout=EMBEDDING_TIMEOUT,
+    batch_size=EMBEDDING_BATCH_SIZE,
+    wire_format=EMBEDDING_WIRE_FORMAT,
+    wire_dtype=EMBEDDING_WIRE_DTYPE,
+    max_connections=EMBEDDING_MAX_CONNECTIONS,
+    max_keepalive_connections=EMBEDDING_MAX_KEEPALIVE,
+    keepalive_expiry=EMBEDDING_KEEPALIVE_EXPIRY,
+    max_retries=EMBEDDING_MAX_RETRIES,
+    retry_backoff=EMBEDDING_RETRY_BACKOFF,
+)
+
+# Disk-backed caches and stores (None when disabled). They are opened by create_app
+# (open_stores), not at import time, so importing the package creates no cache/, colbert/
+# or jobs/ directories. Modules that import them are only loaded after create_app.
+embedding_cache = None
+colbert_store = None
+answer_cache = None
+parse_cache = None
+sftp_transfer = None
+mind_map_cache = None
+job_store = None
+
+
+def open_stores():
+    global embedding_cache, colbert_store, answer_cache, parse_cache, sftp_transfer, mind_map_cache, job_store
+    if job_store is not None:
+        # Already open (job_store is the one store that is never disabled)
+        return
+
+    # Content-hash keyed cache in front of the embedding service
+    embedding_cache = EmbeddingCache(
+        model_name=EMBEDDING_MODEL_NAME,
+        max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+        disk_path=EMBEDDING_CACHE_PATH,
+        disk_max_bytes=EMBEDDING_CACHE_DISK_MAX_MB * 1024 * 1024,
+    ) if EMBEDDING_CACHE_ENABLED else None
+
+    # Compressed ColBERT token vectors per chunk for the local MaxSim reranker (only with RERANKER=colbert)
+    colbert_store = ColbertStore(
+        path=COLBERT_STORE_PATH,
+        max_bytes=COLBERT_STORE_MAX_MB * 1024 * 1024,
+        dtype=COLBERT_STORE_DTYPE,
+    ) if RERANKER == "colbert" else None
+
+    # Semantic cache of chat answers, invalidated by the ingestion workers
+    answer_cache = AnswerCache(
+        path=ANSWER_CACHE_PATH,
+        max_bytes=ANSWER_CACHE_MAX_MB * 1024 * 1024,
+        ttl_seconds=ANSWER_CACHE_TTL,
+        threshold=ANSWER_CACHE_SIMILARITY,
+    ) if ANSWER_CACHE_ENABLED else None
+
+    # Parsed documents by content hash, so re-indexing and mind maps skip the readers
+    parse_cache = ParseCache(
+        path=PARSE_CACHE_PATH,
+        max_bytes=PARSE_CACHE_MAX_MB * 1024 * 1024,
+    ) if PARSE_CACHE_ENABLED else None
+
+    # NAS transfers: pooled SFTP sessions (opened on first use) + local copies of unchanged files
+    sftp_transfer = SFTPTransfer(
+        pool=SFTPPool(
+            paramiko_connector(QNAP_SFTP_IP, QNAP_SFTP_PORT, QNAP_SFTP_USERNAME, QNAP_SFTP_PASSWORD, SFTP_CONNECT_TIMEOUT),
+            max_size=SFTP_POOL_SIZE,
+            idle_check_seconds=SFTP_IDLE_CHECK_SECONDS,
+        ),
+        cache=FileCache(SFTP_CACHE_DIR, SFTP_CACHE_MAX_MB * 1024 * 1024) if SFTP_CACHE_MAX_MB > 0 else None,
+        prefetch_requests=SFTP_PREFETCH_REQUESTS,
+        max_retries=SFTP_MAX_RETRIES,
+    )
+
+    # Mind map outlines of document chunks by content hash
+    mind_map_cache = SQLiteKV(
+        path=MINDMAP_CACHE_PATH,
+        max_bytes=MINDMAP_CACHE_MAX_MB * 1024 * 1024,
+        table="mind_map_outlines",
+    ) if MINDMAP_CACHE_MAX_MB > 0 else None
 
-langchain_embedding_model = CustomAPIEmbeddings(api_url=EMBEDDING_API_URL)
+    # Background jobs (insert/delete/mind map), processed by app/main/worker.py
+    job_store = JobStore(JOB_DB_PATH, max_attempts=JOB_MAX_ATTEMPTS)
+
+# Milvus collection handles resolved once per process instead of per request
+collection_registry = CollectionRegistry(ttl_seconds=MILVUS_REGISTRY_TTL)
 
 # llama_index_embedding_model = LangchainEmbedding(langchain_embedding_model)
 
@@ -71,7 +174,11 @@ hyde_llm = OpenAILike(
 #     # api_key="None",
 # )
 
-semaphore = threading.Semaphore(2)
+# Admission control of the async chat/TTS front (app/main/asgi.py): bounded, per-user
+# fair queues with separate limits for retrieval, the generation LLM and TTS
+retrieval_admission = AdmissionController("retrieval", RETRIEVAL_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
+generation_admission = AdmissionController("generation", GENERATION_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
+tts_admission = AdmissionController("tts", TTS_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT)
 
 # generation_llm = ChatOpenAI(
 #     openai_api_base = LLM_URL,
@@ -163,6 +270,10 @@ def create_app(config_name:str):
         password=config_by_name[config_name].MILVUS_PASSWORD,
         db_name=config_by_name[config_name].MILVUS_DB_NAME
     )
+    collection_registry.preload(MILVUS_PRELOAD_COLLECTIONS)
+
+    # before the routes are imported: the services bind the stores at import time
+    open_stores()
 
     # register blueprints
     # routes need to be imported inside to avoid conflict
@@ -182,6 +293,10 @@ def create_app(config_name:str):
         def metrics():
             return generate_latest(registry), 200, {'Content-Type': 'text/plain; charset=utf-8'}
 
+    # Background job workers (no-op inside the worker processes themselves)
+    from .worker import start_workers
+    start_workers(config_name, JOB_WORKERS)
+
     print(f"The app is running in {config_name} environment")
 
     return app
@@ -0,0 +1,284 @@
+"""
+Async front of the API, served by uvicorn (see runner.py).
+
+Chat is handled natively on the event loop: retrieval and generation each
+wait for a slot of their own AdmissionController, so retrieval for queued
+requests overlaps with generation for running ones, and tokens are streamed
+from the LLM without holding a thread. Answers found in the semantic answer
+cache are replayed without taking a generation slot. TTS requests pass the TTS admission
+controller and are then handled by the Flask routes. Everything else goes
+straight to Flask through WsgiToAsgi. Overload is answered with a 429 and a
+Retry-After header instead of blocking a worker thread.
+"""
+
+import asyncio
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from . import retrieval_admission, generation_admission, tts_admission, generation_llm, langchain_embedding_model
+from .metrics.collectors import RequestTimer, LLMStreamTimer, format_config, start_stage_timings
+from .response import HTTPRequestException
+from .service.llm_service import build_chat_messages, find_cached_answer, store_cached_answer
+from .util.admission import AdmissionRejected
+from .util.answer_cache import merge_events, split_events
+from .constant.stream import SSE_COALESCE_MS, SSE_COALESCE_BYTES
+from .util.stream import ThinkTagParser, SSECoalescer, sse_event
+
+# Same origins as CORS(app) on the Flask side
+CORS_HEADERS = [(b"access-control-allow-origin", b"*")]
+
+TTS_PATHS = {"/tts/generate", "/tts/v1/audio/speech", "/tts/podcast", "/tts/podcast/conversational"}
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionResetError("Client disconnected before sending the request body")
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_json(send, status: int, payload: dict, headers=None):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                   + CORS_HEADERS + (headers or []),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_rejected(send, e: AdmissionRejected):
+    await send_json(
+        send, 429,
+        {"message": f"Server is busy, please retry in a moment ({e.reason})"},
+        headers=[(b"retry-after", str(e.retry_after).encode())]
+    )
+
+
+async def unless_disconnected(coroutine, disconnected: asyncio.Event) -> bool:
+    """Await `coroutine` unless the client disconnects first (it is then cancelled); True when it completed."""
+    task = asyncio.ensure_future(coroutine)
+    gone = asyncio.ensure_future(disconnected.wait())
+    try:
+        await asyncio.wait({task, gone}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        gone.cancel()
+    if not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return False
+    task.result()  # re-raises AdmissionRejected
+    return True
+
+
+def client_key(scope, body: dict):
+    """Fairness key: the user id from the body, else the client address."""
+    user_id = body.get("userId") or body.get("user_id")
+    if user_id:
+        return user_id
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+async def chat_with_llm(scope, receive, send):
+    try:
+        body = json.loads(await read_body(receive) or b"{}")
+    except ConnectionResetError:
+        return
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):
+        await send_json(send, 400, {"message": "Request body must be a JSON object"})
+        return
+
+    question = body.get('question')
+    conversation_history = body.get('conversation_history')
+    hyde = body.get('hyde') == 'true'
+    reranking = body.get('reranking') == 'true'
+    ultrathink = body.get('ultrathink') == 'true'
+    user_id = body.get('userId')
+    document_ids = body.get('document_ids', None)  # Bisa None atau list of strings
+    send_timings = body.get('timings') == 'true'
+    print(f"hyde: {hyde}, reranking: {reranking}, ultrathink: {ultrathink}")
+
+    config = format_config(hyde, reranking)
+    metrics_timer = RequestTimer("chat_with_llm", config)
+    # asyncio.to_thread copies the context, so retrieval stages land in these timings
+    stage_timings = start_stage_timings()
+    user = client_key(scope, body)
+
+    # The client may go away while queued or mid-answer: give up its place in the
+    # generation queue, or stop generating (and free the slot), when it does
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        disconnected.set()
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        # Retrieval runs in a thread (Milvus/embedding clients are sync), under its own limit
+        async with retrieval_admission.slot(user):
+            messages, retrieved_docs = await asyncio.to_thread(
+                build_chat_messages, question, user_id, conversation_history, document_ids, hyde, reranking, ultrathink
+            )
+            cache_key, cached_events = await asyncio.to_thread(
+                find_cached_answer, question, user_id, conversation_history, document_ids, hyde, reranking, ultrathink,
+                retrieved_docs
+            )
+        # A cached answer is replayed without touching the generation LLM
+        generating = cached_events is None
+        if generating and not await unless_disconnected(generation_admission.acquire(user), disconnected):
+            print("Client disconnected while queued for generation")
+            watcher.cancel()
+            metrics_timer.record_error()
+            return
+    except AdmissionRejected as e:
+        watcher.cancel()
+        metrics_timer.record_error()
+        await send_rejected(send, e)
+        return
+    except HTTPRequestException as e:
+        watcher.cancel()
+        metrics_timer.record_error()
+        await send_json(send, e.status_code, e.to_dict())
+        return
+
+    started = False
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")] + CORS_HEADERS,
+        })
+        started = True
+
+        async def emit_frame(frame: str):
+            await send({"type": "http.response.body", "body": frame.encode(), "more_body": True})
+
+        async def emit(payload):
+            await emit_frame(sse_event(payload))
+
+        # 1. Kirim dokumen sebagai event pertama
+        for doc in retrieved_docs:
+            await emit({"retrieved_doc": doc})
+
+        if not generating:
+            # 2. Jawaban dari cache, di-replay sebagai stream
+            for event in split_events(cached_events, SSE_COALESCE_BYTES):
+                await emit(event)
+        else:
+            # 2. Token dari LLM, <think> tags di-parse kalo ultrathink
+            parser = ThinkTagParser(ultrathink)
+            coalescer = SSECoalescer(SSE_COALESCE_MS, SSE_COALESCE_BYTES)
+            answer_events = []
+            llm_timer = LLMStreamTimer(config, stage_timings)
+            stream = await generation_llm.astream_chat(messages)
+            async for chunk in stream:
+                if disconnected.is_set():
+                    print("Client disconnected, stopping generation")
+                    break
+                llm_timer.token(chunk.delta)
+                events = parser.feed(chunk.delta)
+                answer_events.extend(events)
+                for frame in coalescer.add(events):
+                    await emit_frame(frame)
+
+            if not disconnected.is_set():
+                events = parser.flush()
+                answer_events.extend(events)
+                for frame in coalescer.add(events) + coalescer.flush():
+                    await emit_frame(frame)
+                llm_timer.finish()
+                # Only complete answers go into the cache
+                await asyncio.to_thread(store_cached_answer, cache_key, merge_events(answer_events))
+
+        if not disconnected.is_set():
+            if send_timings:
+                await emit({"timings": stage_timings.as_dict()})
+            await emit("[DONE]")
+    except Exception as e:
+        print(f"Error during streaming: {e}")
+        import traceback
+        traceback.print_exc()
+        metrics_timer.record_error()
+    else:
+        metrics_timer.record_success()
+    finally:
+        watcher.cancel()
+        if generating:
+            generation_admission.release()
+        if started:
+            try:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            except Exception:
+                pass
+
+
+async def admitted_tts(app, scope, receive, send):
+    """Queue a TTS request for a slot, then hand it (body replayed) to the Flask route."""
+    try:
+        body = await read_body(receive)
+    except ConnectionResetError:
+        return
+    try:
+        parsed = json.loads(body or b"{}")
+    except ValueError:
+        parsed = {}
+
+    replayed = False
+
+    async def replay_receive():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    try:
+        async with tts_admission.slot(client_key(scope, parsed if isinstance(parsed, dict) else {})):
+            await app(scope, replay_receive, send)
+    except AdmissionRejected as e:
+        await send_rejected(send, e)
+
+
+async def lifespan(receive, send):
+    """Close the event loop's pooled HTTP clients when the server shuts down."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await langchain_embedding_model.aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+class AsgiFront:
+    def __init__(self, flask_app):
+        self.flask = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "POST":
+            path = scope["path"].rstrip("/")
+            if path == "/llm/chat_with_llm":
+                return await chat_with_llm(scope, receive, send)
+            if path in TTS_PATHS:
+                return await admitted_tts(self.flask, scope, receive, send)
+        return await self.flask(scope, receive, send)
+
+
+def create_asgi_app(flask_app) -> AsgiFront:
+    return AsgiFront(flask_app)
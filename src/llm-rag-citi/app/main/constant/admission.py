@@ -0,0 +1,12 @@
+import os
+
+# Concurrency limits of the async chat/TTS front (app/main/asgi.py), sized per stage:
+# retrieval (embedding + Milvus) is cheap and runs ahead for queued requests while
+# the generation LLM only takes GENERATION_CONCURRENCY streams at a time.
+RETRIEVAL_CONCURRENCY = int(os.getenv('RETRIEVAL_CONCURRENCY', '8'))
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', '2'))
+TTS_CONCURRENCY = int(os.getenv('TTS_CONCURRENCY', '2'))
+
+# Requests waiting per stage before new ones get a 429, and how long one may wait
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', '32'))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '30'))
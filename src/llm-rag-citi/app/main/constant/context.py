@@ -0,0 +1,14 @@
+import os
+
+# Context packing for the chat prompt: near-duplicate chunks (shingle Jaccard at least
+# CONTEXT_DEDUP_THRESHOLD) are dropped, page-adjacent chunks of the same document are
+# merged, then chunks are packed in score order up to CONTEXT_TOKEN_BUDGET tokens (0 = no budget)
+CONTEXT_PACKING_ENABLED = os.getenv('CONTEXT_PACKING_ENABLED', 'true').lower() == 'true'
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '6000'))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv('CONTEXT_DEDUP_THRESHOLD', '0.8'))
+CONTEXT_SHINGLE_SIZE = int(os.getenv('CONTEXT_SHINGLE_SIZE', '5'))
+CONTEXT_MERGE_ADJACENT = os.getenv('CONTEXT_MERGE_ADJACENT', 'true').lower() == 'true'
+# Hugging Face id or local path of the generation model's tokenizer (needs transformers);
+# unset or not loadable: estimated as CONTEXT_CHARS_PER_TOKEN characters per token
+CONTEXT_TOKENIZER = os.getenv('CONTEXT_TOKENIZER')
+CONTEXT_CHARS_PER_TOKEN = float(os.getenv('CONTEXT_CHARS_PER_TOKEN', '4'))
@@ -80,4 +80,19 @@ EMBEDDING_MODEL = "Alibaba-NLP/gte-large-en-v1.5"
 CHUNK_SIZE = 512
 CHUNK_OVERLAP = 10 
 NUMBER_RETRIEVAL = 5
+# Size of the merged private + public result list (defaults to what both collections returned before)
+NUMBER_RETRIEVAL_MERGED = int(os.getenv('NUMBER_RETRIEVAL_MERGED', str(NUMBER_RETRIEVAL * 2)))
+RETRIEVAL_WORKERS = int(os.getenv('RETRIEVAL_WORKERS', '8'))
+# Reciprocal rank fusion constant used when result lists with different score scales are merged
+RRF_K = 60
+
+# Fields copied when a document moves between the private and public collections
+DOCUMENT_FIELDS = ['id', 'vector', 'sparse_vector', 'content', 'user_id', 'document_id', 'document_name', 'page_number']
+# Rows read per query-iterator page / written per upsert during a move
+MOVE_BATCH_SIZE = int(os.getenv('MILVUS_MOVE_BATCH_SIZE', '1000'))
+
+# Streaming ingestion pipeline (see util/ingest.py)
+INGEST_EMBED_WORKERS = int(os.getenv('INGEST_EMBED_WORKERS', '2'))
+INGEST_INSERT_BATCH_SIZE = int(os.getenv('INGEST_INSERT_BATCH_SIZE', '256'))
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', '4'))
 
@@ -0,0 +1,29 @@
+import os
+
+# Embedding service configuration
+EMBEDDING_API_URL = os.getenv('EMBEDDING_URL')
+EMBEDDING_MODEL_NAME = "bge-m3"
+EMBEDDING_TIMEOUT = int(os.getenv('EMBEDDING_TIMEOUT', '30'))
+
+# Number of texts sent per /embed/batch call
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '32'))
+
+# Response format: "json" or "binary" (application/x-bge-m3, decoded straight into NumPy)
+EMBEDDING_WIRE_FORMAT = os.getenv('EMBEDDING_WIRE_FORMAT', 'json')
+# Float precision of binary dense vectors on the wire: "float32" or "float16"
+EMBEDDING_WIRE_DTYPE = os.getenv('EMBEDDING_WIRE_DTYPE', 'float32')
+
+# Connection pool shared by every embedding call (sync and async)
+EMBEDDING_MAX_CONNECTIONS = int(os.getenv('EMBEDDING_MAX_CONNECTIONS', '20'))
+EMBEDDING_MAX_KEEPALIVE = int(os.getenv('EMBEDDING_MAX_KEEPALIVE', '10'))
+EMBEDDING_KEEPALIVE_EXPIRY = float(os.getenv('EMBEDDING_KEEPALIVE_EXPIRY', '30'))
+
+# Retries on connection errors, 429, 502, 503 and 504, with exponential backoff starting at EMBEDDING_RETRY_BACKOFF seconds
+EMBEDDING_MAX_RETRIES = int(os.getenv('EMBEDDING_MAX_RETRIES', '3'))
+EMBEDDING_RETRY_BACKOFF = float(os.getenv('EMBEDDING_RETRY_BACKOFF', '0.5'))
+
+# Content-addressed embedding cache (memory LRU + optional SQLite tier when EMBEDDING_CACHE_PATH is set)
+EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+EMBEDDING_CACHE_MAX_MB = int(os.getenv('EMBEDDING_CACHE_MAX_MB', '256'))
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH')
+EMBEDDING_CACHE_DISK_MAX_MB = int(os.getenv('EMBEDDING_CACHE_DISK_MAX_MB', '2048'))
@@ -0,0 +1,57 @@
+import os
+
+# Dense `vector` index profiles shared by the schema scripts and retrieval.
+# Keep this module free of app imports: scripts load it directly from the file.
+#
+# FLAT      exact search, cost grows linearly with the corpus
+# HNSW      graph index, best latency/recall trade-off, highest memory use
+# IVF_FLAT  clustered, exact distances inside the probed clusters
+# IVF_SQ8   IVF with 8-bit scalar quantisation (~4x less memory)
+# IVF_PQ    IVF with product quantisation (smallest, lowest recall)
+INDEX_PROFILES = {
+    "FLAT": {
+        "index": {"index_type": "FLAT", "metric_type": "IP"},
+        "search": {"metric_type": "IP"},
+    },
+    "HNSW": {
+        "index": {"index_type": "HNSW", "metric_type": "IP", "params": {"M": 16, "efConstruction": 200}},
+        "search": {"metric_type": "IP", "params": {"ef": 64}},
+    },
+    "IVF_FLAT": {
+        "index": {"index_type": "IVF_FLAT", "metric_type": "IP", "params": {"nlist": 1024}},
+        "search": {"metric_type": "IP", "params": {"nprobe": 16}},
+    },
+    "IVF_SQ8": {
+        "index": {"index_type": "IVF_SQ8", "metric_type": "IP", "params": {"nlist": 1024}},
+        "search": {"metric_type": "IP", "params": {"nprobe": 32}},
+    },
+    "IVF_PQ": {
+        # m must divide the 1024-dim BGE-M3 vector
+        "index": {"index_type": "IVF_PQ", "metric_type": "IP", "params": {"nlist": 1024, "m": 64, "nbits": 8}},
+        "search": {"metric_type": "IP", "params": {"nprobe": 32}},
+    },
+}
+
+# Profile the collections were built with; retrieval uses its search params
+MILVUS_INDEX_PROFILE = os.getenv('MILVUS_INDEX_PROFILE', 'FLAT').upper()
+# Optional search-time overrides (HNSW ef / IVF nprobe) for tuning without a rebuild
+MILVUS_SEARCH_EF = os.getenv('MILVUS_SEARCH_EF')
+MILVUS_SEARCH_NPROBE = os.getenv('MILVUS_SEARCH_NPROBE')
+
+
+def get_index_params(profile: str) -> dict:
+    if profile.upper() not in INDEX_PROFILES:
+        raise ValueError(f"Unknown index profile '{profile}', choose one of {', '.join(INDEX_PROFILES)}")
+    return dict(INDEX_PROFILES[profile.upper()]["index"])
+
+
+def get_search_params(profile: str = MILVUS_INDEX_PROFILE) -> dict:
+    if profile.upper() not in INDEX_PROFILES:
+        raise ValueError(f"Unknown index profile '{profile}', choose one of {', '.join(INDEX_PROFILES)}")
+    search = INDEX_PROFILES[profile.upper()]["search"]
+    params = dict(search.get("params", {}))
+    if MILVUS_SEARCH_EF and "ef" in params:
+        params["ef"] = int(MILVUS_SEARCH_EF)
+    if MILVUS_SEARCH_NPROBE and "nprobe" in params:
+        params["nprobe"] = int(MILVUS_SEARCH_NPROBE)
+    return {"metric_type": search["metric_type"], "params": params} if params else {"metric_type": search["metric_type"]}
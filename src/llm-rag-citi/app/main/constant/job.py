@@ -0,0 +1,10 @@
+import os
+
+# Background job queue (see util/jobs.py and worker.py)
+JOB_DB_PATH = os.getenv('JOB_DB_PATH', 'jobs/jobs.db')
+# Worker processes started by create_app; set to 0 when running `python worker.py` separately
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# A running job whose lease is not renewed within this time is picked up again by another worker
+JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '1.0'))
@@ -2,6 +2,31 @@ import os
 
 LLM_URL = os.getenv('LLM_URL')
 HYDE_LLM_URL = os.getenv('HYDE_LLM_URL')
+# Speculative HyDE: retrieval on the raw question starts right away and the HyDE
+# results are only fused in when the hypothetical document is ready within the deadline
+HYDE_DEADLINE_SECONDS = float(os.getenv('HYDE_DEADLINE_SECONDS', '2.5'))
+HYDE_WORKERS = int(os.getenv('HYDE_WORKERS', '8'))
+# HyDE completions have a pool of their own, so slow generations can't hold up the raw-question retrieval
+HYDE_GENERATION_WORKERS = int(os.getenv('HYDE_GENERATION_WORKERS', '4'))
+# Hypothetical documents cached per normalized question
+HYDE_CACHE_SIZE = int(os.getenv('HYDE_CACHE_SIZE', '1024'))
+HYDE_CACHE_TTL = int(os.getenv('HYDE_CACHE_TTL', '86400'))
+# Semantic answer cache: first-turn questions with the same scope, the same retrieved
+# chunks and a question embedding at least ANSWER_CACHE_SIMILARITY (cosine) close
+# replay the stored answer instead of calling the generation LLM
+ANSWER_CACHE_ENABLED = os.getenv('ANSWER_CACHE_ENABLED', 'true').lower() == 'true'
+ANSWER_CACHE_PATH = os.getenv('ANSWER_CACHE_PATH', 'cache/answers.db')
+ANSWER_CACHE_MAX_MB = int(os.getenv('ANSWER_CACHE_MAX_MB', '256'))
+ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', '86400'))
+ANSWER_CACHE_SIMILARITY = float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.95'))
+# Map-reduce mind maps: documents longer than MINDMAP_CHUNK_CHARS are summarised chunk by chunk
+# (at most MINDMAP_LLM_CONCURRENCY calls in flight) and the outlines merged MINDMAP_REDUCE_FAN_IN at a time
+MINDMAP_CHUNK_CHARS = int(os.getenv('MINDMAP_CHUNK_CHARS', '12000'))
+MINDMAP_LLM_CONCURRENCY = int(os.getenv('MINDMAP_LLM_CONCURRENCY', '4'))
+MINDMAP_REDUCE_FAN_IN = int(os.getenv('MINDMAP_REDUCE_FAN_IN', '6'))
+# Chunk outlines cached by content hash, so a regenerated mind map only redoes the merges (0 MB = no cache)
+MINDMAP_CACHE_PATH = os.getenv('MINDMAP_CACHE_PATH', 'cache/mind_map.db')
+MINDMAP_CACHE_MAX_MB = int(os.getenv('MINDMAP_CACHE_MAX_MB', '64'))
 HYDE_PROMPT_TEMPLATE = """
 You are a helpful AI assistant. Please give context to the user's question based on your knowledge.
 The response should be an explanation of the user's question and then followed by the hypothetical answers to the question.
@@ -96,6 +121,32 @@ CONTENT:{content}
 give the response straight to the final output without any explanation.
 """
 
+MINDMAP_CHUNK_PROMPT_TEMPLATE = """
+You are an expert mind map assistant. The CONTENT below is one part of a longer document.
+Summarise this part as a Markdown outline that will later be merged with the outlines of the other parts:
+   - Use ## for the main topics of this part and ### / - for their supporting points
+   - Keep the document's own terms, names and numbers
+   - Keep bullet points concise (max 10 words), at most 40 lines
+   - Do not add a # title, an introduction or any commentary
+
+CONTENT:{content}
+
+give the response straight to the outline without any explanation.
+"""
+
+MINDMAP_REDUCE_PROMPT_TEMPLATE = """
+You are an expert mind map assistant. The OUTLINES below (separated by ---) summarise consecutive parts of one document.
+Merge them into a single Markdown outline:
+   - Combine topics that appear in several outlines and drop repeated points
+   - Keep the order in which the topics appear in the document
+   - Use ## for main topics and ### / - for supporting points, at most 60 lines
+   - Do not add a # title, an introduction or any commentary
+
+OUTLINES:{outlines}
+
+give the response straight to the merged outline without any explanation.
+"""
+
 REGENERATE_MIND_MAP_PROMPT = """
 
 You are an expert researcher and data synthesizer. Your main task is to break down complex topics into a well-structured, hierarchical mindmap.
@@ -0,0 +1,6 @@
+import os
+
+# Cached collection handles are re-resolved after this many seconds (see util/milvus.py)
+MILVUS_REGISTRY_TTL = float(os.getenv('MILVUS_REGISTRY_TTL', '300'))
+# Collections loaded into memory when the app starts
+MILVUS_PRELOAD_COLLECTIONS = [name.strip() for name in os.getenv('MILVUS_PRELOAD_COLLECTIONS', 'private,public').split(',') if name.strip()]
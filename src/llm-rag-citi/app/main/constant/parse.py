@@ -0,0 +1,15 @@
+import os
+
+# Parsed documents cached by file content hash + file type + parser + parser version
+# (see util/parse_cache.py), size-bounded with LRU eviction
+PARSE_CACHE_ENABLED = os.getenv('PARSE_CACHE_ENABLED', 'true').lower() == 'true'
+PARSE_CACHE_PATH = os.getenv('PARSE_CACHE_PATH', 'cache/parsed.db')
+PARSE_CACHE_MAX_MB = int(os.getenv('PARSE_CACHE_MAX_MB', '1024'))
+
+# MinerU: PDFs are split into ranges of MINERU_PAGES_PER_RANGE pages analysed by a pool of
+# MINERU_WORKERS processes (each loads its own copy of the models; 0 = in-process, range by range).
+# Layout/span drawings, middle/model JSON and PDF copies go to MINERU_OUTPUT_DIR only with MINERU_DEBUG_DUMPS
+MINERU_WORKERS = int(os.getenv('MINERU_WORKERS', '2'))
+MINERU_PAGES_PER_RANGE = int(os.getenv('MINERU_PAGES_PER_RANGE', '16'))
+MINERU_DEBUG_DUMPS = os.getenv('MINERU_DEBUG_DUMPS', 'false').lower() == 'true'
+MINERU_OUTPUT_DIR = os.getenv('MINERU_OUTPUT_DIR', 'output')
@@ -0,0 +1,16 @@
+import os
+
+# Reranker for hybrid (dense + sparse) search:
+#   "vllm"    Milvus rerank Function calling a vLLM reranker at VLLM_RERANKER_URL
+#   "colbert" local BGE-M3 ColBERT MaxSim over the stored token vectors (CPU, no extra model)
+# Either one falls back to WeightedRanker, then to dense-only search, on errors.
+RERANKER = os.getenv('RERANKER', 'vllm').lower()
+VLLM_RERANKER_URL = os.getenv('VLLM_RERANKER_URL', 'http://localhost:8080')
+
+# Hybrid candidates re-scored per collection by the ColBERT reranker
+COLBERT_CANDIDATES = int(os.getenv('COLBERT_CANDIDATES', '30'))
+
+# ColBERT token vectors written at ingest time ("int8" or "float16")
+COLBERT_STORE_PATH = os.getenv('COLBERT_STORE_PATH', 'colbert/colbert.db')
+COLBERT_STORE_MAX_MB = int(os.getenv('COLBERT_STORE_MAX_MB', '20480'))
+COLBERT_STORE_DTYPE = os.getenv('COLBERT_STORE_DTYPE', 'int8').lower()
@@ -0,0 +1,25 @@
+import os
+from pymilvus import CollectionSchema, FieldSchema, DataType
+
+# Collection schema shared by the schema/migration scripts.
+# Keep this module free of app imports: scripts load it directly from the file.
+
+DENSE_DIM = 1024
+
+# The private collection is partitioned by user_id (Milvus partition key): a search
+# filtered on `user_id == '...'` only touches the partitions holding that user's rows.
+PRIVATE_NUM_PARTITIONS = int(os.getenv('MILVUS_PRIVATE_NUM_PARTITIONS', '64'))
+
+
+def build_document_schema(partition_key: bool = False) -> CollectionSchema:
+    """Schema with hybrid (dense + sparse) search support; `partition_key` routes rows by user_id."""
+    return CollectionSchema([
+        FieldSchema(name="id", dtype=DataType.VARCHAR, max_length=40, is_primary=True),
+        FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=4096),
+        FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=DENSE_DIM),
+        FieldSchema(name="user_id", dtype=DataType.VARCHAR, max_length=40, is_partition_key=partition_key),
+        FieldSchema(name="document_id", dtype=DataType.VARCHAR, max_length=100),
+        FieldSchema(name="sparse_vector", dtype=DataType.SPARSE_FLOAT_VECTOR),
+        FieldSchema(name="document_name", dtype=DataType.VARCHAR, max_length=500),
+        FieldSchema(name="page_number", dtype=DataType.INT64),
+    ])
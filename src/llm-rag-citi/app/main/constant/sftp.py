@@ -0,0 +1,22 @@
+import os
+
+QNAP_SFTP_IP = os.getenv('QNAP_SFTP_IP')
+QNAP_SFTP_PORT = int(os.getenv('QNAP_SFTP_PORT') or '22')
+QNAP_SFTP_USERNAME = os.getenv('QNAP_SFTP_USERNAME')
+QNAP_SFTP_PASSWORD = os.getenv('QNAP_SFTP_PASSWORD')
+QNAP_SFTP_PRIVATE_DIR = os.getenv('QNAP_SFTP_PRIVATE_DIR')
+QNAP_SFTP_PUBLIC_DIR = os.getenv('QNAP_SFTP_PUBLIC_DIR')
+
+# Shared SFTP sessions per process: at most SFTP_POOL_SIZE open, an idle one is probed
+# before reuse once it has been idle for SFTP_IDLE_CHECK_SECONDS
+SFTP_POOL_SIZE = int(os.getenv('SFTP_POOL_SIZE', '4'))
+SFTP_IDLE_CHECK_SECONDS = float(os.getenv('SFTP_IDLE_CHECK_SECONDS', '30'))
+SFTP_CONNECT_TIMEOUT = float(os.getenv('SFTP_CONNECT_TIMEOUT', '10'))
+# Pipelined read requests in flight per download, and reconnect + resume attempts
+SFTP_PREFETCH_REQUESTS = int(os.getenv('SFTP_PREFETCH_REQUESTS', '64'))
+SFTP_MAX_RETRIES = int(os.getenv('SFTP_MAX_RETRIES', '3'))
+# Local copies keyed by remote path + mtime + size (0 MB = no cache)
+SFTP_CACHE_DIR = os.getenv('SFTP_CACHE_DIR', 'cache/sftp')
+SFTP_CACHE_MAX_MB = int(os.getenv('SFTP_CACHE_MAX_MB', '2048'))
+# PyMuPDF PDFs are parsed straight from the downloaded bytes, without a copy in DOCUMENT_DIR
+SFTP_STREAM_PARSE = os.getenv('SFTP_STREAM_PARSE', 'true').lower() == 'true'
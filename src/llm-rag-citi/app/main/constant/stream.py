@@ -0,0 +1,7 @@
+import os
+
+# SSE frame coalescing for chat streaming: answer/thinking tokens are packed into
+# one frame until SSE_COALESCE_BYTES of text is buffered or the oldest token is
+# SSE_COALESCE_MS old, whichever comes first. 0/0 sends one frame per token.
+SSE_COALESCE_MS = float(os.getenv('SSE_COALESCE_MS', '30'))
+SSE_COALESCE_BYTES = int(os.getenv('SSE_COALESCE_BYTES', '256'))
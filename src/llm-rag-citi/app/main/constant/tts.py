@@ -46,4 +46,9 @@ PODCAST_SPEAKERS = {
 
 # Audio processing settings
 SILENCE_DURATION = 0.5  # seconds of silence between speakers
-AUDIO_FADE_DURATION = 0.1  # seconds for fade in/out effects
\ No newline at end of file
+AUDIO_FADE_DURATION = 0.1  # seconds for fade in/out effects
+
+# Podcast segments synthesised concurrently: at most TTS_SEGMENT_CONCURRENCY requests
+# in flight per podcast, over one pooled HTTP client per event loop
+TTS_SEGMENT_CONCURRENCY = int(os.getenv('TTS_SEGMENT_CONCURRENCY', '4'))
+TTS_REQUEST_TIMEOUT = float(os.getenv('TTS_REQUEST_TIMEOUT', '300'))
@@ -1,6 +1,7 @@
 from flask import request
 from ..service.document_service import *
 from ..response import HTTPRequestException, HTTPRequestSuccess
+from ...main import job_store
     
 def insert_document_to_vdb():
     body = request.get_json()
@@ -26,9 +27,10 @@ def delete_document_from_vdb():
     args = request.args
     document_id = args.get('document_id')
     collection_name = args.get('collection_name')
+    user_id = args.get('user_id')
 
     try:
-        delete_doc(document_id, collection_name)
+        delete_doc(document_id, collection_name, user_id)
         return HTTPRequestSuccess(message="Document has been deleted", status_code=200).to_response()
     
     except HTTPRequestException as e:
@@ -78,6 +80,59 @@ async def create_mind_map():
         return e.to_response()
 
 
+def enqueue_insert_document():
+    body = request.get_json()
+    document_id = body.get('document_id')
+    user_id = body.get('user_id')
+    tag = body.get('tag')
+    collection_name = body.get('collection_name')
+
+    if not document_id or not user_id or not tag or not collection_name:
+        return HTTPRequestException(message="Please fill all the required fields").to_response()
+
+    job_id = job_store.enqueue("insert_doc", {
+        "document_id": str(document_id),
+        "user_id": user_id,
+        "tag": tag,
+        "collection_name": collection_name,
+        "original_filename": body.get('original_filename'),
+        "change": body.get('change', False),
+        "parser": body.get('parser'),
+    })
+    return HTTPRequestSuccess(message="Document insertion has been queued", status_code=202, payload={"job_id": job_id}).to_response()
+
+
+def enqueue_delete_document():
+    args = request.args
+    document_id = args.get('document_id')
+    collection_name = args.get('collection_name')
+
+    if not document_id or not collection_name:
+        return HTTPRequestException(message="Please fill all the required fields").to_response()
+
+    job_id = job_store.enqueue("delete_doc", {"document_id": document_id, "collection_name": collection_name, "user_id": args.get('user_id')})
+    return HTTPRequestSuccess(message="Document deletion has been queued", status_code=202, payload={"job_id": job_id}).to_response()
+
+
+def enqueue_mind_map():
+    body = request.get_json()
+    job_id = job_store.enqueue("mind_map", {
+        "document_id": body.get('document_id'),
+        "user_id": body.get('user_id'),
+        "tag": body.get('tag'),
+        "collection_name": body.get('collection_name'),
+    })
+    return HTTPRequestSuccess(message="Mind map generation has been queued", status_code=202, payload={"job_id": job_id}).to_response()
+
+
+def get_job_status(job_id):
+    """Status, progress (pages, chunks, embedded, inserted) and result of a background job."""
+    job = job_store.get(job_id)
+    if job is None:
+        return HTTPRequestException(message="The job doesn't exist", status_code=404).to_response()
+    return HTTPRequestSuccess(message=f"Job is {job['status']}", status_code=200, payload=job).to_response()
+
+
 async def extract_metadata():
     """
     Extract metadata (title, topics, confidence) from an uploaded document file.
@@ -1,19 +1,22 @@
 from flask import request, jsonify, Response, stream_with_context
-from ..service.llm_service import question_answer, Streaming, agent_search, regenerate_mind_map_service, generate_title
+from ..service.llm_service import question_answer, Streaming, store_cached_answer, agent_search, regenerate_mind_map_service, generate_title
 
 from ..service.evaluate import evaluate_single_turn_rag
 import threading
 from ..response import HTTPRequestException, HTTPRequestSuccess
-from ...main import semaphore
+from ..util.stream import ThinkTagParser, SSECoalescer, sse_event
+from ..util.answer_cache import merge_events, split_events
+from ..constant.stream import SSE_COALESCE_MS, SSE_COALESCE_BYTES
 import json
 from llama_index.core.agent.workflow import AgentStream
 import asyncio
 
 # Metrics
-from ..metrics.collectors import RequestTimer, format_config
+from ..metrics.collectors import RequestTimer, LLMStreamTimer, format_config, start_stage_timings
 
 def chat_with_llm():
-    semaphore.acquire()
+    # Served natively (with admission control) by app/main/asgi.py under runner.py;
+    # this WSGI route stays for plain Flask runs
     body = request.get_json()
     question = body.get('question')
     print("this is question", question)
@@ -26,15 +29,18 @@ def chat_with_llm():
     ultrathink = True if ultrathink == 'true' else False
     user_id = body.get('userId')
     document_ids = body.get('document_ids', None)  # Bisa None atau list of strings
+    # Kalo 'true', breakdown waktu per stage dikirim sebagai event terakhir sebelum [DONE]
+    send_timings = body.get('timings') == 'true'
     print(body)
     print(f"hyde: {hyde}, reranking: {reranking}, ultrathink: {ultrathink}")
 
     # Metrics: format config for labeling and start timing
     config = format_config(hyde, reranking)
     metrics_timer = RequestTimer("chat_with_llm", config)
+    stage_timings = start_stage_timings()
 
     try:
-        llm_stream, retrieved_docs, is_thinking = Streaming(
+        llm_stream, retrieved_docs, is_thinking, cache_key, cached_events = Streaming(
             question=question,
             user_id=user_id,
             conversations_history=conversation_history,
@@ -53,80 +59,35 @@ def chat_with_llm():
                     doc_payload = json.dumps({"retrieved_doc": doc})
                     yield f"data: {doc_payload}\n\n"
 
-                # 2. Parse thinking tags and stream separately
-                in_thinking = False
-                thinking_buffer = ""
-                answer_buffer = ""
-
-                # 2. Loop melalui stream dari LLM
-                for chunk in llm_stream:
-                    token = chunk.delta
-                    if token:
-                        # Check for thinking tags if ultrathink is enabled
-                        if is_thinking:
-                            # Buffer the complete text to parse tags properly
-                            answer_buffer += token
-
-                            # Check for opening <think> tag
-                            if '<think>' in answer_buffer and not in_thinking:
-                                # Send any text before <think> as answer
-                                before_think = answer_buffer.split('<think>')[0]
-                                if before_think:
-                                    data_payload = json.dumps({"answer_token": before_think})
-                                    yield f"data: {data_payload}\n\n"
-                                in_thinking = True
-                                answer_buffer = answer_buffer.split('<think>', 1)[1]
-
-                            # Check for closing </think> tag
-                            if '</think>' in answer_buffer and in_thinking:
-                                # Send thinking content
-                                parts = answer_buffer.split('</think>', 1)
-                                thinking_content = thinking_buffer + parts[0]
-                                if thinking_content:
-                                    thinking_payload = json.dumps({"thinking_token": thinking_content})
-                                    yield f"data: {thinking_payload}\n\n"
-                                thinking_buffer = ""
-                                in_thinking = False
-                                answer_buffer = parts[1]
-
-                            # Stream content based on current mode
-                            if in_thinking:
-                                # In thinking mode - check for potential closing tag
-                                if len(answer_buffer) > 50 and '</' not in answer_buffer:
-                                    # Buffer is large enough and no closing tag in sight
-                                    thinking_payload = json.dumps({"thinking_token": answer_buffer})
-                                    yield f"data: {thinking_payload}\n\n"
-                                    thinking_buffer += answer_buffer
-                                    answer_buffer = ""
-                            elif not in_thinking and answer_buffer:
-                                # Not in thinking mode - check for potential opening tag
-                                # Don't stream if we might be building up to a tag
-                                if '<' not in answer_buffer[-7:]:  # Check last 7 chars for incomplete tag
-                                    # Safe to stream - no tag markers
-                                    data_payload = json.dumps({"answer_token": answer_buffer})
-                                    yield f"data: {data_payload}\n\n"
-                                    answer_buffer = ""
-                                elif len(answer_buffer) > 10 and not answer_buffer.endswith(('<', '<t', '<th', '<thi', '<thin', '<think', '<think>')):
-                                    # Buffer is large and doesn't end with partial tag
-                                    # Stream everything except the potentially partial tag at the end
-                                    safe_part = answer_buffer[:-7]
-                                    if safe_part:
-                                        data_payload = json.dumps({"answer_token": safe_part})
-                                        yield f"data: {data_payload}\n\n"
-                                    answer_buffer = answer_buffer[-7:]
-                        else:
-                            # No thinking mode, stream normally
-                            data_payload = json.dumps({"answer_token": token})
-                            yield f"data: {data_payload}\n\n"
-
-                # Send any remaining buffered content
-                if answer_buffer:
-                    if in_thinking:
-                        thinking_payload = json.dumps({"thinking_token": answer_buffer})
-                        yield f"data: {thinking_payload}\n\n"
-                    else:
-                        data_payload = json.dumps({"answer_token": answer_buffer})
-                        yield f"data: {data_payload}\n\n"
+                if cached_events is not None:
+                    # 2. Cache hit: replay the stored answer as the same kind of events
+                    for event in split_events(cached_events, SSE_COALESCE_BYTES):
+                        yield sse_event(event)
+                else:
+                    # 2. Loop melalui stream dari LLM, <think> tags di-parse kalo ultrathink
+                    parser = ThinkTagParser(is_thinking)
+                    coalescer = SSECoalescer(SSE_COALESCE_MS, SSE_COALESCE_BYTES)
+                    answer_events = []
+                    llm_timer = LLMStreamTimer(config, stage_timings)
+                    for chunk in llm_stream:
+                        llm_timer.token(chunk.delta)
+                        events = parser.feed(chunk.delta)
+                        answer_events.extend(events)
+                        for frame in coalescer.add(events):
+                            yield frame
+
+                    # Send any remaining buffered content
+                    events = parser.flush()
+                    answer_events.extend(events)
+                    for frame in coalescer.add(events) + coalescer.flush():
+                        yield frame
+                    llm_timer.finish()
+
+                    # Only complete answers go into the cache
+                    store_cached_answer(cache_key, merge_events(answer_events))
+
+                if send_timings:
+                    yield sse_event({"timings": stage_timings.as_dict()})
 
                 # Opsional: Kirim sinyal bahwa stream sudah selesai
                 yield f"data: [DONE]\n\n"
@@ -140,13 +101,10 @@ def chat_with_llm():
             else:
                 # Metrics: record success if no exception occurred
                 metrics_timer.record_success()
-            finally:
-                semaphore.release() # Pastikan semaphore dilepas di akhir stream
 
         return Response(stream_with_context(generate_chunks()), mimetype='text/event-stream')
 
     except HTTPRequestException as e:
-        semaphore.release() # Pastikan semaphore dilepas jika ada error di awal
         # Metrics: record error
         metrics_timer.record_error()
         return e.to_response()
@@ -1,15 +1,12 @@
 from flask import request, send_file
 from ..service.tts_service import generate_speech, generate_speech_openai_compatible, generate_podcast_from_rag, generate_conversational_podcast
 from ..response import HTTPRequestException, HTTPRequestSuccess
-from ...main import semaphore
 import json
 import os
 
 
 async def generate_tts():
     """Generate TTS audio from text using custom endpoint"""
-    semaphore.acquire()
-    
     try:
         body = request.get_json()
         
@@ -62,14 +59,10 @@ async def generate_tts():
             message=f"TTS generation failed: {str(e)}",
             status_code=500
         ).to_response()
-    finally:
-        semaphore.release()
 
 
 async def generate_tts_openai():
     """Generate TTS audio using OpenAI-compatible endpoint"""
-    semaphore.acquire()
-    
     try:
         body = request.get_json()
         
@@ -108,14 +101,10 @@ async def generate_tts_openai():
             message=f"TTS generation failed: {str(e)}",
             status_code=500
         ).to_response()
-    finally:
-        semaphore.release()
 
 
 async def generate_podcast():
     """Generate podcast using RAG + TTS"""
-    semaphore.acquire()
-    
     try:
         body = request.get_json()
         
@@ -151,14 +140,10 @@ async def generate_podcast():
             message=f"Podcast generation failed: {str(e)}",
             status_code=500
         ).to_response()
-    finally:
-        semaphore.release()
 
 
 async def generate_conversational_podcast_endpoint():
     """Generate conversational podcast with two speakers (NotebookLM style)"""
-    semaphore.acquire()
-    
     try:
         body = request.get_json()
         
@@ -192,8 +177,6 @@ async def generate_conversational_podcast_endpoint():
             message=f"Conversational podcast generation failed: {str(e)}",
             status_code=500
         ).to_response()
-    finally:
-        semaphore.release()
 
 
 def download_audio():
@@ -5,13 +5,21 @@ Provides context managers and decorators for collecting performance metrics
 without modifying core business logic.
 """
 
+import threading
 import time
 from contextlib import contextmanager
-from typing import Optional
+from contextvars import ContextVar
+from typing import Dict, Optional
 from .config import ENABLE_METRICS
 
 if ENABLE_METRICS:
-    from .registry import request_total, request_duration
+    from .registry import request_total, request_duration, embedding_cache_lookups, ingest_stage_duration, hyde_outcomes
+    from .registry import admission_queue_duration, admission_active, admission_waiting
+    from .registry import answer_cache_lookups, answer_cache_invalidations
+    from .registry import context_tokens, context_tokens_saved
+    from .registry import parse_cache_lookups, sftp_fetches
+    from .registry import hyde_duration, embedding_duration, retrieval_duration, rerank_duration, rerank_fallbacks
+    from .registry import llm_ttft, llm_tokens_generated, llm_generation_duration
 
 
 @contextmanager
@@ -76,6 +84,253 @@ def track_request(endpoint: str, config: str):
             ).observe(duration)
 
 
+def record_embedding_cache(tier: str, hits: int, misses: int):
+    """
+    Record embedding cache lookups for one tier.
+
+    Args:
+        tier: Cache tier ("memory" or "disk")
+        hits: Number of keys found
+        misses: Number of keys not found
+    """
+    if not ENABLE_METRICS:
+        return
+    if hits:
+        embedding_cache_lookups.labels(tier=tier, result="hit").inc(hits)
+    if misses:
+        embedding_cache_lookups.labels(tier=tier, result="miss").inc(misses)
+
+
+def record_ingest_stage(stage: str, duration: float):
+    """
+    Record the duration of one ingestion work item.
+
+    Args:
+        stage: Pipeline stage ("parse", "split", "embed" or "insert")
+        duration: Seconds spent on the item
+    """
+    if not ENABLE_METRICS:
+        return
+    ingest_stage_duration.labels(stage=stage).observe(duration)
+
+
+def record_hyde(outcome: str):
+    """
+    Record how a speculative HyDE request ended.
+
+    Args:
+        outcome: "cached" (hypothetical document reused), "fused" (generated in time),
+                 "timeout" (deadline missed) or "error"
+    """
+    if not ENABLE_METRICS:
+        return
+    hyde_outcomes.labels(outcome=outcome).inc()
+
+
+def record_answer_cache(result: str):
+    """
+    Record a chat answer cache lookup.
+
+    Args:
+        result: "hit" (answer replayed) or "miss" (generated by the LLM)
+    """
+    if not ENABLE_METRICS:
+        return
+    answer_cache_lookups.labels(result=result).inc()
+
+
+def record_answer_cache_invalidation(count: int):
+    """Record cached answers dropped after a document insert/move/delete."""
+    if not ENABLE_METRICS or count <= 0:
+        return
+    answer_cache_invalidations.inc(count)
+
+
+def record_parse_cache(parser: str, result: str):
+    """
+    Record a parsed document cache lookup.
+
+    Args:
+        parser: "pymu", "docling" or "mineru"
+        result: "hit" (parsing skipped) or "miss"
+    """
+    if not ENABLE_METRICS:
+        return
+    parse_cache_lookups.labels(parser=parser, result=result).inc()
+
+
+def record_sftp_fetch(source: str):
+    """Record a document fetch from the NAS ("nas") or from its local copy ("cache")."""
+    if not ENABLE_METRICS:
+        return
+    sftp_fetches.labels(source=source).inc()
+
+
+def record_context_packing(stats: Dict):
+    """
+    Record one packed chat context.
+
+    Args:
+        stats: pack_context() stats, "tokens" in the prompt and "saved" tokens per step
+    """
+    if not ENABLE_METRICS:
+        return
+    context_tokens.observe(stats["tokens"])
+    for reason, saved in stats["saved"].items():
+        if saved > 0:
+            context_tokens_saved.labels(reason=reason).inc(saved)
+
+
+def record_admission(controller: str, outcome: Optional[str] = None, wait: Optional[float] = None,
+                     active: Optional[int] = None, waiting: Optional[int] = None):
+    """
+    Record admission controller activity.
+
+    Args:
+        controller: Controller name ("retrieval", "generation" or "tts")
+        outcome: "admitted", "rejected" or "timeout", recorded with `wait` seconds
+        active: Current number of requests holding a slot
+        waiting: Current queue length
+    """
+    if not ENABLE_METRICS:
+        return
+    if outcome is not None:
+        admission_queue_duration.labels(controller=controller, outcome=outcome).observe(wait or 0.0)
+    if active is not None:
+        admission_active.labels(controller=controller).set(active)
+    if waiting is not None:
+        admission_waiting.labels(controller=controller).set(waiting)
+
+
+class StageTimings:
+    """
+    Per-request breakdown of where the time went (stage -> seconds).
+
+    Filled by `time_stage` / `record_stage` for the request it is bound to
+    (see `start_stage_timings`) and sent back as a final SSE event when the
+    client asks for it. Works with ENABLE_METRICS off as well. Stages that
+    run more than once (e.g. embedding with HyDE) are summed.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        """Milliseconds per stage, rounded for the SSE event."""
+        with self._lock:
+            return {stage: round(seconds * 1000, 1) for stage, seconds in self._stages.items()}
+
+
+# Timings of the current request; asyncio.to_thread copies it, executor submits use copy_context()
+_stage_timings: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+def start_stage_timings() -> StageTimings:
+    """Bind a fresh StageTimings to the current request context and return it."""
+    timings = StageTimings()
+    _stage_timings.set(timings)
+    return timings
+
+
+def record_stage(stage: str, duration: float, label: Optional[str] = None, timings: Optional[StageTimings] = None):
+    """
+    Record one pipeline stage in its histogram and in the request's timings.
+
+    Args:
+        stage: "hyde", "embedding", "retrieval" or "rerank"
+        duration: Seconds spent
+        label: Histogram label (embedding kind, collection or reranker)
+        timings: Explicit StageTimings, defaults to the one bound to the current context
+    """
+    timings = timings or _stage_timings.get()
+    if timings is not None:
+        timings.add(f"{stage}_{label}" if label else stage, duration)
+    if not ENABLE_METRICS:
+        return
+    if stage == "hyde":
+        hyde_duration.observe(duration)
+    elif stage == "embedding":
+        embedding_duration.labels(kind=label).observe(duration)
+    elif stage == "retrieval":
+        retrieval_duration.labels(collection=label).observe(duration)
+    elif stage == "rerank":
+        rerank_duration.labels(reranker=label).observe(duration)
+
+
+@contextmanager
+def time_stage(stage: str, label: Optional[str] = None):
+    """
+    Context manager timing a pipeline stage, recorded even when it raises.
+
+    Example:
+        >>> with time_stage("embedding", "hybrid"):
+        ...     embeddings = embed(question)
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start_time, label)
+
+
+def record_rerank_fallback(from_ranker: str, to_ranker: str):
+    """Record a reranked search falling back to the next scorer (e.g. vllm_rerank -> weighted)."""
+    if not ENABLE_METRICS:
+        return
+    rerank_fallbacks.labels(from_ranker=from_ranker, to_ranker=to_ranker).inc()
+
+
+class LLMStreamTimer:
+    """
+    Time-to-first-token, streamed tokens and generation time of one LLM stream.
+
+    Example:
+        >>> llm_timer = LLMStreamTimer("hyde=false_rerank=false", timings)
+        >>> for chunk in stream:
+        ...     llm_timer.token(chunk.delta)
+        >>> llm_timer.finish()
+    """
+
+    def __init__(self, config: str, timings: Optional[StageTimings] = None):
+        self.config = config
+        self.timings = timings
+        self.start_time = time.perf_counter()
+        self.first_token_time = None
+        self.tokens = 0
+        self.recorded = False
+
+    def token(self, delta: Optional[str]):
+        if not delta:
+            return
+        if self.first_token_time is None:
+            self.first_token_time = time.perf_counter()
+        self.tokens += 1
+
+    def finish(self):
+        """Record a completed stream (call once, not for aborted streams)."""
+        if self.recorded:
+            return
+        self.recorded = True
+        duration = time.perf_counter() - self.start_time
+        ttft = (self.first_token_time - self.start_time) if self.first_token_time is not None else None
+
+        if self.timings is not None:
+            if ttft is not None:
+                self.timings.add("llm_ttft", ttft)
+            self.timings.add("llm_generation", duration)
+        if not ENABLE_METRICS:
+            return
+        if ttft is not None:
+            llm_ttft.labels(config=self.config).observe(ttft)
+        llm_tokens_generated.labels(config=self.config).observe(self.tokens)
+        llm_generation_duration.labels(config=self.config).observe(duration)
+
+
 def format_config(hyde: bool, reranking: bool) -> str:
     """
     Format configuration into consistent label string.
@@ -10,7 +10,7 @@ Label schema (stable across all phases):
 - config: hyde={true|false}_rerank={true|false} (e.g., "hyde=true_rerank=false")
 """
 
-from prometheus_client import Counter, Histogram, CollectorRegistry
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry
 
 # Custom registry to avoid pollution
 registry = CollectorRegistry()
@@ -38,14 +38,189 @@ request_duration = Histogram(
 )
 
 # ============================================================================
-# PHASE 3: Pipeline stage metrics (to be added in Phase 3)
+# Embedding cache metrics
 # ============================================================================
-# hyde_duration, embedding_duration, retrieval_duration, rerank_duration
+
+embedding_cache_lookups = Counter(
+    f"{METRICS_PREFIX}embedding_cache_lookups_total",
+    "Embedding cache lookups by tier and result (hit rate = hit / (hit + miss))",
+    ["tier", "result"],  # tier: memory, disk; result: hit, miss
+    registry=registry
+)
+
+# ============================================================================
+# Ingestion pipeline metrics
+# ============================================================================
+
+ingest_stage_duration = Histogram(
+    f"{METRICS_PREFIX}ingest_stage_duration_seconds",
+    "Time spent per ingestion work item (page for parse/split, batch for embed/insert)",
+    ["stage"],  # parse, split, embed, insert
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0),
+    registry=registry
+)
+
+# ============================================================================
+# Speculative HyDE metrics
+# ============================================================================
+
+hyde_outcomes = Counter(
+    f"{METRICS_PREFIX}hyde_outcomes_total",
+    "Speculative HyDE requests by outcome",
+    ["outcome"],  # cached, fused, timeout, error
+    registry=registry
+)
+
+# ============================================================================
+# Admission control metrics (async chat/TTS front)
+# ============================================================================
+
+admission_queue_duration = Histogram(
+    f"{METRICS_PREFIX}admission_queue_seconds",
+    "Time a request waited for a slot, by controller and outcome",
+    ["controller", "outcome"],  # controller: retrieval, generation, tts; outcome: admitted, rejected, timeout
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0),
+    registry=registry
+)
+
+admission_active = Gauge(
+    f"{METRICS_PREFIX}admission_active",
+    "Requests currently holding a slot",
+    ["controller"],
+    registry=registry
+)
+
+admission_waiting = Gauge(
+    f"{METRICS_PREFIX}admission_waiting",
+    "Requests currently queued for a slot",
+    ["controller"],
+    registry=registry
+)
+
+# ============================================================================
+# Semantic answer cache metrics
+# ============================================================================
+
+answer_cache_lookups = Counter(
+    f"{METRICS_PREFIX}answer_cache_lookups_total",
+    "Chat answer cache lookups by result (hit rate = hit / (hit + miss))",
+    ["result"],  # hit, miss
+    registry=registry
+)
+
+answer_cache_invalidations = Counter(
+    f"{METRICS_PREFIX}answer_cache_invalidations_total",
+    "Cached chat answers dropped because a cited document changed",
+    registry=registry
+)
+
+# ============================================================================
+# PHASE 3: Pipeline stage metrics
+# ============================================================================
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+hyde_duration = Histogram(
+    f"{METRICS_PREFIX}hyde_duration_seconds",
+    "HyDE hypothetical document generation time (cache hits not included)",
+    buckets=STAGE_BUCKETS,
+    registry=registry
+)
+
+embedding_duration = Histogram(
+    f"{METRICS_PREFIX}embedding_duration_seconds",
+    "Query embedding time, embedding cache lookup included",
+    ["kind"],  # hybrid (dense + sparse), colbert
+    buckets=STAGE_BUCKETS,
+    registry=registry
+)
+
+retrieval_duration = Histogram(
+    f"{METRICS_PREFIX}retrieval_duration_seconds",
+    "Vector search time per collection and for the merged search (reranking included)",
+    ["collection"],  # private, public, merged
+    buckets=STAGE_BUCKETS,
+    registry=registry
+)
+
+rerank_duration = Histogram(
+    f"{METRICS_PREFIX}rerank_duration_seconds",
+    "Time of the reranked search attempt by reranker (failed attempts included)",
+    ["reranker"],  # colbert, vllm_rerank, weighted
+    buckets=STAGE_BUCKETS,
+    registry=registry
+)
+
+rerank_fallbacks = Counter(
+    f"{METRICS_PREFIX}rerank_fallbacks_total",
+    "Reranked searches that failed and fell back to the next scorer",
+    ["from_ranker", "to_ranker"],  # colbert|vllm_rerank -> weighted, weighted -> dense
+    registry=registry
+)
 
 # ============================================================================
-# PHASE 4: LLM streaming metrics (to be added in Phase 4)
+# PHASE 4: LLM streaming metrics
 # ============================================================================
-# llm_ttft, llm_tokens_generated, llm_generation_duration
+
+llm_ttft = Histogram(
+    f"{METRICS_PREFIX}llm_ttft_seconds",
+    "Time from sending the prompt to the first streamed token",
+    ["config"],
+    buckets=STAGE_BUCKETS,
+    registry=registry
+)
+
+llm_tokens_generated = Histogram(
+    f"{METRICS_PREFIX}llm_tokens_generated",
+    "Streamed tokens (non-empty deltas) per answer",
+    ["config"],
+    buckets=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+    registry=registry
+)
+
+llm_generation_duration = Histogram(
+    f"{METRICS_PREFIX}llm_generation_duration_seconds",
+    "Time from sending the prompt to the last streamed token",
+    ["config"],
+    buckets=STAGE_BUCKETS + (60.0, 120.0),
+    registry=registry
+)
+
+# ============================================================================
+# Parse cache and NAS fetch metrics (document readers)
+# ============================================================================
+
+parse_cache_lookups = Counter(
+    f"{METRICS_PREFIX}parse_cache_lookups_total",
+    "Parsed document cache lookups by parser and result",
+    ["parser", "result"],  # result: hit, miss
+    registry=registry
+)
+
+sftp_fetches = Counter(
+    f"{METRICS_PREFIX}sftp_fetches_total",
+    "Documents fetched for processing, by where the bytes came from",
+    ["source"],  # cache (local copy of an unchanged file), nas
+    registry=registry
+)
+
+# ============================================================================
+# Context packing metrics (chat prompt assembly)
+# ============================================================================
+
+context_tokens = Histogram(
+    f"{METRICS_PREFIX}context_tokens",
+    "Tokens of retrieved context put in the chat prompt after packing",
+    buckets=(256, 512, 1024, 2048, 4096, 8192, 16384, 32768),
+    registry=registry
+)
+
+context_tokens_saved = Counter(
+    f"{METRICS_PREFIX}context_tokens_saved_total",
+    "Prompt tokens saved by context packing, by step",
+    ["reason"],  # duplicate, merge, budget
+    registry=registry
+)
 
 # ============================================================================
 # PHASE 5: Remote GPU metrics (to be added in Phase 5)
@@ -9,3 +9,9 @@ blueprint.route('/delete', methods=['DELETE'])(delete_document_from_vdb)
 blueprint.route('/check', methods=['GET'])(check_document_exist_in_vdb)
 blueprint.route('/mind_map', methods=['POST'])(create_mind_map)
 blueprint.route('/extract-metadata', methods=['POST'])(extract_metadata)
+
+# Background jobs: respond 202 with a job_id, poll /jobs/<job_id> for progress
+blueprint.route('/jobs/insert', methods=['POST'])(enqueue_insert_document)
+blueprint.route('/jobs/delete', methods=['DELETE'])(enqueue_delete_document)
+blueprint.route('/jobs/mind_map', methods=['POST'])(enqueue_mind_map)
+blueprint.route('/jobs/<job_id>', methods=['GET'])(get_job_status)
@@ -1,4 +1,3 @@
-from pymilvus import Collection
 from uuid import uuid4
 
 from ..constant.document import DOCUMENT_DIR
@@ -9,13 +8,33 @@ import os
 
 from ..constant.llm import *
 from llama_index.core import PromptTemplate
-from ...main import generation_llm
+from ...main import generation_llm, collection_registry, colbert_store, answer_cache, mind_map_cache
 import json
 import datetime
 from ..util.document import clean_text
+from ..util.ingest import ingest_documents
+from ..constant.document import INGEST_EMBED_WORKERS, INGEST_INSERT_BATCH_SIZE, INGEST_QUEUE_SIZE
+from ..constant.embedding import EMBEDDING_BATCH_SIZE
+from ..constant.sftp import SFTP_STREAM_PARSE
+from ..util.mind_map import build_mind_map
+from ..metrics.collectors import record_answer_cache_invalidation
+
+
+def invalidate_cached_answers(document_id: str):
+    """Cached chat answers citing this document are stale once it is re-ingested, moved or deleted."""
+    if answer_cache is None:
+        return
+    try:
+        dropped = answer_cache.invalidate_documents([document_id])
+    except Exception as e:
+        print(f"Failed to invalidate cached answers for {document_id}: {e}")
+        return
+    if dropped:
+        print(f"Dropped {dropped} cached answers citing {document_id}")
+    record_answer_cache_invalidation(dropped)
 
 
-def insert_doc(document_id:str, user_id:str, tag:str, collection_name:str, original_filename:str, change=False, parser="pymu"):
+def insert_doc(document_id:str, user_id:str, tag:str, collection_name:str, original_filename:str, change=False, parser="pymu", progress_callback=None):
     if not document_id or not user_id or not tag or not collection_name:
         raise HTTPRequestException(message="Please fill all the required fields")
 
@@ -28,13 +47,29 @@ def insert_doc(document_id:str, user_id:str, tag:str, collection_name:str, origi
         raise HTTPRequestException(message="The provided document is not valid")
     
     print(document_id, user_id, tag, collection_name, document_path, change)
+
+    if change and document_in_collection(document_id, collection_name, user_id):
+        # Already indexed: move the existing rows instead of re-parsing and re-embedding
+        target_collection_name = "public" if collection_name == "private" else "private"
+        move_doc(document_id, user_id, tag, collection_name, target_collection_name)
+        return
     
-    retrieve_documents_from_sftp(
-        user_id=user_id,
-        document_id=document_id,
-        tag=tag,
-        collection_name=collection_name,
-    )
+    # PyMuPDF PDFs are parsed from memory, other readers need the file in DOCUMENT_DIR
+    document_bytes = None
+    if SFTP_STREAM_PARSE and parser == "pymu" and tag == 'pdf':
+        document_bytes = read_document_from_sftp(
+            user_id=user_id,
+            document_id=document_id,
+            tag=tag,
+            collection_name=collection_name,
+        )
+    else:
+        retrieve_documents_from_sftp(
+            user_id=user_id,
+            document_id=document_id,
+            tag=tag,
+            collection_name=collection_name,
+        )
     
     
     if (change):
@@ -47,28 +82,10 @@ def insert_doc(document_id:str, user_id:str, tag:str, collection_name:str, origi
     
     collection_name = collection_name if change==False else "public" if collection_name=="private" else "private"
     
-    collection = Collection(collection_name)
-    
-    # retrieve the document from sftp             
-    # read the file
-    document_data = read_file_mineru(document_path, tag, parser=parser) if parser=="mineru" else read_file(document_path, tag, parser=parser)
-    # print('DOKUMEN DATA COYY ============',document_data)
-    splitted_document_data = split_documents(document_data)
-    print(f"Total chunks/nodes yang dihasilkan: {len(splitted_document_data)}")
-
-    # contain objects
-    data_objects = []
-    
-    for doc in splitted_document_data:
-        # print('Document', doc)  # Print first 200 characters of the document text
-        # print(f"Metadata: {doc.metadata}")
-        doc.text = clean_text(doc.text)
+    collection = collection_registry.get(collection_name)
 
+    def build_row(doc, embeddings_result):
         try:
-            # Get both dense and sparse embeddings in one call
-            print("Document text for embedding:", doc.text)  # Print first 100 characters for debugging
-            embeddings_result = document_to_embeddings(doc.text)
-            
             # Ensure sparse vector format is compatible with Milvus
             # Convert string keys to integers if needed
             sparse_vector = embeddings_result["sparse"]
@@ -81,7 +98,7 @@ def insert_doc(document_id:str, user_id:str, tag:str, collection_name:str, origi
             else:
                 formatted_sparse_vector = sparse_vector
             
-            data = {
+            return {
                 "id": str(uuid4()),
                 "vector": embeddings_result["dense"],
                 "sparse_vector": formatted_sparse_vector,
@@ -91,42 +108,96 @@ def insert_doc(document_id:str, user_id:str, tag:str, collection_name:str, origi
                 "document_name": original_filename,
                 # "page_number": int(doc.metadata.get("source", 0)) if doc.metadata else 0,
                 "page_number": int(doc.metadata.get("page_number", 0)) if doc.metadata else 0
-            
-                # "metadata": doc.metadata
             }
-            print(f"Prepared data object for insertion: ID={data['id']}, Document ID={data['document_id']}, User ID={data['user_id']}, Page Number={data['page_number']}")
-            data_objects.append(data)
         except Exception as e:
-            print(f"Failed to generate embeddings: {str(e)}")
-            raise HTTPRequestException(message=f"Failed to generate embeddings: {str(e)}", status_code=500)
-    
-    try:
-        # for data in data_objects:
-            # print(f" ID: {data['id']}, Document ID: {data['document_id']}, User ID: {data['user_id']}, Content: {data['content']}")
-        collection.insert(data=data_objects)
+            print(f"Failed to prepare data object: {str(e)}")
+            raise HTTPRequestException(message=f"Failed to prepare data object: {str(e)}", status_code=500)
 
+    # parse -> split -> embed -> insert run as concurrent bounded stages
+    try:
+        inserted = ingest_documents(
+            iter_documents(document_path, tag, parser=parser, data=document_bytes),
+            collection,
+            build_row,
+            embed_batch_size=EMBEDDING_BATCH_SIZE,
+            embed_workers=INGEST_EMBED_WORKERS,
+            insert_batch_size=INGEST_INSERT_BATCH_SIZE,
+            queue_size=INGEST_QUEUE_SIZE,
+            progress_callback=progress_callback,
+            colbert_store=colbert_store,
+        )
+        print(f"Total chunks/nodes yang di-insert: {inserted}")
     except Exception as e:
-        raise HTTPRequestException(message=str(e), status_code=500)
-    
-    os.remove(document_path)
+        # Don't leave a half-ingested document behind
+        collection.delete(document_expr(document_id, collection_name, user_id))
+        if colbert_store is not None:
+            colbert_store.delete_document(collection_name, document_id, colbert_scope(collection_name, user_id))
+        if isinstance(e, HTTPRequestException):
+            raise e
+        print(f"Failed to ingest document: {str(e)}")
+        raise HTTPRequestException(message=f"Failed to ingest document: {str(e)}", status_code=500)
+
+    invalidate_cached_answers(document_id)
+    if os.path.exists(document_path):
+        os.remove(document_path)
     
     
 
-def delete_doc(document_id:str, collection_name:str):
+def move_doc(document_id:str, user_id:str, tag:str, source_collection_name:str, target_collection_name:str):
+    try:
+        copied = copy_document_rows(document_id, source_collection_name, target_collection_name, user_id)
+    except Exception as e:
+        raise HTTPRequestException(message=f"Failed to copy document rows: {str(e)}", status_code=500)
+
+    try:
+        # Rename on the NAS only once the rows are safely in the target collection
+        move_documents_from(
+            user_id=user_id,
+            document_id=document_id,
+            tag=tag,
+            collection_name=source_collection_name,
+        )
+    except HTTPRequestException:
+        # Roll back the copy only when the file definitely didn't move. If the rename went through
+        # (or it can't be told), the rows stay in both collections and a retry finishes the move:
+        # the copy is an upsert and the rename is a no-op once the file is in place
+        if document_moved_to(user_id, document_id, tag, target_collection_name) is False:
+            collection_registry.get(target_collection_name).delete(document_expr(document_id, target_collection_name, user_id))
+        raise
+
+    try:
+        collection_registry.get(source_collection_name).delete(document_expr(document_id, source_collection_name, user_id))
+    except Exception as e:
+        raise HTTPRequestException(message=f"Failed to delete source rows: {str(e)}", status_code=500)
+
+    if colbert_store is not None:
+        # The copy kept the chunk ids, so the vectors only need their collection re-keyed
+        colbert_store.move_document(document_id, source_collection_name, target_collection_name, colbert_scope(source_collection_name, user_id))
+
+    invalidate_cached_answers(document_id)
+    print(f"Moved {copied} chunks of {document_id} from {source_collection_name} to {target_collection_name}")
+
+
+def delete_doc(document_id:str, collection_name:str, user_id:str=None):
     if not document_id or not collection_name:
         raise HTTPRequestException("Please fill all the required fields")
     
     if not check_collection_validation(collection_name):
         raise HTTPRequestException("The provided collection doesn't exist")
     
-    collection = Collection(collection_name)
+    collection = collection_registry.get(collection_name)
 
     # delete from the collection
     try:
-        collection.delete(f"document_id == '{document_id}'")
+        # user_id (kalo ada) bikin delete di 'private' cuma nyentuh partisi user itu
+        collection.delete(document_expr(document_id, collection_name, user_id))
+        if colbert_store is not None:
+            colbert_store.delete_document(collection_name, document_id, colbert_scope(collection_name, user_id))
     
     except Exception as e:
         raise HTTPRequestException(message=str(e), status_code=500)
+
+    invalidate_cached_answers(document_id)
     
 def check_doc(document_id:str, collection_name:str, user_id:str):
     if not document_id:
@@ -141,12 +212,12 @@ def check_doc(document_id:str, collection_name:str, user_id:str):
     if not check_collection_validation(collection_name):
         raise HTTPRequestException("The provided collection doesn't exist")
     
-    collection = Collection(collection_name)
+    collection = collection_registry.get(collection_name)
 
     # check from the collection
     try:
         res = collection.query(
-            expr=f"document_id == '{document_id}' && user_id == '{user_id}'",
+            expr=f"document_id == '{document_id}' && user_id == '{user_id}'",  # user_id is the private partition key
             limit=1
         )
         if not res:
@@ -169,22 +240,17 @@ async def mind_map(document_id:str, user_id:str, tag:str, collection_name:str):
 
     read_files = read_file(file_path, tag)
 
-    print("Content to be processed:", read_files[:1000])  # Print first 1000 characters for debugging
-
-    extracted_texts = [doc.text_resource.text for doc in read_files if doc.text_resource and doc.text_resource.text]
-
-
-    # Gabungkan semua teks jika diperlukan
-
-    print("Full text extracted:", extracted_texts[0][:1000])  # Print first 1000 characters for debugging
-
-    content = read_files[0]
+    # Semua halaman, bukan cuma yang pertama
+    extracted_texts = [doc.text for doc in read_files if doc.text]
+    if not extracted_texts:
+        raise HTTPRequestException("No text could be extracted from the document", status_code=400)
 
-    prompt = PromptTemplate(MINDMAP_PROMPT_TEMPLATE)
+    async def complete(prompt: str) -> str:
+        response = await generation_llm.acomplete(prompt)
+        return response.text
 
     try:
-        response = await generation_llm.acomplete(prompt.format(content=content))
-        markdown_content = response.text
+        markdown_content = await build_mind_map(extracted_texts, complete, cache=mind_map_cache)
         print("Generated Markdown Content:", markdown_content)
 
         return markdown_content
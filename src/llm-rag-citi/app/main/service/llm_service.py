@@ -1,8 +1,12 @@
 from ..response import HTTPRequestException
-from ...main import generation_llm
+from ...main import generation_llm, answer_cache
 # , agent
-from ..util.document import retrieve_documents_from_vdb, document_to_embeddings
-from ..util.llm import format_conversation_history, get_context
+from ..util.document import retrieve_documents_from_collections, document_to_embeddings
+from ..util.llm import format_conversation_history
+from ..util.hyde import speculative_retrieve
+from ..util.answer_cache import answer_scope
+from ..util.context import pack_context
+from ..metrics.collectors import record_answer_cache, record_context_packing
 from ..constant.llm import PROMPT_TEMPLATE, NEW_PROMPT_TEMPLATE, REGENERATE_MIND_MAP_PROMPT, TITLE_PROMPT_TEMPLATE, THINKING_PROMPT_TEMPLATE
 
 from llama_index.core.llms import ChatMessage
@@ -10,85 +14,50 @@ from llama_index.core.agent.workflow import AgentStream
 
 import asyncio
 
+
+def retrieve_context_documents(question: str, user_id: str, hyde: bool = False, reranking: bool = False,
+                               document_ids: list[str] = None) -> list:
+    """
+    Embed + search private & public (concurrently, merged into one ranked list).
+    With hyde, retrieval on the raw question doesn't wait for the HyDE completion:
+    the HyDE results are fused in only if they arrive within the deadline.
+    """
+    def retrieve(text: str) -> list:
+        question_embeddings = document_to_embeddings(text)
+        # document_ids, kalo ada, jadi filter "WHERE document_id IN [...]" di kedua koleksi
+        return retrieve_documents_from_collections(
+            embeddings=question_embeddings["dense"],
+            sparse_embeddings=question_embeddings["sparse"],
+            query=question,
+            reranking=reranking,
+            user_id=user_id,
+            document_ids=document_ids
+        )
+
+    if hyde:
+        return speculative_retrieve(question, retrieve)
+    return retrieve(question)
+
+
 async def question_answer(question: str, user_id: str, conversations_history: list,
                         #    background_tasks: BackgroundTasks,
-                        hyde: bool = False, reranking: bool = False):
+                        hyde: bool = False, reranking: bool = False, return_sources: bool = False):
+    """Answer text; (answer, retrieved sources) when return_sources is set."""
     if not question or not user_id:
         raise HTTPRequestException(message="Please provide both question & user_id", status_code=400)
     
     try:
         # add history handler
         format_conversation_history(conversations_history if conversations_history else [])
-        # getting context (hyde)
-        if hyde == True:
-            context = await get_context(question)
-            print("ini context", context)
-        else:
-            context = question
-            print("ini context", context)
-            
-        # print('context ==', context)
-
-        # context retrieval with reranking option
-        # question_embeddings = document_to_embeddings(context)
-        question_embeddings = document_to_embeddings(context)
-        print("ini question_embeddings", question_embeddings)
-        private_documents = retrieve_documents_from_vdb(
-                                embeddings=question_embeddings["dense"], 
-                                user_id=user_id, 
-                                collection_name='private', 
-                                reranking=reranking,
-                                query=question,
-                                sparse_embeddings=question_embeddings["sparse"]
-                            )
-        public_documents = retrieve_documents_from_vdb(
-                                embeddings=question_embeddings["dense"], 
-                                collection_name='public', 
-                                reranking=reranking,
-                                query=question,
-                                sparse_embeddings=question_embeddings["sparse"]
-                            )
-     
-        context_snippets = []
-
-        private_docs_labeled = [{**doc['entity'], 'source': 'Private'} for doc in private_documents]
-        public_docs_labeled = [{**doc['entity'], 'source': 'Public'} for doc in public_documents]
 
-       
-        all_documents = private_docs_labeled + public_docs_labeled
+        # context retrieval with reranking option (and speculative hyde), off the event loop
+        all_documents = await asyncio.to_thread(retrieve_context_documents, question, user_id, hyde, reranking)
+     
         print("ini all_documents", all_documents)
 
-        # 3. Sekarang, cara nampilinnya jadi lebih kaya
-        # print("\n--- HASIL PENCARIAN DOKUMEN ---")
-        for idx, doc in enumerate(all_documents):
-            # Ambil semua data dari tiap 'doc'
-            doc_content = doc.get('content', 'N/A')
-            doc_name = doc.get('document_name', 'N/A')
-            doc_page = doc.get('page_number', 'N/A')
-            doc_source = doc.get('source', 'N/A')
-
-            # print("-------------------------------------")
-            # print(f"Kutipan Relevan #{idx + 1}")
-            # print(f"\nIsi Kutipan:\n{doc_content}\n")
-           
-            # print(f"Sumber: {doc_name} (Halaman: {doc_page}) [Koleksi: {doc_source}]") 
-            # print("-------------------------------------")
-
-            # 2. Format tiap dokumen jadi blok teks yang rapi
-            snippet = (
-                f"Sumber Informasi:\n"
-                f"  - Dokumen: {doc_name}\n"
-                f"  - Halaman: {doc_page}\n"
-                f"  - Koleksi: {doc_source}\n"
-                f"Isi Kutipan:\n"
-                f"\"{doc_content}\""
-            )
-            context_snippets.append(snippet)
-
-
         # Membuat messages dalam format yang sesuai dengan llama_index
-
-        final_context_string = "\n\n---\n\n".join(context_snippets)
+        final_context_string, context_stats = pack_context(all_documents)
+        record_context_packing(context_stats)
         messages = [
             ChatMessage(role="system", content=PROMPT_TEMPLATE.format(context=final_context_string)),
             ChatMessage(role="user", content=question)
@@ -109,8 +78,9 @@ async def question_answer(question: str, user_id: str, conversations_history: li
                 "page_number": doc.get('page_number'),
                 "source": doc.get('source')
             })
-        # return final_answer, docs_to_return
         print("ini final_answer", final_answer)
+        if return_sources:
+            return final_answer, docs_to_return
         return final_answer
 
     
@@ -118,8 +88,9 @@ async def question_answer(question: str, user_id: str, conversations_history: li
         print("ERROOOOORRRRRRRRRRRR", e)
         raise HTTPRequestException(message=str(e), status_code=500)
 
-def Streaming(question: str, user_id: str, conversations_history: list, document_ids: list[str] = None,
+def build_chat_messages(question: str, user_id: str, conversations_history: list, document_ids: list[str] = None,
                         hyde: bool = False, reranking: bool = False, ultrathink: bool = False):
+    """Retrieval + prompt for a chat turn: returns (messages, retrieved_docs), no LLM generation yet."""
     if not question or not user_id:
         raise HTTPRequestException(message="Please provide both question & user_id", status_code=400)
 
@@ -127,53 +98,7 @@ def Streaming(question: str, user_id: str, conversations_history: list, document
         print('Streaming service called with question:', question)
         print('Ultrathink mode:', ultrathink)
         formatted_history = format_conversation_history(conversations_history if conversations_history else [])
-        if hyde:
-            # Create a new event loop if needed
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    # If loop is already running, create a new one
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    context = loop.run_until_complete(get_context(question))
-                    loop.close()
-                else:
-                    context = asyncio.run(get_context(question))
-            except RuntimeError:
-                # No event loop exists, create one
-                context = asyncio.run(get_context(question))
-            print('Hyde context ==', context)
-        else:
-            context = question
-
-        print('context ==', context)
-
-        question_embeddings = document_to_embeddings(context)
-        all_documents = []
-        for collection in ['private', 'public']:
-            # Siapin argumen buat manggil fungsi, biar rapi
-            retrieval_params = {
-                "embeddings": question_embeddings["dense"],
-                "collection_name": collection,
-                "reranking": reranking,
-                "query": question,
-                "sparse_embeddings": question_embeddings["sparse"]
-            }
-            # Tambahin user_id HANYA kalo koleksinya 'private'
-            if collection == 'private':
-                retrieval_params["user_id"] = user_id
-
-            if document_ids:
-                # Sintaks filter ini tergantung VDB lo, tapi konsepnya "WHERE document_id IN [...]"
-                retrieval_params['document_ids'] = document_ids
-
-            # Panggil fungsi retrieve pake parameter yg udah disiapin
-            documents = retrieve_documents_from_vdb(**retrieval_params)
-
-            # Langsung kasih label & masukin ke list utama
-            source_label = collection.capitalize() # Biar jadi 'Private' atau 'Public'
-            labeled_docs = [{**doc['entity'], 'source': source_label} for doc in documents]
-            all_documents.extend(labeled_docs)
+        all_documents = retrieve_context_documents(question, user_id, hyde, reranking, document_ids)
 
 
         for doc in all_documents:
@@ -181,20 +106,10 @@ def Streaming(question: str, user_id: str, conversations_history: list, document
             if 'content' in doc and isinstance(doc['content'], str):
                 # Ganti semua karakter " di dalem konten jadi \"
                 doc['content'] = doc['content'].replace('"', '\\"')
-        context_snippets = []
-        for doc in all_documents:
-            snippet = (
-                f"Sumber Informasi:\n"
-                f"  - Dokumen: {doc.get('document_name', 'N/A')}\n"
-                f"  - Halaman: {doc.get('page_number', 'N/A')}\n"
-                f"  - Koleksi: {doc.get('source', 'N/A')}\n"
-                f"Isi Kutipan:\n"
-                f"\"{doc.get('content', 'N/A')}\""
-            )
-            context_snippets.append(snippet)
-
-
-        final_context_string = "\n\n---\n\n".join(context_snippets)
+        # Duplikat dibuang, halaman yang nyambung digabung, terus dipotong sesuai token budget
+        final_context_string, context_stats = pack_context(all_documents)
+        record_context_packing(context_stats)
+        print(f"Context packed: {context_stats}")
 
         # Choose prompt template based on ultrathink mode
         prompt_template = THINKING_PROMPT_TEMPLATE if ultrathink else PROMPT_TEMPLATE
@@ -204,17 +119,71 @@ def Streaming(question: str, user_id: str, conversations_history: list, document
             *formatted_history,
             ChatMessage(role="user", content=question)
         ]
-        # 1. Streaming response dari LLM
-        streaming_response = generation_llm.stream_chat(messages)
+        return messages, all_documents
+
+
+    except Exception as e:
+        print("ERROOOOORRRRRRRRRRRR", e)
+        raise HTTPRequestException(message=str(e), status_code=500)
+
+def find_cached_answer(question: str, user_id: str, conversations_history: list, document_ids: list[str],
+                       hyde: bool, reranking: bool, ultrathink: bool, retrieved_docs: list):
+    """
+    Look the chat turn up in the semantic answer cache, after retrieval.
+    Returns (cache_key, cached_events): cache_key is None when the turn can't be
+    cached (cache off, follow-up turn, nothing retrieved), cached_events is None
+    on a miss. Cache errors count as a miss, chat keeps working without it.
+    """
+    if answer_cache is None or conversations_history or not retrieved_docs:
+        return None, None
+
+    try:
+        cache_key = {
+            "scope": answer_scope(user_id, document_ids, hyde, reranking, ultrathink),
+            # Same text as the retrieval query, so this is an embedding cache hit
+            "embedding": document_to_embeddings(question)["dense"],
+            "chunk_ids": [doc.get('id') for doc in retrieved_docs],
+            "document_ids": [doc.get('document_id') for doc in retrieved_docs],
+        }
+        cached_events = answer_cache.get(cache_key["scope"], cache_key["embedding"], cache_key["chunk_ids"])
+    except Exception as e:
+        print(f"Answer cache lookup failed: {e}")
+        return None, None
+
+    record_answer_cache("hit" if cached_events is not None else "miss")
+    return cache_key, cached_events
+
 
-        # 2. Ambil ID dokumen yang relevan
+def store_cached_answer(cache_key: dict, events: list):
+    """Keep a fully streamed answer for later turns (no-op for turns that can't be cached)."""
+    if answer_cache is None or cache_key is None:
+        return
+    try:
+        answer_cache.put(cache_key["scope"], cache_key["embedding"], cache_key["chunk_ids"], cache_key["document_ids"], events)
+    except Exception as e:
+        print(f"Answer cache store failed: {e}")
+
+
+def Streaming(question: str, user_id: str, conversations_history: list, document_ids: list[str] = None,
+                        hyde: bool = False, reranking: bool = False, ultrathink: bool = False):
+    messages, retrieved_docs = build_chat_messages(
+        question, user_id, conversations_history, document_ids, hyde, reranking, ultrathink
+    )
+    cache_key, cached_events = find_cached_answer(
+        question, user_id, conversations_history, document_ids, hyde, reranking, ultrathink, retrieved_docs
+    )
+    if cached_events is not None:
+        # Jawaban udah ada di cache, ga perlu panggil LLM
+        return None, retrieved_docs, ultrathink, cache_key, cached_events
 
-        retrieved_docs = all_documents
+    try:
+        # 1. Streaming response dari LLM
+        streaming_response = generation_llm.stream_chat(messages)
 
-        # 3. Kembalikan stream dan ID dokumen
+        # 2. Kembalikan stream dan ID dokumen
         # Kita tidak lagi mengembalikan 'final_answer' dari sini
         print("ini streaming_response", streaming_response)
-        return streaming_response, retrieved_docs, ultrathink
+        return streaming_response, retrieved_docs, ultrathink, cache_key, None
 
 
     except Exception as e:
@@ -253,62 +222,14 @@ def agent_search(question: str, user_id: str, conversations_history: list,
 
     try:
         formatted_history = format_conversation_history(conversations_history if conversations_history else [])
-        if hyde:
-            # Create a new event loop if needed
-            try:
-                loop = asyncio.get_event_loop()
-                if loop.is_running():
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    context = loop.run_until_complete(get_context(question))
-                    loop.close()
-                else:
-                    context = asyncio.run(get_context(question))
-            except RuntimeError:
-                context = asyncio.run(get_context(question))
-        else:
-            context = question
-
-        print('context ==', context)
-
-        question_embeddings = document_to_embeddings(context)
-        private_documents = retrieve_documents_from_vdb(
-                                embeddings=question_embeddings["dense"],
-                                user_id=user_id,
-                                collection_name='private',
-                                reranking=reranking,
-                                query=question,
-                                sparse_embeddings=question_embeddings["sparse"]
-                            )
-        public_documents = retrieve_documents_from_vdb(
-                                embeddings=question_embeddings["dense"],
-                                collection_name='public',
-                                reranking=reranking,
-                                query=question,
-                                sparse_embeddings=question_embeddings["sparse"]
-                            )
-
-        private_docs_labeled = [{**doc['entity'], 'source': 'Private'} for doc in private_documents]
-        public_docs_labeled = [{**doc['entity'], 'source': 'Public'} for doc in public_documents]
-        all_documents = private_docs_labeled + public_docs_labeled
+        all_documents = retrieve_context_documents(question, user_id, hyde, reranking)
 
         for doc in all_documents:
             if 'content' in doc and isinstance(doc['content'], str):
                 doc['content'] = doc['content'].replace('"', '\\"')
         
-        context_snippets = []
-        for doc in all_documents:
-            snippet = (
-                f"Sumber Informasi:\n"
-                f"  - Dokumen: {doc.get('document_name', 'N/A')}\n"
-                f"  - Halaman: {doc.get('page_number', 'N/A')}\n"
-                f"  - Koleksi: {doc.get('source', 'N/A')}\n"
-                f"Isi Kutipan:\n"
-                f"\"{doc.get('content', 'N/A')}\""
-            )
-            context_snippets.append(snippet)
-
-        final_context_string = "\n\n---\n\n".join(context_snippets)
+        final_context_string, context_stats = pack_context(all_documents)
+        record_context_packing(context_stats)
         
         messages = NEW_PROMPT_TEMPLATE.format(
             system=PROMPT_TEMPLATE.format(context=final_context_string),
@@ -350,39 +271,10 @@ async def regenerate_mind_map_service(question: str, user_id: str, hyde: bool =
         raise HTTPRequestException(message="Please provide both question & user_id", status_code=400)
     
     try:
-
-        if hyde == True:
-            context = await get_context(question)
-        else:
-            context = question
-            
-        print('context ==', context)
-
-        question_embeddings = document_to_embeddings(context)
-        private_documents = retrieve_documents_from_vdb(
-                                embeddings=question_embeddings["dense"], 
-                                user_id=user_id, 
-                                collection_name='private', 
-                                reranking=reranking,
-                                query=question,
-                                sparse_embeddings=question_embeddings["sparse"]
-                            )
-        public_documents = retrieve_documents_from_vdb(
-                                embeddings=question_embeddings["dense"], 
-                                collection_name='public', 
-                                reranking=reranking,
-                                query=question,
-                                sparse_embeddings=question_embeddings["sparse"]
-                            )
+        all_documents = await asyncio.to_thread(retrieve_context_documents, question, user_id, hyde, reranking)
      
         context_snippets = []
 
-        private_docs_labeled = [{**doc['entity'], 'source': 'Private'} for doc in private_documents]
-        public_docs_labeled = [{**doc['entity'], 'source': 'Public'} for doc in public_documents]
-
-       
-        all_documents = private_docs_labeled + public_docs_labeled
-
         # 3. Sekarang, cara nampilinnya jadi lebih kaya
         # print("\n--- HASIL PENCARIAN DOKUMEN ---")
         for idx, doc in enumerate(all_documents):
@@ -1,6 +1,8 @@
 import requests
+import asyncio
 import os
 import re
+import httpx
 from uuid import uuid4
 from typing import Optional, Dict, Any, List, Tuple
 from ..response import HTTPRequestException
@@ -23,11 +25,22 @@ from ..constant.tts import (
     OPENAI_SPEED,
     PODCAST_SPEAKERS,
     SILENCE_DURATION,
-    AUDIO_FADE_DURATION
+    AUDIO_FADE_DURATION,
+    TTS_SEGMENT_CONCURRENCY,
+    TTS_REQUEST_TIMEOUT
 )
+from ..util.audio import concatenate_wavs
 
 
-def generate_speech(
+def tts_async_client(concurrency: int = TTS_SEGMENT_CONCURRENCY) -> httpx.AsyncClient:
+    """Connection pool for one podcast's segments; use it with `async with` so it is closed with its loop."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        timeout=TTS_REQUEST_TIMEOUT,
+    )
+
+
+def build_speech_payload(
     text: str,
     voice_mode: str = DEFAULT_VOICE_MODE,
     predefined_voice_id: str = DEFAULT_PREDEFINED_VOICE_ID,
@@ -41,10 +54,9 @@ def generate_speech(
     seed: Optional[int] = None,
     speed_factor: float = DEFAULT_SPEED_FACTOR,
     language: str = DEFAULT_LANGUAGE
-) -> str:
+) -> Dict[str, Any]:
     """
-    Generate speech from text using the TTS server.
-    Returns the path to the saved audio file.
+    Validate the request and build the /generate payload of the TTS server.
     """
     if not text:
         raise HTTPRequestException(message="Text is required for TTS generation", status_code=400)
@@ -74,6 +86,44 @@ def generate_speech(
     # Add seed if provided
     if seed is not None:
         payload["seed"] = seed
+
+    return payload
+
+
+def generate_speech(
+    text: str,
+    voice_mode: str = DEFAULT_VOICE_MODE,
+    predefined_voice_id: str = DEFAULT_PREDEFINED_VOICE_ID,
+    reference_audio_filename: Optional[str] = None,
+    output_format: str = DEFAULT_OUTPUT_FORMAT,
+    split_text: bool = DEFAULT_SPLIT_TEXT,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    temperature: float = DEFAULT_TEMPERATURE,
+    exaggeration: float = DEFAULT_EXAGGERATION,
+    cfg_weight: float = DEFAULT_CFG_WEIGHT,
+    seed: Optional[int] = None,
+    speed_factor: float = DEFAULT_SPEED_FACTOR,
+    language: str = DEFAULT_LANGUAGE
+) -> str:
+    """
+    Generate speech from text using the TTS server.
+    Returns the path to the saved audio file.
+    """
+    payload = build_speech_payload(
+        text=text,
+        voice_mode=voice_mode,
+        predefined_voice_id=predefined_voice_id,
+        reference_audio_filename=reference_audio_filename,
+        output_format=output_format,
+        split_text=split_text,
+        chunk_size=chunk_size,
+        temperature=temperature,
+        exaggeration=exaggeration,
+        cfg_weight=cfg_weight,
+        seed=seed,
+        speed_factor=speed_factor,
+        language=language
+    )
     
     try:
         # Make request to TTS server
@@ -110,6 +160,44 @@ def generate_speech(
         )
 
 
+async def agenerate_speech(client: httpx.AsyncClient, output_format: str = DEFAULT_OUTPUT_FORMAT, **options) -> str:
+    """
+    Async twin of `generate_speech` on a pooled AsyncClient; the audio is streamed
+    to disk as it arrives. Returns the path to the saved audio file.
+    """
+    payload = build_speech_payload(output_format=output_format, **options)
+    
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+    audio_path = os.path.join(AUDIO_DIR, f"tts_{uuid4().hex}.{output_format}")
+    
+    try:
+        async with client.stream("POST", f"{TTS_SERVER_URL}/generate", json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                try:
+                    error_detail = response.json().get('detail', 'Unknown error')
+                except ValueError:
+                    error_detail = response.text or 'Unknown error'
+                raise HTTPRequestException(
+                    message=f"TTS generation failed: {error_detail}",
+                    status_code=response.status_code
+                )
+            
+            with open(audio_path, 'wb') as f:
+                async for chunk in response.aiter_bytes():
+                    f.write(chunk)
+        
+        return audio_path
+    
+    except httpx.HTTPError as e:
+        if os.path.exists(audio_path):
+            os.remove(audio_path)
+        raise HTTPRequestException(
+            message=f"Failed to connect to TTS server: {str(e)}",
+            status_code=500
+        )
+
+
 def generate_speech_openai_compatible(
     text: str,
     model: str = OPENAI_MODEL,
@@ -203,53 +291,18 @@ def parse_podcast_script(script_text: str) -> List[Tuple[str, str]]:
 
 def concatenate_audio_files(audio_files: List[str], output_filename: str) -> str:
     """
-    Concatenate multiple audio files with silence between them.
+    Concatenate WAV files with silence between them and a short fade at each segment edge.
     Returns the path to the concatenated audio file.
-    
-    Note: This is a placeholder implementation. In production, you would use
-    a library like pydub to handle audio concatenation properly.
     """
     try:
-        # For now, we'll use a simple approach
-        # In production, you should use pydub or similar library
-        import subprocess
-        
         output_path = os.path.join(AUDIO_DIR, output_filename)
-        
-        # Create a temporary file list for ffmpeg
-        file_list_path = os.path.join(AUDIO_DIR, f"temp_filelist_{uuid4().hex}.txt")
-        
-        with open(file_list_path, 'w') as f:
-            for audio_file in audio_files:
-                f.write(f"file '{audio_file}'\n")
-        
-        # Use ffmpeg to concatenate
-        cmd = [
-            'ffmpeg', '-f', 'concat', '-safe', '0', '-i', file_list_path,
-            '-c', 'copy', output_path, '-y'
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        # Clean up temporary file
-        os.remove(file_list_path)
-        
-        if result.returncode != 0:
-            raise HTTPRequestException(
-                message=f"Audio concatenation failed: {result.stderr}",
-                status_code=500
-            )
-        
-        return output_path
-        
-    except FileNotFoundError:
-        # ffmpeg not available, return first audio file as fallback
-        if audio_files:
-            return audio_files[0]
-        raise HTTPRequestException(
-            message="Audio concatenation failed: ffmpeg not available",
-            status_code=500
+        return concatenate_wavs(
+            audio_files,
+            output_path,
+            silence_seconds=SILENCE_DURATION,
+            fade_seconds=AUDIO_FADE_DURATION
         )
+    
     except Exception as e:
         raise HTTPRequestException(
             message=f"Audio concatenation failed: {str(e)}",
@@ -257,6 +310,47 @@ def concatenate_audio_files(audio_files: List[str], output_filename: str) -> str
         )
 
 
+async def synthesize_segments(
+    segments: List[Tuple[str, str]],
+    speaker_voices: Dict[str, Dict[str, Any]],
+    concurrency: int = TTS_SEGMENT_CONCURRENCY,
+    client: Optional[httpx.AsyncClient] = None
+) -> List[str]:
+    """
+    Synthesise (speaker, text) segments with at most `concurrency` TTS requests in flight,
+    over `client` or a pool of their own that is closed once all segments are done.
+    Returns the WAV paths in segment order; on failure the finished segments are removed.
+    """
+    if client is None:
+        async with tts_async_client(concurrency) as pooled:
+            return await synthesize_segments(segments, speaker_voices, concurrency, pooled)
+    
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def synthesize(speaker: str, text: str) -> str:
+        speaker_config = speaker_voices.get(speaker, PODCAST_SPEAKERS.get(speaker, PODCAST_SPEAKERS['HOST_A']))
+        async with semaphore:
+            return await agenerate_speech(
+                client,
+                text=text,
+                voice_mode=speaker_config.get('voice_mode', DEFAULT_VOICE_MODE),
+                predefined_voice_id=speaker_config.get('predefined_voice_id', DEFAULT_PREDEFINED_VOICE_ID),
+                temperature=speaker_config.get('temperature', DEFAULT_TEMPERATURE),
+                exaggeration=speaker_config.get('exaggeration', DEFAULT_EXAGGERATION),
+                speed_factor=speaker_config.get('speed_factor', DEFAULT_SPEED_FACTOR),
+                output_format='wav'
+            )
+    
+    results = await asyncio.gather(*(synthesize(speaker, text) for speaker, text in segments), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        for result in results:
+            if isinstance(result, str) and os.path.exists(result):
+                os.remove(result)
+        raise errors[0]
+    return results
+
+
 async def generate_conversational_podcast(
     question: str,
     user_id: str,
@@ -275,15 +369,15 @@ async def generate_conversational_podcast(
     
     try:
         # Step 1: Generate content using existing RAG system
-        rag_response = await question_answer(
+        content, sources = await question_answer(
             question=question,
             user_id=user_id,
             conversations_history=[],
             hyde=True,
-            reranking=True
+            reranking=True,
+            return_sources=True
         )
         
-        content = rag_response.get('answer', '')
         if not content:
             raise HTTPRequestException(message="No content generated from RAG system", status_code=500)
         
@@ -293,7 +387,7 @@ async def generate_conversational_podcast(
             question=question
         )
         
-        script_response = generation_llm.complete(script_prompt)
+        script_response = await generation_llm.acomplete(script_prompt)
         script_text = script_response.text
         
         # Step 3: Parse script into speaker segments
@@ -306,35 +400,21 @@ async def generate_conversational_podcast(
         if speaker_voices is None:
             speaker_voices = PODCAST_SPEAKERS
         
-        # Step 5: Generate audio for each segment
-        audio_files = []
-        segment_info = []
-        
-        for i, (speaker, text) in enumerate(segments):
-            speaker_config = speaker_voices.get(speaker, PODCAST_SPEAKERS.get(speaker, PODCAST_SPEAKERS['HOST_A']))
-            
-            # Generate audio for this segment
-            audio_path = generate_speech(
-                text=text,
-                voice_mode=speaker_config.get('voice_mode', DEFAULT_VOICE_MODE),
-                predefined_voice_id=speaker_config.get('predefined_voice_id', DEFAULT_PREDEFINED_VOICE_ID),
-                temperature=speaker_config.get('temperature', DEFAULT_TEMPERATURE),
-                exaggeration=speaker_config.get('exaggeration', DEFAULT_EXAGGERATION),
-                speed_factor=speaker_config.get('speed_factor', DEFAULT_SPEED_FACTOR),
-                output_format='wav'
-            )
-            
-            audio_files.append(audio_path)
-            segment_info.append({
+        # Step 5: Generate audio for all segments concurrently (bounded), kept in script order
+        audio_files = await synthesize_segments(segments, speaker_voices)
+        segment_info = [
+            {
                 'speaker': speaker,
                 'text': text,
                 'audio_path': audio_path,
                 'segment_index': i
-            })
+            }
+            for i, ((speaker, text), audio_path) in enumerate(zip(segments, audio_files))
+        ]
         
-        # Step 6: Concatenate all audio files
+        # Step 6: Concatenate all audio files (file I/O, off the event loop)
         final_audio_filename = f"podcast_{uuid4().hex}.wav"
-        final_audio_path = concatenate_audio_files(audio_files, final_audio_filename)
+        final_audio_path = await asyncio.to_thread(concatenate_audio_files, audio_files, final_audio_filename)
         
         return {
             "question": question,
@@ -342,7 +422,7 @@ async def generate_conversational_podcast(
             "segments": segment_info,
             "final_audio_path": final_audio_path,
             "user_id": user_id,
-            "sources": rag_response.get('sources', []),
+            "sources": sources,
             "segment_count": len(segments)
         }
         
@@ -370,17 +450,15 @@ async def generate_podcast_from_rag(
     
     try:
         # Generate content using existing RAG system
-        rag_response = await question_answer(
+        podcast_text, sources = await question_answer(
             question=question,
             user_id=user_id,
             conversations_history=[],
             hyde=True,  # Use HyDE for better content generation
-            reranking=True  # Use reranking for better quality
+            reranking=True,  # Use reranking for better quality
+            return_sources=True
         )
         
-        # Extract text content from RAG response
-        podcast_text = rag_response.get('answer', '')
-        
         if not podcast_text:
             raise HTTPRequestException(message="No content generated from RAG system", status_code=500)
         
@@ -405,7 +483,7 @@ async def generate_podcast_from_rag(
             "content": podcast_text,
             "audio_path": audio_path,
             "user_id": user_id,
-            "sources": rag_response.get('sources', [])
+            "sources": sources
         }
         
     except Exception as e:
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict
+
+from ..metrics.collectors import record_admission
+
+
+class AdmissionRejected(Exception):
+    """The wait queue is full, or the request waited longer than the queue timeout."""
+
+    def __init__(self, controller: str, reason: str, retry_after: int = 1):
+        super().__init__(f"{controller} overloaded ({reason})")
+        self.controller = controller
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Async concurrency limiter with a bounded, per-user fair wait queue.
+
+    At most `limit` requests hold a slot. Others wait in a queue of at most
+    `max_queue` entries; freed slots are handed out round-robin across users
+    (FIFO within one user), so one user firing many requests can't starve the
+    rest. Requests that can't be queued, or that wait longer than
+    `queue_timeout` seconds, get AdmissionRejected (HTTP 429). Waiting happens
+    on the event loop and holds no thread. Use from a single event loop.
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiting = 0
+        self._queues: "OrderedDict[Any, Deque[asyncio.Future]]" = OrderedDict()
+
+    def _report(self):
+        record_admission(self.name, active=self._active, waiting=self._waiting)
+
+    async def acquire(self, user: Any = None):
+        started = time.perf_counter()
+        if self._active < self.limit and self._waiting == 0:
+            self._active += 1
+            record_admission(self.name, outcome="admitted", wait=0.0, active=self._active, waiting=self._waiting)
+            return
+
+        if self._waiting >= self.max_queue:
+            record_admission(self.name, outcome="rejected", wait=0.0)
+            raise AdmissionRejected(self.name, "queue full", retry_after=max(1, int(self.queue_timeout / 4)))
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user, deque()).append(waiter)
+        self._waiting += 1
+        self._report()
+        try:
+            await asyncio.wait({waiter}, timeout=self.queue_timeout)
+        except BaseException:
+            # Caller cancelled (client went away) while queued
+            self._abandon(user, waiter)
+            raise
+
+        if not waiter.done():
+            self._abandon(user, waiter)
+            record_admission(self.name, outcome="timeout", wait=time.perf_counter() - started)
+            raise AdmissionRejected(self.name, "queue timeout", retry_after=max(1, int(self.queue_timeout / 4)))
+        # release() handed its slot over to us, _active already counts it
+        record_admission(self.name, outcome="admitted", wait=time.perf_counter() - started,
+                         active=self._active, waiting=self._waiting)
+
+    def _abandon(self, user: Any, waiter: asyncio.Future):
+        if waiter.done() and not waiter.cancelled():
+            # The slot was handed over just as we gave up: pass it on
+            self.release()
+            return
+        waiter.cancel()
+        queue = self._queues.get(user)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[user]
+        self._report()
+
+    def release(self):
+        # Hand the slot to the next user in round-robin order instead of freeing it
+        while self._queues:
+            user, queue = self._queues.popitem(last=False)
+            waiter = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                # This user goes to the back of the line
+                self._queues[user] = queue
+            if not waiter.done():
+                waiter.set_result(None)
+                self._report()
+                return
+        self._active -= 1
+        self._report()
+
+    @asynccontextmanager
+    async def slot(self, user: Any = None):
+        await self.acquire(user)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"limit": self.limit, "active": self._active, "waiting": self._waiting, "users_waiting": len(self._queues)}
@@ -0,0 +1,209 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def answer_scope(user_id: str, document_ids: Optional[List[str]], hyde: bool, reranking: bool, ultrathink: bool) -> str:
+    """Everything besides the question that decides which answer a chat turn gets."""
+    return json.dumps({
+        "user_id": user_id,
+        "document_ids": sorted(document_ids) if document_ids else None,
+        "hyde": hyde,
+        "reranking": reranking,
+        "ultrathink": ultrathink,
+    }, sort_keys=True)
+
+
+def chunk_set_key(chunk_ids: Iterable) -> str:
+    """Order-independent hash of the retrieved chunk IDs (the context the answer was generated from)."""
+    joined = "\n".join(sorted(str(chunk_id) for chunk_id in chunk_ids))
+    return hashlib.sha256(joined.encode("utf-8")).hexdigest()
+
+
+def merge_events(events: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Join consecutive answer/thinking events of the same kind (what gets stored)."""
+    merged = []
+    for event in events:
+        for kind, text in event.items():
+            if merged and kind in merged[-1]:
+                merged[-1][kind] += text
+            else:
+                merged.append({kind: text})
+    return merged
+
+
+def split_events(events: List[Dict[str, str]], max_chars: int) -> List[Dict[str, str]]:
+    """Cut cached answer/thinking text back into stream-sized events for replay."""
+    if max_chars <= 0:
+        return list(events)
+    pieces = []
+    for event in events:
+        for kind, text in event.items():
+            for start in range(0, len(text), max_chars):
+                pieces.append({kind: text[start:start + max_chars]})
+    return pieces
+
+
+class AnswerCache:
+    """
+    Semantic cache of generated chat answers on a SQLite file.
+
+    An entry is found again when the scope (user, document filter, hyde /
+    rerank / ultrathink flags) matches, the retrieval returned the very same set
+    of chunk IDs, and the new question's dense embedding has a cosine similarity
+    of at least `threshold` with the cached one. Entries expire after
+    `ttl_seconds`, the least recently used ones are evicted past `max_bytes`,
+    and every entry citing a document is dropped when that document is
+    inserted again, moved or deleted. Like JobStore, every call opens its own
+    connection so the API and the ingestion workers can share the file.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float, threshold: float):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, scope TEXT NOT NULL, chunks TEXT NOT NULL, "
+                "embedding BLOB NOT NULL, events BLOB NOT NULL, size INTEGER NOT NULL, "
+                "created_at REAL NOT NULL, atime REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_lookup ON answers (scope, chunks)")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_atime ON answers (atime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS answers_created ON answers (created_at)")
+            # Running byte total kept by triggers, so eviction doesn't sum the table on every put
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers_meta (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)"
+            )
+            if conn.execute("SELECT 1 FROM answers_meta").fetchone() is None:
+                conn.execute("INSERT INTO answers_meta (id, total_bytes) SELECT 0, COALESCE(SUM(size), 0) FROM answers")
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS answers_bytes_insert AFTER INSERT ON answers "
+                "BEGIN UPDATE answers_meta SET total_bytes = total_bytes + NEW.size; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS answers_bytes_delete AFTER DELETE ON answers "
+                "BEGIN UPDATE answers_meta SET total_bytes = total_bytes - OLD.size; END"
+            )
+            conn.execute("COMMIT")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_documents ("
+                "answer_id INTEGER NOT NULL, document_id TEXT NOT NULL, PRIMARY KEY (document_id, answer_id))"
+            )
+
+    @contextmanager
+    def _connection(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, scope: str, embedding, chunk_ids: Iterable) -> Optional[List[Dict[str, str]]]:
+        """Cached answer events ({"answer_token"|"thinking_token": text}, in order) or None."""
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, embedding, events FROM answers WHERE scope = ? AND chunks = ? AND created_at > ?",
+                (scope, chunk_set_key(chunk_ids), now - self.ttl_seconds)
+            ).fetchall()
+            best, best_similarity = None, self.threshold
+            for answer_id, stored, events in rows:
+                similarity = float(np.dot(query, np.frombuffer(stored, dtype=np.float32)))
+                if similarity >= best_similarity:
+                    best, best_similarity = (answer_id, events), similarity
+            if best is None:
+                return None
+            conn.execute("UPDATE answers SET atime = ? WHERE id = ?", (now, best[0]))
+        return json.loads(zlib.decompress(best[1]))
+
+    def put(self, scope: str, embedding, chunk_ids: Iterable, document_ids: Iterable[str], events: List[Dict[str, str]]):
+        if not events or self.max_bytes <= 0:
+            return
+        stored = self._normalize(embedding).tobytes()
+        payload = zlib.compress(json.dumps(events).encode("utf-8"))
+        size = len(stored) + len(payload)
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            answer_id = conn.execute(
+                "INSERT INTO answers (scope, chunks, embedding, events, size, created_at, atime) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scope, chunk_set_key(chunk_ids), stored, payload, size, now, now)
+            ).lastrowid
+            conn.executemany(
+                "INSERT OR IGNORE INTO answer_documents (answer_id, document_id) VALUES (?, ?)",
+                [(answer_id, document_id) for document_id in set(document_ids) if document_id]
+            )
+            self._evict(conn, now)
+            conn.execute("COMMIT")
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired entries, then least recently used ones until ~90% of the budget is left."""
+        self._delete(conn, [row[0] for row in conn.execute(
+            "SELECT id FROM answers WHERE created_at <= ?", (now - self.ttl_seconds,)
+        ).fetchall()])
+        total = conn.execute("SELECT total_bytes FROM answers_meta").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        evicted = []
+        cursor = conn.execute("SELECT id, size FROM answers ORDER BY atime")
+        for answer_id, size in cursor:
+            if total <= target:
+                break
+            evicted.append(answer_id)
+            total -= size
+        cursor.close()
+        self._delete(conn, evicted)
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, answer_ids: List[int]):
+        for start in range(0, len(answer_ids), 500):
+            chunk = answer_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            conn.execute(f"DELETE FROM answers WHERE id IN ({placeholders})", chunk)
+            conn.execute(f"DELETE FROM answer_documents WHERE answer_id IN ({placeholders})", chunk)
+
+    def invalidate_documents(self, document_ids: Iterable[str]) -> int:
+        """Drop every cached answer that cited one of the documents; returns how many were dropped."""
+        document_ids = [document_id for document_id in set(document_ids) if document_id]
+        if not document_ids:
+            return 0
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            placeholders = ",".join("?" * len(document_ids))
+            answer_ids = [row[0] for row in conn.execute(
+                f"SELECT DISTINCT answer_id FROM answer_documents WHERE document_id IN ({placeholders})", document_ids
+            ).fetchall()]
+            self._delete(conn, answer_ids)
+            conn.execute("COMMIT")
+        return len(answer_ids)
+
+    def stats(self) -> Dict[str, int]:
+        with self._connection() as conn:
+            entries, size = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM answers), (SELECT total_bytes FROM answers_meta)"
+            ).fetchone()
+        return {"entries": entries, "bytes": size}
@@ -0,0 +1,78 @@
+"""
+In-process WAV assembly for podcasts.
+
+Segments are streamed block by block into one output WAV: a short fade in/out
+at each segment edge (no clicks between speakers) and silence between
+segments. Only one block of PCM frames is in memory at a time, and there is no
+ffmpeg subprocess or temporary file list.
+"""
+
+import wave
+from typing import List
+
+import numpy as np
+
+BLOCK_FRAMES = 65536
+
+# PCM sample widths (bytes) numpy can fade; 24-bit and others are copied as is
+_SAMPLE_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def _fade(block: bytes, start: int, total: int, fade_frames: int, channels: int, sample_width: int) -> bytes:
+    """Apply the fade in/out gains to a block of frames starting at frame `start` of a `total`-frame segment."""
+    dtype = _SAMPLE_DTYPES.get(sample_width)
+    count = len(block) // (channels * sample_width)
+    if dtype is None or fade_frames <= 0 or fade_frames <= start < total - fade_frames - count:
+        return block
+    index = np.arange(start, start + count)
+    gain = np.clip(np.minimum((index + 1) / fade_frames, (total - index) / fade_frames), 0.0, 1.0)
+    samples = np.frombuffer(block, dtype=dtype).reshape(count, channels).astype(np.float64)
+    if sample_width == 1:
+        # 8-bit WAV is unsigned, centred on 128
+        samples = (samples - 128) * gain[:, None] + 128
+    else:
+        samples *= gain[:, None]
+    return np.round(samples).astype(dtype).tobytes()
+
+
+def concatenate_wavs(audio_files: List[str], output_path: str, silence_seconds: float = 0.0,
+                     fade_seconds: float = 0.0) -> str:
+    """Join WAV files (same channels, sample width and rate) into `output_path`."""
+    if not audio_files:
+        raise ValueError("No audio files to concatenate")
+
+    with wave.open(audio_files[0], "rb") as first:
+        channels, sample_width, rate = first.getnchannels(), first.getsampwidth(), first.getframerate()
+    frame_bytes = channels * sample_width
+    fade_frames = int(fade_seconds * rate)
+    silence_frames = int(silence_seconds * rate)
+    silence_byte = b"\x80" if sample_width == 1 else b"\x00"
+
+    with wave.open(output_path, "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(sample_width)
+        out.setframerate(rate)
+
+        for i, path in enumerate(audio_files):
+            if i > 0:
+                remaining = silence_frames
+                while remaining > 0:
+                    count = min(remaining, BLOCK_FRAMES)
+                    out.writeframesraw(silence_byte * (count * frame_bytes))
+                    remaining -= count
+
+            with wave.open(path, "rb") as segment:
+                if (segment.getnchannels(), segment.getsampwidth(), segment.getframerate()) != (channels, sample_width, rate):
+                    raise ValueError(f"{path} has a different audio format than {audio_files[0]}")
+                total = segment.getnframes()
+                # Never fade more than half a (short) segment from each side
+                segment_fade = min(fade_frames, total // 2)
+                position = 0
+                while True:
+                    block = segment.readframes(BLOCK_FRAMES)
+                    if not block:
+                        break
+                    out.writeframesraw(_fade(block, position, total, segment_fade, channels, sample_width))
+                    position += len(block) // frame_bytes
+
+    return output_path
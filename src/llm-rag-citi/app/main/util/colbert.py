@@ -0,0 +1,137 @@
+import struct
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+from .kvstore import SQLiteKV
+
+# Packed entry: dtype code (u8) + tokens (u32) + dim (u32), then
+#   float16: float16[tokens, dim]
+#   int8:    float32[tokens] per-token scales + int8[tokens, dim]
+ENTRY_HEADER = struct.Struct("<BII")
+DTYPE_CODES = {"float16": 0, "int8": 1}
+
+
+def pack_colbert(vectors, dtype: str = "int8") -> bytes:
+    """Compress one chunk's ColBERT token vectors (tokens, dim) to float16 or symmetric per-token int8."""
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unknown ColBERT store dtype '{dtype}', choose one of {', '.join(DTYPE_CODES)}")
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.size == 0 and vectors.ndim != 2:
+        vectors = vectors.reshape(0, 0)
+    if vectors.ndim != 2:
+        raise ValueError("ColBERT vectors must be a (tokens, dim) matrix")
+    tokens, dim = vectors.shape
+    header = ENTRY_HEADER.pack(DTYPE_CODES[dtype], tokens, dim)
+
+    if dtype == "float16":
+        return header + vectors.astype(np.float16).tobytes()
+
+    scales = np.abs(vectors).max(axis=1) / 127.0 if tokens else np.empty(0, dtype=np.float32)
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    quantized = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return header + scales.tobytes() + quantized.tobytes()
+
+
+def unpack_colbert(blob: bytes) -> np.ndarray:
+    """Inverse of `pack_colbert`, always returns float32 (tokens, dim)."""
+    code, tokens, dim = ENTRY_HEADER.unpack_from(blob)
+    offset = ENTRY_HEADER.size
+
+    if code == DTYPE_CODES["float16"]:
+        return np.frombuffer(blob, dtype=np.float16, count=tokens * dim, offset=offset) \
+            .reshape(tokens, dim).astype(np.float32)
+
+    scales = np.frombuffer(blob, dtype=np.float32, count=tokens, offset=offset)
+    quantized = np.frombuffer(blob, dtype=np.int8, count=tokens * dim, offset=offset + tokens * 4)
+    return quantized.reshape(tokens, dim).astype(np.float32) * scales[:, None]
+
+
+def maxsim_scores(query, documents: List[np.ndarray]) -> np.ndarray:
+    """
+    ColBERT late-interaction score of `query` (q_tokens, dim) against every document:
+    for each query token the best matching document token, averaged over the
+    query tokens (same normalisation as BGE-M3's colbert_score). All candidates
+    are scored with one matrix product over their concatenated token vectors.
+    """
+    query = np.asarray(query, dtype=np.float32)
+    scores = np.zeros(len(documents), dtype=np.float32)
+    lengths = np.fromiter((len(doc) for doc in documents), dtype=np.int64, count=len(documents))
+    present = lengths > 0
+    if len(query) == 0 or not present.any():
+        return scores
+
+    tokens = np.concatenate([doc for doc in documents if len(doc)], axis=0)
+    similarities = query @ tokens.T  # (q_tokens, all candidate tokens)
+    starts = np.concatenate(([0], np.cumsum(lengths[present])[:-1]))
+    best = np.maximum.reduceat(similarities, starts, axis=1)  # (q_tokens, candidates)
+    scores[present] = best.sum(axis=0) / len(query)
+    return scores
+
+
+def colbert_rerank(hits: Iterable, query_colbert, stored: Dict[str, np.ndarray], keys: List[str],
+                   limit: int) -> List[Dict[str, Any]]:
+    """
+    Re-order hybrid search hits by MaxSim. `keys[i]` is the store key of `hits[i]`;
+    hits without stored vectors (ingested before ColBERT was enabled, or evicted)
+    keep their hybrid order after the scored ones with a score of -1.
+    Returns hit-shaped dicts ({id, distance, entity}) so merging works unchanged.
+    """
+    hits = list(hits)
+    scored = [index for index, key in enumerate(keys) if key in stored]
+    scores = np.full(len(hits), -1.0, dtype=np.float32)
+    if scored:
+        scores[scored] = maxsim_scores(query_colbert, [stored[keys[index]] for index in scored])
+
+    # Stable sort: ties (and unscored hits) stay in hybrid order
+    order = np.argsort(-scores, kind="stable")[:limit]
+    return [
+        {"id": hits[index]["id"], "distance": float(scores[index]), "entity": hits[index]["entity"]}
+        for index in order
+    ]
+
+
+class ColbertStore:
+    """
+    Compressed ColBERT token vectors per chunk, written at ingest time and read
+    back for the candidates of each reranked search.
+
+    Keys are "<collection>/<document_id>/<user_id>/<chunk id>", the same scope as
+    the Milvus rows, so a document's vectors in one collection (and for one user)
+    can be dropped or moved with one range operation. Backed by a size-bounded
+    SQLiteKV shared by the API and the job workers; evicted chunks simply lose
+    their MaxSim score.
+    """
+
+    def __init__(self, path: str, max_bytes: int, dtype: str = "int8"):
+        if dtype not in DTYPE_CODES:
+            raise ValueError(f"Unknown ColBERT store dtype '{dtype}', choose one of {', '.join(DTYPE_CODES)}")
+        self.dtype = dtype
+        self.kv = SQLiteKV(path, max_bytes, table="colbert")
+
+    @staticmethod
+    def key(collection_name: str, user_id: str, document_id: str, chunk_id: str) -> str:
+        return f"{collection_name}/{document_id}/{user_id}/{chunk_id}"
+
+    @staticmethod
+    def _prefix(collection_name: str, document_id: str, user_id: str = None) -> str:
+        # Without a user_id: the document's vectors of every user in the collection
+        return f"{collection_name}/{document_id}/{user_id}/" if user_id else f"{collection_name}/{document_id}/"
+
+    def put_many(self, items: Dict[str, Any]):
+        self.kv.put_many({key: pack_colbert(vectors, self.dtype) for key, vectors in items.items()})
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        return {key: unpack_colbert(blob) for key, blob in self.kv.get_many(keys).items()}
+
+    def delete_document(self, collection_name: str, document_id: str, user_id: str = None):
+        self.kv.delete_prefix(self._prefix(collection_name, document_id, user_id))
+
+    def move_document(self, document_id: str, source_collection_name: str, target_collection_name: str,
+                      user_id: str = None):
+        """Follow a document moved between collections (the chunk ids are kept by the move)."""
+        self.kv.rename_prefix(self._prefix(source_collection_name, document_id, user_id),
+                              self._prefix(target_collection_name, document_id, user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"dtype": self.dtype, "disk_bytes": self.kv.total_bytes}
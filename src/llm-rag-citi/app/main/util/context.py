@@ -0,0 +1,202 @@
+"""
+Token-budgeted context assembly for the chat prompt.
+
+Retrieved chunks arrive in score order and often repeat themselves: SentenceSplitter
+chunks overlap, and the same text can come back from both the private and the
+public collection. pack_context() drops near-duplicates, merges page-adjacent
+chunks of the same document into one quote, and packs the result in score order
+up to a token budget counted with the generation model's tokenizer.
+"""
+
+import math
+import re
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..constant.context import (
+    CONTEXT_PACKING_ENABLED, CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUP_THRESHOLD, CONTEXT_SHINGLE_SIZE,
+    CONTEXT_MERGE_ADJACENT, CONTEXT_TOKENIZER, CONTEXT_CHARS_PER_TOKEN
+)
+
+SNIPPET_SEPARATOR = "\n\n---\n\n"
+WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Shortest overlap between two merged chunks that is treated as SentenceSplitter overlap
+MIN_OVERLAP_CHARS = 20
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            if CONTEXT_TOKENIZER:
+                try:
+                    from transformers import AutoTokenizer
+                    _tokenizer = AutoTokenizer.from_pretrained(CONTEXT_TOKENIZER)
+                    print(f"Context tokenizer loaded: {CONTEXT_TOKENIZER}")
+                except Exception as e:
+                    print(f"Context tokenizer {CONTEXT_TOKENIZER} not available ({e}), estimating tokens from characters")
+            _tokenizer_loaded = True
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of `text` for the generation model, or an estimate when its tokenizer isn't available."""
+    tokenizer = _tokenizer if _tokenizer_loaded else _load_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return math.ceil(len(text) / CONTEXT_CHARS_PER_TOKEN)
+
+
+def format_snippet(doc: dict, pages: Optional[str] = None) -> str:
+    return (
+        f"Sumber Informasi:\n"
+        f"  - Dokumen: {doc.get('document_name', 'N/A')}\n"
+        f"  - Halaman: {pages if pages is not None else doc.get('page_number', 'N/A')}\n"
+        f"  - Koleksi: {doc.get('source', 'N/A')}\n"
+        f"Isi Kutipan:\n"
+        f"\"{doc.get('content', 'N/A')}\""
+    )
+
+
+def shingles(text: str, size: int = CONTEXT_SHINGLE_SIZE) -> set:
+    """Hashed word n-grams of `text` (the whole text as one shingle when it is shorter than `size` words)."""
+    words = [word.lower() for word in WORD_PATTERN.findall(text)]
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))}
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def drop_near_duplicates(docs: List[dict], threshold: float = CONTEXT_DEDUP_THRESHOLD,
+                         size: int = CONTEXT_SHINGLE_SIZE) -> List[dict]:
+    """Keep each chunk unless a better-ranked kept chunk has shingle Jaccard >= threshold with it."""
+    kept, kept_shingles = [], []
+    for doc in docs:
+        doc_shingles = shingles(doc.get('content') or "", size)
+        if any(jaccard(doc_shingles, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(doc_shingles)
+    return kept
+
+
+def join_overlapping(first: str, second: str) -> str:
+    """Concatenate two consecutive chunks, writing the text they overlap on only once."""
+    head = second[:MIN_OVERLAP_CHARS]
+    if len(head) == MIN_OVERLAP_CHARS:
+        start = first.find(head)
+        while start >= 0:
+            if second.startswith(first[start:]):
+                return first[:start] + second
+            start = first.find(head, start + 1)
+    return f"{first}\n{second}"
+
+
+def _page(doc: dict) -> Optional[int]:
+    try:
+        return int(doc.get('page_number'))
+    except (TypeError, ValueError):
+        return None
+
+
+def merge_adjacent(docs: List[dict]) -> List[Tuple[dict, Optional[str]]]:
+    """
+    Group chunks of the same document whose pages are equal or consecutive.
+    Returns (doc, pages label) in the rank of each group's best chunk; a merged
+    doc is a copy with the group's contents joined in page order.
+    """
+    groups = []  # [rank order of members, pages]
+    for doc in docs:
+        page = _page(doc)
+        group = None
+        if page is not None and doc.get('document_id') is not None:
+            group = next((
+                candidate for candidate in groups
+                if candidate[0][0].get('document_id') == doc.get('document_id')
+                and candidate[0][0].get('source') == doc.get('source')
+                and any(abs(page - other) <= 1 for other in candidate[1])
+            ), None)
+        if group is None:
+            groups.append([[doc], {page} if page is not None else set()])
+        else:
+            group[0].append(doc)
+            group[1].add(page)
+
+    merged = []
+    for members, pages in groups:
+        if len(members) == 1:
+            merged.append((members[0], None))
+            continue
+        ordered = sorted(members, key=_page)  # stable: same page keeps rank order
+        content = ordered[0].get('content') or ""
+        for member in ordered[1:]:
+            content = join_overlapping(content, member.get('content') or "")
+        first, last = min(pages), max(pages)
+        merged.append(({**members[0], 'content': content}, str(first) if first == last else f"{first}-{last}"))
+    return merged
+
+
+def pack_context(docs: List[dict], budget: int = CONTEXT_TOKEN_BUDGET,
+                 tokens: Callable[[str], int] = count_tokens) -> Tuple[str, Dict]:
+    """
+    Context string for the prompt from chunks in score order.
+
+    Returns (context, stats); stats has the chunk counts, the context tokens and
+    the tokens saved per step ("duplicate", "merge", "budget") relative to
+    joining every chunk as is.
+    """
+    def snippet_tokens(items) -> int:
+        return sum(tokens(format_snippet(doc, pages)) for doc, pages in items)
+
+    raw = [(doc, None) for doc in docs]
+    raw_tokens = snippet_tokens(raw)
+    if not CONTEXT_PACKING_ENABLED:
+        context = SNIPPET_SEPARATOR.join(format_snippet(doc) for doc in docs)
+        return context, {"chunks": len(docs), "packed_chunks": len(docs), "tokens": raw_tokens,
+                         "saved": {"duplicate": 0, "merge": 0, "budget": 0}}
+
+    unique = drop_near_duplicates(docs)
+    unique_tokens = snippet_tokens([(doc, None) for doc in unique])
+    groups = merge_adjacent(unique) if CONTEXT_MERGE_ADJACENT else [(doc, None) for doc in unique]
+
+    separator_tokens = tokens(SNIPPET_SEPARATOR)
+    merged_tokens, packed, used = 0, [], 0
+    for doc, pages in groups:
+        snippet = format_snippet(doc, pages)
+        cost = tokens(snippet)
+        merged_tokens += cost
+        extra = cost + (separator_tokens if packed else 0)
+        if budget <= 0 or used + extra <= budget:
+            packed.append(snippet)
+            used += extra
+
+    if not packed and groups:
+        # Even the best chunk alone is over budget: keep a truncated copy of it rather than nothing
+        doc, pages = groups[0]
+        content = doc.get('content') or ""
+        while content and tokens(format_snippet({**doc, 'content': content}, pages)) > budget:
+            content = content[:int(len(content) * 0.9)]
+        packed.append(format_snippet({**doc, 'content': content}, pages))
+
+    context = SNIPPET_SEPARATOR.join(packed)
+    packed_tokens = tokens(context) if packed else 0
+    return context, {
+        "chunks": len(docs),
+        "packed_chunks": len(packed),
+        "tokens": packed_tokens,
+        "saved": {
+            "duplicate": raw_tokens - unique_tokens,
+            "merge": max(0, unique_tokens - merged_tokens),
+            "budget": max(0, merged_tokens - sum(tokens(snippet) for snippet in packed)),
+        },
+    }
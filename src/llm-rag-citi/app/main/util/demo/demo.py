@@ -2,6 +2,7 @@
 import copy
 import json
 import os
+import tempfile
 from pathlib import Path
 
 from loguru import logger
@@ -174,7 +175,8 @@ def parse_doc(
         method="auto",
         server_url=None,
         start_page_id=0,
-        end_page_id=None
+        end_page_id=None,
+        debug=False
 ):
     """
         Parameter description:
@@ -198,6 +200,9 @@ def parse_doc(
         server_url: When the backend is `sglang-client`, you need to specify the server_url, for example:`http://127.0.0.1:30000`
         start_page_id: Start page ID for parsing, default is 0
         end_page_id: End page ID for parsing, default is None (parse all pages until the end of the document)
+        debug: Write the layout/span drawings, middle JSON, model output, content list and original PDF to
+            output_dir. Off by default: only the returned content list is produced and extracted images go
+            to a scratch directory removed afterwards.
     """
     try:
         file_name_list = []
@@ -209,17 +214,37 @@ def parse_doc(
             file_name_list.append(file_name)
             pdf_bytes_list.append(pdf_bytes)
             lang_list.append(lang)
-        contents = do_parse(
-            output_dir=output_dir,
-            pdf_file_names=file_name_list,
-            pdf_bytes_list=pdf_bytes_list,
-            p_lang_list=lang_list,
-            backend=backend,
-            parse_method=method,
-            server_url=server_url,
-            start_page_id=start_page_id,
-            end_page_id=end_page_id
-        )
+        if debug:
+            contents = do_parse(
+                output_dir=output_dir,
+                pdf_file_names=file_name_list,
+                pdf_bytes_list=pdf_bytes_list,
+                p_lang_list=lang_list,
+                backend=backend,
+                parse_method=method,
+                server_url=server_url,
+                start_page_id=start_page_id,
+                end_page_id=end_page_id
+            )
+        else:
+            with tempfile.TemporaryDirectory(prefix="mineru-") as scratch_dir:
+                contents = do_parse(
+                    output_dir=scratch_dir,
+                    pdf_file_names=file_name_list,
+                    pdf_bytes_list=pdf_bytes_list,
+                    p_lang_list=lang_list,
+                    backend=backend,
+                    parse_method=method,
+                    server_url=server_url,
+                    f_draw_layout_bbox=False,
+                    f_draw_span_bbox=False,
+                    f_dump_middle_json=False,
+                    f_dump_model_output=False,
+                    f_dump_orig_pdf=False,
+                    f_dump_content_list=False,
+                    start_page_id=start_page_id,
+                    end_page_id=end_page_id
+                )
     except Exception as e:
         logger.exception(e)
         
@@ -243,7 +268,7 @@ if __name__ == '__main__':
     # os.environ['MINERU_MODEL_SOURCE'] = "modelscope"
 
     """Use pipeline mode if your environment does not support VLM"""
-    parse_doc(doc_path_list, output_dir, backend="pipeline")
+    parse_doc(doc_path_list, output_dir, backend="pipeline", debug=True)
 
     """To enable VLM mode, change the backend to 'vlm-xxx'"""
     # parse_doc(doc_path_list, output_dir, backend="vlm-transformers")  # more general.
@@ -3,34 +3,142 @@ from pymilvus import utility, Collection
 from llama_index.core.node_parser import SentenceSplitter
 import os
 from pymilvus import AnnSearchRequest, Function, FunctionType, WeightedRanker
-import paramiko
 from llama_index.core import Settings
 from ..constant.document import ACCEPTED_FILES, DOCUMENT_READERS_PYMU, CHUNK_SIZE, CHUNK_OVERLAP, NUMBER_RETRIEVAL, DOCUMENT_DIR, DOCUMENT_READERS_DOCLING
+from ..constant.document import DOCUMENT_FIELDS, MOVE_BATCH_SIZE, NUMBER_RETRIEVAL_MERGED, RETRIEVAL_WORKERS, RRF_K
+from ..constant.index import get_search_params
+from ..constant.rerank import RERANKER, VLLM_RERANKER_URL, COLBERT_CANDIDATES
+from ..constant.sftp import QNAP_SFTP_PRIVATE_DIR, QNAP_SFTP_PUBLIC_DIR
 # from ...main import embedding_model
 from ..response import HTTPRequestException
-from ...main import langchain_embedding_model
-from app.main.util.demo.demo import parse_doc
+from ...main import langchain_embedding_model, embedding_cache, collection_registry, colbert_store, parse_cache, sftp_transfer
+from .colbert import colbert_rerank
+from ..metrics.collectors import time_stage, record_stage, record_rerank_fallback
+from .mineru import iter_mineru_items
+from .sftp import SFTPConnectionError
 from llama_index.core.schema import Document
+import hashlib
 import re
+import time
 # import requests
 
 from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import partial
+
+# Private and public searches run side by side on this pool
+retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+
+# Dense search params matching the index the collections were built with (MILVUS_INDEX_PROFILE)
+DENSE_SEARCH_PARAMS = get_search_params()
 
 def check_document_validation(tag:str) -> bool:
     return tag in ACCEPTED_FILES
 
 
 def check_collection_validation(collection_name:str) -> bool:
-    return utility.has_collection(collection_name)
+    return collection_registry.exists(collection_name)
 
 
 def check_document_exists(document_path:str) -> bool:
     return os.path.isfile(document_path)
 
 
-def document_to_embeddings(content: str) -> List[float]:
+def document_expr(document_id:str, collection_name:str, user_id:str=None) -> str:
+    """
+    Filter for one document's rows. On 'private' the user_id (partition key) is added
+    so Milvus only touches that user's partition.
+    """
+    if collection_name == 'private' and user_id:
+        return f"document_id == '{document_id}' && user_id == '{user_id}'"
+    return f"document_id == '{document_id}'"
+
+
+def colbert_scope(collection_name:str, user_id:str=None):
+    """user_id narrowing the ColBERT vectors of a document, matching document_expr (only 'private' is per user)."""
+    return user_id if collection_name == 'private' else None
+
+
+def document_in_collection(document_id:str, collection_name:str, user_id:str=None) -> bool:
+    res = collection_registry.get(collection_name).query(expr=document_expr(document_id, collection_name, user_id), output_fields=["id"], limit=1)
+    return len(res) > 0
+
+
+def copy_document_rows(document_id:str, source_collection_name:str, target_collection_name:str, user_id:str=None) -> int:
+    """
+    Copy every chunk of a document (vectors, sparse vectors, content, page numbers)
+    into another collection, page by page with a query iterator.
+    Upsert keeps the same primary keys, so re-running after a partial copy is safe.
+    """
+    source = collection_registry.get(source_collection_name)
+    target = collection_registry.get(target_collection_name)
+
+    iterator = source.query_iterator(
+        batch_size=MOVE_BATCH_SIZE,
+        expr=document_expr(document_id, source_collection_name, user_id),
+        output_fields=DOCUMENT_FIELDS
+    )
+    copied = 0
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            target.upsert(data=[{field: row[field] for field in DOCUMENT_FIELDS} for row in rows])
+            copied += len(rows)
+    finally:
+        iterator.close()
+
+    target.flush()
+    return copied
+
+
+def document_to_embeddings(content: str, return_colbert: bool = False) -> List[float]:
     print('embedding content:', content)
-    return langchain_embedding_model.embed_with_hybrid_support(content)
+    with time_stage("embedding", "colbert" if return_colbert else "hybrid"):
+        if embedding_cache is not None:
+            cached = embedding_cache.get(content, colbert=return_colbert)
+            if cached is not None:
+                return cached
+        embeddings = langchain_embedding_model.embed_with_hybrid_support(content, return_colbert=return_colbert)
+        if embedding_cache is not None:
+            embedding_cache.put(content, embeddings, colbert=return_colbert)
+        return embeddings
+
+async def adocument_to_embeddings(content: str, return_colbert: bool = False) -> dict:
+    """Async twin of `document_to_embeddings` for the async chat path."""
+    print('embedding content:', content)
+    with time_stage("embedding", "colbert" if return_colbert else "hybrid"):
+        if embedding_cache is not None:
+            cached = embedding_cache.get(content, colbert=return_colbert)
+            if cached is not None:
+                return cached
+        embeddings = await langchain_embedding_model.aembed_with_hybrid_support(content, return_colbert=return_colbert)
+        if embedding_cache is not None:
+            embedding_cache.put(content, embeddings, colbert=return_colbert)
+        return embeddings
+
+def documents_to_embeddings(contents: List[str], return_colbert: bool = False) -> List[dict]:
+    """
+    Dense + sparse embeddings for many chunks via the batched /embed/batch endpoint.
+    `return_colbert` adds the ColBERT token vectors; those are too large for the
+    embedding cache, so every chunk goes to the service (dense/sparse still get cached).
+    """
+    print(f'embedding {len(contents)} contents in batches')
+    if return_colbert:
+        embeddings = langchain_embedding_model.embed_documents_with_hybrid_support(contents, return_colbert=True)
+        if embedding_cache is not None:
+            embedding_cache.put_many(contents, embeddings)
+        return embeddings
+    if embedding_cache is not None:
+        # Only chunks whose text was never embedded before hit the service
+        return embedding_cache.get_or_embed(contents, langchain_embedding_model.embed_documents_with_hybrid_support)
+    return langchain_embedding_model.embed_documents_with_hybrid_support(contents)
+
+def query_to_colbert(query: str):
+    """ColBERT token vectors of the (raw) question, used by the MaxSim reranker."""
+    return document_to_embeddings(query, return_colbert=True)["colbert"]
 
 def clean_text(text: str) -> str:
     """Membersihkan teks dari karakter aneh dan spasi berlebih."""
@@ -48,7 +156,17 @@ def clean_text(text: str) -> str:
     cleaned = re.sub(r'\$[^\$]*\$', '', cleaned)
     return cleaned
 
+def cached_parse(file_path:str, tag:str, parser:str, parse, data:bytes=None):
+    """Documents from the parse cache when these exact bytes were parsed before, else from parse() (then cached)."""
+    if parse_cache is None:
+        return parse()
+    digest = hashlib.sha256(data).hexdigest() if data is not None else None
+    return parse_cache.cached(file_path, tag, parser, parse, digest=digest)
+
 def read_file(file_path:str, tag:str, parser:str="pymu"):
+    return list(cached_parse(file_path, tag, parser, lambda: _read_file(file_path, tag, parser) or []))
+
+def _read_file(file_path:str, tag:str, parser:str="pymu"):
     loader = DOCUMENT_READERS_DOCLING if parser == "docling" else DOCUMENT_READERS_PYMU
     loader = loader[tag]
     if tag in ['pdf', 'md',  'html', 'htm', 'ipynb', 
@@ -64,19 +182,11 @@ def read_file(file_path:str, tag:str, parser:str="pymu"):
         return loader_cls.load_data(file_path)
     
 def read_file_mineru(file_path:str, tag:str, parser:str="mineru"):
+    return list(cached_parse(file_path, tag, parser, lambda: iter_file_mineru(file_path, tag)))
 
-    contents_list = parse_doc(
-        path_list=[file_path],
-        output_dir="output",
-        lang="en",
-        backend="pipeline",
-        method="auto"
-    )
-    
-    parsed_items = contents_list[0]
-    
-    # Siapin 'keranjang' buat nampung banyak Document
-    documents = []
+def iter_file_mineru(file_path:str, tag:str):
+    """MinerU items as Documents, streamed as the page ranges are parsed (see util/mineru.py)."""
+    parsed_items = iter_mineru_items(file_path, tag, lang="en", backend="pipeline", method="auto")
 
     for item in parsed_items:
         text_chunk = item.get("text", "")
@@ -88,7 +198,7 @@ def read_file_mineru(file_path:str, tag:str, parser:str="mineru"):
             continue
 
         # Bikin satu Document buat tiap chunk teks
-        doc = Document(
+        yield Document(
             text=cleaned_text,
             # METADATA SEKARANG ADA NOMOR HALAMANNYA!
             metadata={
@@ -96,10 +206,36 @@ def read_file_mineru(file_path:str, tag:str, parser:str="mineru"):
                 "source": page_number + 1 # page_idx mulai dari 0, kita jadiin 1
             }
         )
-        documents.append(doc)
-    return documents
 
 
+def iter_documents(file_path:str, tag:str, parser:str="pymu", data:bytes=None):
+    """
+    Yield parsed documents one by one. PDFs read with PyMuPDF are streamed page by page
+    (same text and metadata as PyMuPDFReader) and MinerU items range by range, so chunking
+    and embedding can start on the first pages; every other reader still loads the whole
+    file first. All of them go through the parse cache, so the same bytes are parsed only once.
+    `data` (PyMuPDF PDFs only) is the file content already in memory, file_path isn't read then.
+    """
+    if parser == "mineru":
+        yield from cached_parse(file_path, tag, parser, lambda: iter_file_mineru(file_path, tag))
+        return
+    if tag != 'pdf' or parser != "pymu":
+        yield from read_file(file_path, tag, parser=parser)
+        return
+
+    yield from cached_parse(file_path, tag, parser, lambda: iter_pdf_pages(file_path, data), data=data)
+
+def iter_pdf_pages(file_path:str, data:bytes=None):
+    import fitz  # PyMuPDF
+
+    with (fitz.open(stream=data, filetype="pdf") if data is not None else fitz.open(file_path)) as doc:
+        total_pages = len(doc)
+        for page in doc:
+            yield Document(
+                text=page.get_text(),
+                metadata={"total_pages": total_pages, "file_path": file_path, "source": f"{page.number + 1}"}
+            )
+
 def split_documents(document_data):
     # splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
     splitter = SentenceSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP, include_metadata=True)
@@ -148,9 +284,24 @@ def split_documents(document_data):
     
 #     return res[0]
 
-def retrieve_documents_from_vdb(embeddings, collection_name:str, reranking:bool=False, user_id=None, query:str=None, sparse_embeddings=None, document_ids: list[str] = None):
-    collection = Collection(collection_name)
-    base_params = {"metric_type": 'IP'}  # Use IP for hybrid search compatibility
+def retrieve_documents_from_vdb(embeddings, collection_name:str, reranking:bool=False, user_id=None, query:str=None, sparse_embeddings=None, document_ids: list[str] = None, query_colbert=None):
+    hits, _ = run_timed_search(
+        collection_name,
+        lambda: search_collection(embeddings, collection_name, reranking, user_id, query, sparse_embeddings, document_ids, query_colbert)
+    )
+    return hits
+
+
+def search_collection(embeddings, collection_name:str, reranking:bool=False, user_id=None, query:str=None, sparse_embeddings=None, document_ids: list[str] = None, query_colbert=None):
+    """
+    Same search as `retrieve_documents_from_vdb`, but also returns which scorer produced
+    the hit scores ("colbert", "vllm_rerank", "weighted" or "dense") so results can be merged.
+    With RERANKER=colbert, `query_colbert` (the question's ColBERT vectors) is embedded
+    here when the caller didn't pass it.
+    """
+    collection = collection_registry.get(collection_name)
+    # IP for hybrid search compatibility, plus ef/nprobe of the configured index profile
+    base_params = DENSE_SEARCH_PARAMS
 
     filters = []
 
@@ -171,12 +322,16 @@ def retrieve_documents_from_vdb(embeddings, collection_name:str, reranking:bool=
             raise ValueError("Query parameter is required when reranking is enabled")
         if sparse_embeddings is None:
             raise ValueError("Sparse embeddings are required for hybrid search")
+
+        use_colbert = RERANKER == "colbert" and colbert_store is not None
+        # ColBERT re-scores a wider candidate pool, it's cheap enough on CPU
+        candidate_limit = max(COLBERT_CANDIDATES, NUMBER_RETRIEVAL) if use_colbert else NUMBER_RETRIEVAL * 2
             
         # Create dense vector search request
         dense_search_params = {
             "data": [embeddings],  # Dense embeddings
             "anns_field": "vector",
-            "limit": NUMBER_RETRIEVAL * 2,
+            "limit": candidate_limit,
             "param": base_params
         }
         
@@ -187,7 +342,7 @@ def retrieve_documents_from_vdb(embeddings, collection_name:str, reranking:bool=
         sparse_search_params = {
             "data": [sparse_embeddings],  # Sparse embeddings (different from dense)
             "anns_field": "sparse_vector", 
-            "limit": NUMBER_RETRIEVAL * 2,
+            "limit": candidate_limit,
             "param": {"metric_type": "IP"}  # Sparse vectors typically use Inner Product
         }
         
@@ -207,45 +362,55 @@ def retrieve_documents_from_vdb(embeddings, collection_name:str, reranking:bool=
                 "reranker": "model",
                 "provider": "vllm", 
                 "queries": [query],
-                "endpoint": "http://localhost:8080",  # Standard vLLM endpoint
+                "endpoint": VLLM_RERANKER_URL,  # Standard vLLM endpoint
                 # "maxBatch": 64,
                 # "truncate_prompt_tokens": 256,
             }
         )
         
+        reranker = "colbert" if use_colbert else "vllm_rerank"
         try:
-            # Perform hybrid search with built-in reranking
-            hybrid_results = collection.hybrid_search(
-                reqs=[dense_req, sparse_req],
-                rerank=vllm_ranker,  # Use 'rerank' parameter instead of 'ranker'
-                limit=NUMBER_RETRIEVAL,
-                output_fields=["document_id", "content", "document_name", "page_number"],
-            )
+            with time_stage("rerank", reranker):
+                if use_colbert:
+                    if query_colbert is None:
+                        query_colbert = query_to_colbert(query)
+                    return colbert_search(collection, [dense_req, sparse_req], query_colbert), "colbert"
+
+                # Perform hybrid search with built-in reranking
+                hybrid_results = collection.hybrid_search(
+                    reqs=[dense_req, sparse_req],
+                    rerank=vllm_ranker,  # Use 'rerank' parameter instead of 'ranker'
+                    limit=NUMBER_RETRIEVAL,
+                    output_fields=["document_id", "content", "document_name", "page_number"],
+                )
             
-            # print('========================== HYBRID SEARCH RESULTS ==============================')
-            # print('hybrid_results', hybrid_results)
+                # print('========================== HYBRID SEARCH RESULTS ==============================')
+                # print('hybrid_results', hybrid_results)
             
-            # Return the first (and usually only) result set from hybrid search
-            return hybrid_results[0] if hybrid_results else []
+                # Return the first (and usually only) result set from hybrid search
+                return (hybrid_results[0] if hybrid_results else []), "vllm_rerank"
             
         except Exception as e:
             print(f"Error with hybrid search (with reranker): {e}")
+            record_rerank_fallback(reranker, "weighted")
             
             try:
                 # First fallback: Try hybrid search without custom reranker (use WeightedRanker)
                 print("Trying hybrid search with WeightedRanker...")
                 
-                hybrid_results = collection.hybrid_search(
-                    reqs=[dense_req, sparse_req],
-                    rerank=WeightedRanker(0.5, 0.5),  # Equal weights for dense and sparse
-                    limit=NUMBER_RETRIEVAL,
-                    output_fields=["document_id", "content","document_name", "page_number"]
-                )
+                with time_stage("rerank", "weighted"):
+                    hybrid_results = collection.hybrid_search(
+                        reqs=[dense_req, sparse_req],
+                        rerank=WeightedRanker(0.5, 0.5),  # Equal weights for dense and sparse
+                        limit=NUMBER_RETRIEVAL,
+                        output_fields=["document_id", "content","document_name", "page_number"]
+                    )
                 
-                return hybrid_results[0] if hybrid_results else []
+                return (hybrid_results[0] if hybrid_results else []), "weighted"
                 
             except Exception as e2:
                 print(f"Error with hybrid search (WeightedRanker): {e2}")
+                record_rerank_fallback("weighted", "dense")
                 # Final fallback: Dense search only
                 print("Falling back to dense search only...")
                 
@@ -263,7 +428,7 @@ def retrieve_documents_from_vdb(embeddings, collection_name:str, reranking:bool=
 
                 # 3. Tembak query sekali aja pake parameter yang udah disiapin
                 fallback_results = collection.search(**fallback_search_params)
-                return fallback_results[0] if fallback_results else []
+                return (fallback_results[0] if fallback_results else []), "dense"
             
     else:
         # Non-reranking case - single vector search
@@ -284,98 +449,154 @@ def retrieve_documents_from_vdb(embeddings, collection_name:str, reranking:bool=
                 limit=NUMBER_RETRIEVAL,
                 output_fields=["document_id", "content","document_name", "page_number"]
             )
-        return res[0] if res else []
+        return (res[0] if res else []), "dense"
 
-def create_sftp_client():
-    client = paramiko.SSHClient()
-    client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-    return client
+
+def colbert_search(collection, reqs, query_colbert) -> List[dict]:
+    """
+    Hybrid (dense + sparse) candidates re-scored locally with ColBERT MaxSim
+    against the token vectors stored at ingest time.
+    """
+    candidates = collection.hybrid_search(
+        reqs=reqs,
+        rerank=WeightedRanker(0.5, 0.5),
+        limit=max(COLBERT_CANDIDATES, NUMBER_RETRIEVAL),
+        output_fields=["document_id", "content", "document_name", "page_number", "user_id"]
+    )
+    hits = candidates[0] if candidates else []
+    keys = [colbert_store.key(collection.name, hit['entity']['user_id'], hit['entity']['document_id'], hit['id']) for hit in hits]
+    stored = colbert_store.get_many(keys)
+    if len(stored) < len(keys):
+        print(f"ColBERT vectors missing for {len(keys) - len(stored)}/{len(keys)} candidates")
+    reranked = colbert_rerank(hits, query_colbert, stored, keys, NUMBER_RETRIEVAL)
+    # user_id was only needed for the store keys, the other scorers don't return it
+    for hit in reranked:
+        hit['entity'] = {field: value for field, value in hit['entity'].items() if field != 'user_id'}
+    return reranked
+
+
+def merge_search_results(results: dict, top_k: int) -> List[dict]:
+    """
+    Merge per-collection hits into one top-k list.
+    `results` maps a source label ('Private', 'Public') to (hits, scorer). Hits from the
+    same scorer share a score scale and are ranked by score; if the collections fell back
+    to different scorers, reciprocal rank fusion is used instead.
+    """
+    scorers = {scorer for hits, scorer in results.values() if len(hits) > 0}
+    use_rrf = len(scorers) > 1
+
+    merged = []
+    for source_label, (hits, _) in results.items():
+        for rank, hit in enumerate(hits):
+            score = 1.0 / (RRF_K + rank + 1) if use_rrf else float(hit['distance'])
+            merged.append({**hit['entity'], 'id': hit['id'], 'source': source_label, 'score': score})
+
+    merged.sort(key=lambda doc: doc['score'], reverse=True)
+    return merged[:top_k]
+
+
+def run_timed_search(collection_name: str, search):
+    """One collection's search on its registry handle, recorded as a retrieval stage."""
+    with time_stage("retrieval", collection_name):
+        return collection_registry.run(collection_name, search)
+
+
+def retrieve_documents_from_collections(embeddings, sparse_embeddings=None, query:str=None, reranking:bool=False, user_id=None, document_ids: list[str] = None, collection_names=('private', 'public'), top_k:int=NUMBER_RETRIEVAL_MERGED) -> List[dict]:
+    """
+    Search several collections concurrently (latency = slowest collection, not the sum)
+    and return one merged, labeled top-k list.
+    """
+    query_colbert = None
+    if reranking and query and RERANKER == "colbert" and colbert_store is not None:
+        # Embed the question's token vectors once, not once per collection
+        try:
+            query_colbert = query_to_colbert(query)
+        except Exception as e:
+            # search_collection retries it and falls back to WeightedRanker
+            print(f"Error embedding ColBERT query vectors: {e}")
+
+    started = time.perf_counter()
+    futures = {
+        # copy_context() so the searches report their stage timings to this request
+        collection_name.capitalize(): retrieval_executor.submit(
+            copy_context().run,
+            run_timed_search,
+            collection_name,
+            partial(
+                search_collection,
+                embeddings=embeddings,
+                collection_name=collection_name,
+                reranking=reranking,
+                # user_id cuma dipake buat filter koleksi 'private'
+                user_id=user_id if collection_name == 'private' else None,
+                query=query,
+                sparse_embeddings=sparse_embeddings,
+                document_ids=document_ids,
+                query_colbert=query_colbert,
+            )
+        )
+        for collection_name in collection_names
+    }
+    results = {source_label: future.result() for source_label, future in futures.items()}
+    record_stage("retrieval", time.perf_counter() - started, "merged")
+    return merge_search_results(results, top_k)
+
+def remote_document_path(user_id:str, document_id:str, tag:str, collection_name:str) -> str:
+    directory = QNAP_SFTP_PRIVATE_DIR if collection_name == 'private' else QNAP_SFTP_PUBLIC_DIR
+    return f"{directory}/{user_id}/{document_id}.{tag}"
 
 def retrieve_documents_from_sftp(user_id:str, document_id:str, tag:str, collection_name:str):
-    sftp_client = create_sftp_client()
-    print('ngambil docs');
+    os.makedirs(DOCUMENT_DIR, exist_ok=True)
+    document_path = os.path.join(DOCUMENT_DIR, document_id + '.' + tag)
+    remote_path = remote_document_path(user_id, document_id, tag, collection_name)
+    print(f"ngambil docs: {remote_path} -> {document_path}")
+
     try:
-        sftp_client.connect(
-            hostname=os.getenv('QNAP_SFTP_IP'),
-            port=int(os.getenv('QNAP_SFTP_PORT')),
-            username=os.getenv('QNAP_SFTP_USERNAME'),
-            password=os.getenv('QNAP_SFTP_PASSWORD')
-        )
-    except Exception as e:
+        sftp_transfer.fetch(remote_path, document_path)
+    except SFTPConnectionError as e:
         print(e)
         raise HTTPRequestException(message="Failed to connect to the server", status_code=500)
-   
-    os.makedirs(DOCUMENT_DIR, exist_ok=True)
-    print(f"Memastikan direktori {DOCUMENT_DIR} ada...")
-    document_path = os.path.join(DOCUMENT_DIR, document_id + '.' + tag)
-    
-    print(document_path, collection_name)
-    print(f"ini sftp file private: {os.getenv('QNAP_SFTP_PRIVATE_DIR')}/{user_id}/{document_id}.{tag}")
-    print(f"ini sftp file public: {os.getenv('QNAP_SFTP_PUBLIC_DIR')}/{user_id}/{document_id}.{tag}")
+    except Exception as e:
+        print(e, 'here')
+        raise HTTPRequestException(message="Failed to retrieve the document", status_code=500)
+
+def read_document_from_sftp(user_id:str, document_id:str, tag:str, collection_name:str) -> bytes:
+    """Document content straight from the NAS (or its local copy), without a file in DOCUMENT_DIR."""
+    remote_path = remote_document_path(user_id, document_id, tag, collection_name)
+    print(f"baca docs: {remote_path}")
 
     try:
-        with sftp_client.open_sftp() as sftp_client:
-            if collection_name == 'private':
-                sftp_client.get(
-                    remotepath=f"{os.getenv('QNAP_SFTP_PRIVATE_DIR')}/{user_id}/{document_id}.{tag}",
-                    localpath=document_path
-                )
-            else :
-                sftp_client.get(
-                    remotepath=f"{os.getenv('QNAP_SFTP_PUBLIC_DIR')}/{user_id}/{document_id}.{tag}",
-                    localpath=document_path
-                )
+        return sftp_transfer.read_bytes(remote_path)
+    except SFTPConnectionError as e:
+        print(e)
+        raise HTTPRequestException(message="Failed to connect to the server", status_code=500)
     except Exception as e:
         print(e, 'here')
         raise HTTPRequestException(message="Failed to retrieve the document", status_code=500)
-    
+
 def move_documents_from(user_id:str, document_id:str, tag:str, collection_name:str):
-    sftp_client = create_sftp_client()                
-    print('mindahin docs')
+    target_collection_name = "public" if collection_name == 'private' else "private"
+    source_path = remote_document_path(user_id, document_id, tag, collection_name)
+    destination_path = remote_document_path(user_id, document_id, tag, target_collection_name)
+    print(f"mindahin docs: {source_path} -> {destination_path}")
+
     try:
-        sftp_client.connect(
-            hostname=os.getenv('QNAP_SFTP_IP'),
-            port=int(os.getenv('QNAP_SFTP_PORT')),
-            username=os.getenv('QNAP_SFTP_USERNAME'),
-            password=os.getenv('QNAP_SFTP_PASSWORD')
-        )
-    except Exception as e:
+        # Idempotent: a retry after a successful rename finds the file already in place
+        sftp_transfer.rename(source_path, destination_path)
+    except SFTPConnectionError as e:
         print(e, 'siniiii')
         raise HTTPRequestException(message="Failed to connect to the server", status_code=500)
-    
-    try:
-        with sftp_client.open_sftp() as sftp_client:
-            if collection_name == 'private':
-                source_path = f"{os.getenv('QNAP_SFTP_PRIVATE_DIR')}/{user_id}"
-                destination_path = f"{os.getenv('QNAP_SFTP_PUBLIC_DIR')}/{user_id}"
-                
-                check_directory(sftp_client, destination_path)
-                
-                sftp_client.rename(f"{source_path}/{document_id}.{tag}", f"{destination_path}/{document_id}.{tag}")
-            else :
-                source_path = f"{os.getenv('QNAP_SFTP_PUBLIC_DIR')}/{user_id}"
-                destination_path = f"{os.getenv('QNAP_SFTP_PRIVATE_DIR')}/{user_id}"
-                
-                check_directory(sftp_client, destination_path)
-                
-                sftp_client.rename(f"{source_path}/{document_id}.{tag}", f"{destination_path}/{document_id}.{tag}")
     except Exception as e:
         print(e, 'sanaaaa')
-        raise HTTPRequestException(message="Failed to retrieve the document", status_code=500)            
+        raise HTTPRequestException(message="Failed to retrieve the document", status_code=500)
 
-def check_directory(sftp, path:str) :
-    try:
-        sftp.chdir(path)
-    except IOError:
-        # Directory does not exist, create it
-        mkdir_p(sftp, path)
-        sftp.chdir(path)
-        
-def mkdir_p(sftp, remote_directory):
+def document_moved_to(user_id:str, document_id:str, tag:str, target_collection_name:str):
+    """True/False when the NAS says whether the file is in the target directory, None when it can't be checked."""
     try:
-        sftp.stat(remote_directory)
-    except IOError:
-        sftp.mkdir(remote_directory)
+        return sftp_transfer.exists(remote_document_path(user_id, document_id, tag, target_collection_name))
+    except Exception as e:
+        print(f"Could not check {document_id} in {target_collection_name}: {e}")
+        return None
 
 def extract_pdf_text_sample(file_path: str, max_pages: int = 3, max_chars: int = 5000) -> str:
     """
@@ -390,6 +611,13 @@ def extract_pdf_text_sample(file_path: str, max_pages: int = 3, max_chars: int =
         Extracted text sample from the PDF
     """
     try:
+        # Already parsed (e.g. re-uploaded document): take the first pages from the parse cache
+        cached = parse_cache.lookup(file_path, 'pdf', 'pymu') if parse_cache is not None else None
+        if cached:
+            combined_text = "\n".join(page.text for page in cached[:max_pages])
+            cleaned = clean_text(combined_text)
+            return cleaned[:max_chars] + "..." if len(cleaned) > max_chars else cleaned
+
         import fitz  # PyMuPDF
 
         doc = fitz.open(file_path)
@@ -1,34 +1,272 @@
+import asyncio
 import httpx
+import json
+import struct
+import threading
+import time
+import weakref
+import numpy as np
 from typing import List, Dict, Any
 from langchain_core.embeddings import Embeddings
 
+# Binary response format of the BGE-M3 service (see bge-ma012/wire.py)
+WIRE_MEDIA_TYPE = "application/x-bge-m3"
+WIRE_MAGIC = b"BGM3"
+WIRE_PREFIX_SIZE = 12  # magic (4) + version (1) + padding (3) + header length (4)
+
+# Status codes worth retrying: the service is overloaded or restarting
+# Overload and gateway errors only: a 500 is usually the request itself and fails again
+RETRYABLE_STATUS_CODES = {429, 502, 503, 504}
+
+
+def decode_wire_embeddings(content: bytes) -> Dict[str, Any]:
+    """
+    Decode a binary embedding response straight into NumPy arrays.
+    Dense and ColBERT vectors are zero-copy views over the response buffer
+    (float16 payloads are widened to float32 once, for Milvus).
+    """
+    buffer = memoryview(content)
+    if bytes(buffer[:4]) != WIRE_MAGIC:
+        raise ValueError("Response bukan format binary BGE-M3 yang valid.")
+
+    _, header_length = struct.unpack_from("<B3xI", buffer, 4)
+    header = json.loads(bytes(buffer[WIRE_PREFIX_SIZE:WIRE_PREFIX_SIZE + header_length]))
+    base = (WIRE_PREFIX_SIZE + header_length + 7) & ~7
+
+    arrays = {}
+    for name, meta in header["arrays"].items():
+        shape = tuple(meta["shape"])
+        arrays[name] = np.frombuffer(
+            buffer, dtype=np.dtype(meta["dtype"]), count=int(np.prod(shape)), offset=base + meta["offset"]
+        ).reshape(shape)
+
+    count = header["count"]
+    result = {"count": count}
+
+    if "dense" in arrays:
+        result["dense"] = arrays["dense"].astype(np.float32, copy=False)
+
+    if "sparse_offsets" in arrays:
+        offsets, indices, values = arrays["sparse_offsets"], arrays["sparse_indices"], arrays["sparse_values"]
+        # Milvus wants {token_id: weight} dicts for SPARSE_FLOAT_VECTOR
+        result["sparse"] = [
+            dict(zip(indices[offsets[i]:offsets[i + 1]].tolist(), values[offsets[i]:offsets[i + 1]].tolist()))
+            for i in range(count)
+        ]
+
+    if "colbert_offsets" in arrays:
+        offsets, colbert = arrays["colbert_offsets"], arrays["colbert"].astype(np.float32, copy=False)
+        result["colbert"] = [colbert[offsets[i]:offsets[i + 1]] for i in range(count)]
+
+    return result
+
+
+def _as_list(vector) -> List[float]:
+    return vector.tolist() if isinstance(vector, np.ndarray) else vector
+
+
 # Kelas ini sama, tapi kita akan lebih sering pake metode sync-nya
 class CustomAPIEmbeddings(Embeddings):
 
-    def __init__(self, api_url: str, model_name: str = "bge-m3", timeout: int = 30):
+    def __init__(self, api_url: str, model_name: str = "bge-m3", timeout: int = 30,
+                 batch_size: int = 32, batch_url: str = None,
+                 wire_format: str = "json", wire_dtype: str = "float32",
+                 max_connections: int = 20, max_keepalive_connections: int = 10,
+                 keepalive_expiry: float = 30.0, max_retries: int = 3, retry_backoff: float = 0.5):
         self.api_url = f"{api_url}"
+        # Batch endpoint lives next to /embed on the BGE-M3 service (/embed/batch)
+        self.batch_url = batch_url or f"{self.api_url.rstrip('/')}/batch"
         self.model_name = model_name
         self.timeout = timeout
+        self.batch_size = batch_size
+        # "binary" negotiates the compact wire format, dense vectors come back as np.ndarray
+        self.wire_format = wire_format
+        self.wire_dtype = wire_dtype
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        # Long-lived pooled clients, created lazily so importing the app never opens sockets.
+        # httpx.AsyncClient is bound to the loop it was first used on, so keep one per loop.
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _get_client(self) -> httpx.Client:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._async_clients[loop] = client
+        return client
 
-    def _call_api(self, content: str) -> Dict[str, Any]:
+    def close(self):
+        """Close the pooled sync client."""
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        """Close the running loop's AsyncClient; call it before that loop ends (e.g. ASGI lifespan shutdown)."""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _retry_delay(self, attempt: int, response: httpx.Response = None) -> float:
+        # Honour Retry-After from the service when it gives one, else exponential backoff
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.retry_backoff * (2 ** attempt)
+
+    def _post(self, url: str, request_data: Dict[str, Any]) -> httpx.Response:
+        """POST on the pooled client, retrying transport errors, 429 and 502/503/504 with backoff."""
+        client = self._get_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = client.post(url, json=request_data, headers=self._headers())
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise e
+                print(f"Embedding request failed ({e}), retrying ({attempt + 1}/{self.max_retries})")
+                time.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                print(f"Embedding service returned {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+                time.sleep(self._retry_delay(attempt, response))
+                continue
+
+            response.raise_for_status()
+            return response
+
+    async def _apost(self, url: str, request_data: Dict[str, Any]) -> httpx.Response:
+        """Async twin of `_post` on the per-loop pooled AsyncClient."""
+        client = self._get_async_client()
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await client.post(url, json=request_data, headers=self._headers())
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise e
+                print(f"Embedding request failed ({e}), retrying ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(self._retry_delay(attempt))
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                print(f"Embedding service returned {response.status_code}, retrying ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(self._retry_delay(attempt, response))
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def _headers(self) -> Dict[str, str]:
+        if self.wire_format == "binary":
+            # JSON stays acceptable so an older embedding service still works
+            return {"Accept": f"{WIRE_MEDIA_TYPE}; dtype={self.wire_dtype}, application/json;q=0.5"}
+        return {"Accept": "application/json"}
+
+    def _parse_response(self, response: httpx.Response, count: int) -> List[Dict[str, Any]]:
+        """
+        Turn a single or batch response (JSON or binary) into aligned {dense, sparse} dicts,
+        plus a float32 (tokens, dim) "colbert" matrix per item when ColBERT vectors were requested.
+        """
+        if response.headers.get("content-type", "").startswith(WIRE_MEDIA_TYPE):
+            result = decode_wire_embeddings(response.content)
+            if "dense" not in result or "sparse" not in result:
+                raise ValueError("API response tidak lengkap, 'dense' atau 'sparse' tidak ditemukan.")
+            dense, sparse, colbert = result["dense"], result["sparse"], result.get("colbert")
+        else:
+            result = response.json()
+            if "dense_embeddings" not in result or "sparse_embeddings" not in result:
+                raise ValueError("API response tidak lengkap, 'dense_embeddings' atau 'sparse_embeddings' tidak ditemukan.")
+            dense, sparse = result["dense_embeddings"], result["sparse_embeddings"]
+            colbert = result.get("colbert_embeddings")
+            if isinstance(sparse, dict):
+                # Single /embed response: one vector, not a list of vectors
+                dense, sparse = [dense], [sparse]
+                colbert = [colbert] if colbert is not None else None
+            if colbert is not None:
+                colbert = [np.asarray(vecs, dtype=np.float32) for vecs in colbert]
+
+        if len(dense) != count or len(sparse) != count:
+            raise ValueError("API response tidak sejajar dengan jumlah input.")
+        if colbert is None:
+            return [{"dense": d, "sparse": s} for d, s in zip(dense, sparse)]
+        return [{"dense": d, "sparse": s, "colbert": c} for d, s, c in zip(dense, sparse, colbert)]
+
+    def _single_request(self, content: str, return_colbert: bool = False) -> Dict[str, Any]:
+        return {
+            "content": content,
+            "model": self.model_name,
+            "return_dense": True,
+            "return_sparse": True,
+            "return_colbert_vecs": return_colbert
+        }
+
+    def _batch_request(self, contents: List[str], return_colbert: bool = False) -> Dict[str, Any]:
+        return {
+            "contents": contents,
+            "model": self.model_name,
+            "batch_size": self.batch_size,
+            "return_dense": True,
+            "return_sparse": True,
+            "return_colbert_vecs": return_colbert
+        }
+
+    def _call_api(self, content: str, return_colbert: bool = False) -> Dict[str, Any]:
         """Helper pribadi buat manggil API."""
         try:
-            request_data = {
-                "content": content,
-                "model": self.model_name,
-                "return_dense": True,
-                "return_sparse": True
-            }
-            with httpx.Client() as client:
-                response = client.post(self.api_url, json=request_data, timeout=self.timeout)
-                response.raise_for_status()
-                result = response.json()
-                if "dense_embeddings" not in result or "sparse_embeddings" not in result:
-                    raise ValueError("API response tidak lengkap, 'dense_embeddings' atau 'sparse_embeddings' tidak ditemukan.")
-                return {
-                    "dense": result["dense_embeddings"],
-                    "sparse": result["sparse_embeddings"]
-                }
+            response = self._post(self.api_url, self._single_request(content, return_colbert))
+            return self._parse_response(response, 1)[0]
+        except httpx.RequestError as e:
+            print(f"Request exception: {e}")
+            raise e
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise e
+
+    def _call_api_batch(self, contents: List[str], return_colbert: bool = False) -> List[Dict[str, Any]]:
+        """Helper buat manggil batch API, hasilnya urut sesuai `contents`."""
+        try:
+            response = self._post(self.batch_url, self._batch_request(contents, return_colbert))
+            return self._parse_response(response, len(contents))
+        except httpx.RequestError as e:
+            print(f"Request exception: {e}")
+            raise e
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise e
+
+    async def _acall_api(self, content: str, return_colbert: bool = False) -> Dict[str, Any]:
+        try:
+            response = await self._apost(self.api_url, self._single_request(content, return_colbert))
+            return self._parse_response(response, 1)[0]
+        except httpx.RequestError as e:
+            print(f"Request exception: {e}")
+            raise e
+        except Exception as e:
+            print(f"An unexpected error occurred: {e}")
+            raise e
+
+    async def _acall_api_batch(self, contents: List[str], return_colbert: bool = False) -> List[Dict[str, Any]]:
+        try:
+            response = await self._apost(self.batch_url, self._batch_request(contents, return_colbert))
+            return self._parse_response(response, len(contents))
         except httpx.RequestError as e:
             print(f"Request exception: {e}")
             raise e
@@ -37,28 +275,50 @@ class CustomAPIEmbeddings(Embeddings):
             raise e
 
     # --- METODE UTAMA LO (INI YANG LO PAKE) ---
-    
+
     def embed_query(self, text: str) -> List[float]:
         """
         [WAJIB LANGCHAIN]
         Hanya mengembalikan DENSE embedding untuk query.
         """
         # Panggil helper, tapi AMBIL dense-nya AJA
-        return self._call_api(text)["dense"]
+        return _as_list(self._call_api(text)["dense"])
 
     # Metode ini juga harus HANYA return dense
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [self._call_api(text)["dense"] for text in texts]
-    
+        return [_as_list(result["dense"]) for result in self.embed_documents_with_hybrid_support(texts)]
+
     # Metode custom lo buat hybrid TETAP ADA
-    def embed_with_hybrid_support(self, text: str) -> Dict[str, Any]:
-        return self._call_api(text)
+    def embed_with_hybrid_support(self, text: str, return_colbert: bool = False) -> Dict[str, Any]:
+        return self._call_api(text, return_colbert)
+
+    def embed_documents_with_hybrid_support(self, texts: List[str], return_colbert: bool = False) -> List[Dict[str, Any]]:
+        """
+        Dense + sparse embeddings for many texts, sent in batches of `batch_size`
+        so throughput scales with the batch instead of the request latency.
+        `return_colbert` also asks for the ColBERT token vectors (key "colbert").
+        """
+        results = []
+        for start in range(0, len(texts), self.batch_size):
+            results.extend(self._call_api_batch(texts[start:start + self.batch_size], return_colbert))
+        return results
+
+
+    # --- ASYNC: buat path chat async, gak nge-block event loop ---
+
+    async def aembed_with_hybrid_support(self, text: str, return_colbert: bool = False) -> Dict[str, Any]:
+        return await self._acall_api(text, return_colbert)
+
+    async def aembed_documents_with_hybrid_support(self, texts: List[str], return_colbert: bool = False) -> List[Dict[str, Any]]:
+        """Async batches run concurrently, bounded by the connection pool limits."""
+        batches = await asyncio.gather(*(
+            self._acall_api_batch(texts[start:start + self.batch_size], return_colbert)
+            for start in range(0, len(texts), self.batch_size)
+        ))
+        return [result for batch in batches for result in batch]
 
-    
-    # Metode async bisa dihapus atau diabaikan karena kita di lingkungan Flask sync
     async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
-        # Implementasi async tidak akan terpakai di Flask standar
-        pass
+        return [_as_list(result["dense"]) for result in await self.aembed_documents_with_hybrid_support(texts)]
+
     async def aembed_query(self, text: str) -> List[float]:
-        # Implementasi async tidak akan terpakai di Flask standar
-        pass
\ No newline at end of file
+        return _as_list((await self._acall_api(text))["dense"])
@@ -0,0 +1,144 @@
+import hashlib
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .kvstore import SQLiteKV
+from ..metrics.collectors import record_embedding_cache
+
+# Packed entry: dim (u32) + nnz (u32), then dense float32[dim], sparse int32[nnz], sparse float32[nnz]
+# and, for ColBERT entries only, tokens (u32) + colbert dim (u32) + float16[tokens, colbert dim]
+ENTRY_HEADER = struct.Struct("<II")
+
+
+def pack_embedding(embedding: Dict[str, Any], with_colbert: bool = False) -> bytes:
+    """Serialize {dense, sparse} into a compact binary blob (about 4 KB for a 1024-dim BGE-M3 vector)."""
+    dense = np.asarray(embedding["dense"], dtype=np.float32)
+    sparse = embedding.get("sparse") or {}
+    indices = np.fromiter((int(key) for key in sparse.keys()), dtype=np.int32, count=len(sparse))
+    values = np.fromiter((float(value) for value in sparse.values()), dtype=np.float32, count=len(sparse))
+    blob = ENTRY_HEADER.pack(dense.shape[0], len(sparse)) + dense.tobytes() + indices.tobytes() + values.tobytes()
+    if with_colbert:
+        colbert = np.asarray(embedding["colbert"], dtype=np.float16)
+        blob += ENTRY_HEADER.pack(*colbert.shape) + colbert.tobytes()
+    return blob
+
+
+def unpack_embedding(blob: bytes) -> Dict[str, Any]:
+    dim, nnz = ENTRY_HEADER.unpack_from(blob)
+    offset = ENTRY_HEADER.size
+    dense = np.frombuffer(blob, dtype=np.float32, count=dim, offset=offset)
+    offset += dim * 4
+    indices = np.frombuffer(blob, dtype=np.int32, count=nnz, offset=offset)
+    values = np.frombuffer(blob, dtype=np.float32, count=nnz, offset=offset + nnz * 4)
+    embedding = {"dense": dense, "sparse": dict(zip(indices.tolist(), values.tolist()))}
+    offset += nnz * 8
+    if offset < len(blob):
+        tokens, colbert_dim = ENTRY_HEADER.unpack_from(blob, offset)
+        embedding["colbert"] = np.frombuffer(
+            blob, dtype=np.float16, count=tokens * colbert_dim, offset=offset + ENTRY_HEADER.size
+        ).reshape(tokens, colbert_dim).astype(np.float32)
+    return embedding
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for dense + sparse embeddings.
+
+    Keys are a SHA-256 of the model name and the exact text, so identical
+    chunks (re-ingestion, private/public moves) and repeated questions skip the
+    embedding service. Entries live in a byte-bounded in-process LRU and,
+    when `disk_path` is set, in a size-bounded SQLite tier shared across
+    restarts and worker processes. With `colbert=True` entries also carry the
+    ColBERT token vectors (float16) under a separate key, meant for short
+    texts such as questions.
+    """
+
+    def __init__(self, model_name: str, max_bytes: int, disk_path: Optional[str] = None,
+                 disk_max_bytes: int = 0):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.disk = SQLiteKV(disk_path, disk_max_bytes, table="embeddings") if disk_path else None
+
+    def key(self, text: str, colbert: bool = False) -> str:
+        model = f"{self.model_name}+colbert" if colbert else self.model_name
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, blob: bytes):
+        """Insert into the memory LRU (lock held)."""
+        if len(blob) > self.max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = blob
+        self._memory_bytes += len(blob)
+        while self._memory_bytes > self.max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get_many(self, texts: List[str], colbert: bool = False) -> List[Optional[Dict[str, Any]]]:
+        keys = [self.key(text, colbert) for text in texts]
+        blobs: Dict[str, bytes] = {}
+
+        with self._lock:
+            for key in keys:
+                blob = self._memory.get(key)
+                if blob is not None:
+                    self._memory.move_to_end(key)
+                    blobs[key] = blob
+        record_embedding_cache("memory", hits=len(blobs), misses=len(set(keys)) - len(blobs))
+
+        if self.disk is not None:
+            missing = [key for key in dict.fromkeys(keys) if key not in blobs]
+            if missing:
+                found = self.disk.get_many(missing)
+                record_embedding_cache("disk", hits=len(found), misses=len(missing) - len(found))
+                with self._lock:
+                    for key, blob in found.items():
+                        self._remember(key, blob)
+                blobs.update(found)
+
+        return [unpack_embedding(blobs[key]) if key in blobs else None for key in keys]
+
+    def get(self, text: str, colbert: bool = False) -> Optional[Dict[str, Any]]:
+        return self.get_many([text], colbert)[0]
+
+    def put_many(self, texts: List[str], embeddings: List[Dict[str, Any]], colbert: bool = False):
+        items = {
+            self.key(text, colbert): pack_embedding(embedding, with_colbert=colbert)
+            for text, embedding in zip(texts, embeddings)
+        }
+        with self._lock:
+            for key, blob in items.items():
+                self._remember(key, blob)
+        if self.disk is not None:
+            self.disk.put_many(items)
+
+    def put(self, text: str, embedding: Dict[str, Any], colbert: bool = False):
+        self.put_many([text], [embedding], colbert)
+
+    def get_or_embed(self, texts: List[str],
+                     embed_fn: Callable[[List[str]], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Return embeddings for `texts`, calling `embed_fn` once for the unique texts not cached yet."""
+        results = self.get_many(texts)
+        missing = list(dict.fromkeys(text for text, result in zip(texts, results) if result is None))
+        if not missing:
+            return results
+
+        embedded = dict(zip(missing, embed_fn(missing)))
+        self.put_many(missing, [embedded[text] for text in missing])
+        return [result if result is not None else embedded[text] for text, result in zip(texts, results)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_bytes": self.disk.total_bytes if self.disk is not None else 0,
+        }
@@ -0,0 +1,137 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextvars import copy_context
+from typing import Callable, List, Optional
+
+from llama_index.core import PromptTemplate
+
+from ...main import hyde_llm
+from ..constant.document import NUMBER_RETRIEVAL_MERGED, RRF_K
+from ..constant.llm import HYDE_PROMPT_TEMPLATE, HYDE_DEADLINE_SECONDS, HYDE_WORKERS, HYDE_GENERATION_WORKERS
+from ..constant.llm import HYDE_CACHE_SIZE, HYDE_CACHE_TTL
+from ..metrics.collectors import record_hyde, time_stage
+
+# Raw-question retrieval and HyDE generation run side by side, each on its own pool:
+# generations that outlive their deadline can only fill the generation pool
+hyde_executor = ThreadPoolExecutor(max_workers=HYDE_WORKERS, thread_name_prefix="hyde")
+hyde_generation_executor = ThreadPoolExecutor(max_workers=HYDE_GENERATION_WORKERS, thread_name_prefix="hyde-llm")
+
+
+def normalize_question(question: str) -> str:
+    """Case, whitespace and trailing punctuation don't change the hypothetical document."""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+
+class HydeCache:
+    """In-process LRU of hypothetical documents per normalized question, with a TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, question: str) -> Optional[str]:
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, context = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return context
+
+    def put(self, question: str, context: str):
+        if self.max_entries <= 0:
+            return
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, context)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+hyde_cache = HydeCache(HYDE_CACHE_SIZE, HYDE_CACHE_TTL)
+
+
+def generate_hypothetical_document(question: str) -> Optional[str]:
+    """Blocking HyDE completion; None when the LLM returns nothing useful."""
+    prompt = PromptTemplate(HYDE_PROMPT_TEMPLATE).format(question=question)
+    with time_stage("hyde"):
+        context = hyde_llm.complete(prompt).text
+    print(f'[hyde] LLM response: {context}')
+    if not context or context.strip() == '':
+        print('[hyde] WARNING: Empty response from LLM, using original question only')
+        return None
+    return context
+
+
+def fuse_ranked_lists(ranked_lists: List[List[dict]], top_k: int) -> List[dict]:
+    """Reciprocal rank fusion of document lists, documents identified by their chunk 'id'."""
+    scores, documents = {}, {}
+    for ranked in ranked_lists:
+        for rank, document in enumerate(ranked):
+            key = document['id']
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+            documents.setdefault(key, document)
+
+    order = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [{**documents[key], 'score': scores[key]} for key in order]
+
+
+def speculative_retrieve(question: str, retrieve: Callable[[str], List[dict]],
+                         generate: Callable[[str], Optional[str]] = generate_hypothetical_document,
+                         deadline: float = HYDE_DEADLINE_SECONDS, top_k: int = NUMBER_RETRIEVAL_MERGED,
+                         cache: HydeCache = hyde_cache, retrieval_executor: ThreadPoolExecutor = hyde_executor,
+                         generation_executor: ThreadPoolExecutor = hyde_generation_executor) -> List[dict]:
+    """
+    HyDE without putting the LLM completion in front of retrieval.
+
+    `retrieve(text)` (embed + search) starts on the raw question immediately
+    while the hypothetical document is generated. If it is ready within
+    `deadline` seconds (or cached), it is retrieved on too and both lists are
+    fused with RRF; otherwise the raw-question results are returned as they
+    are. A generation that misses the deadline while still queued is cancelled;
+    one that already started keeps running (on the generation pool only) and
+    still fills the cache for the next time the question is asked.
+    """
+    # copy_context() keeps the request's stage timings attached on the pool threads
+    raw_future = retrieval_executor.submit(copy_context().run, retrieve, question)
+
+    context = cache.get(question)
+    if context is not None:
+        record_hyde("cached")
+    else:
+        def generate_and_cache():
+            generated = generate(question)
+            if generated:
+                cache.put(question, generated)
+            return generated
+
+        generation = generation_executor.submit(copy_context().run, generate_and_cache)
+        try:
+            context = generation.result(timeout=deadline)
+        except FutureTimeoutError:
+            # Still queued behind other generations: don't let the backlog grow
+            generation.cancel()
+            print(f'[hyde] No hypothetical document within {deadline}s, using the raw question results')
+            record_hyde("timeout")
+            return raw_future.result()
+        except Exception as e:
+            print(f'[hyde] Generation failed, using the raw question results: {e}')
+            record_hyde("error")
+            return raw_future.result()
+        if not context:
+            record_hyde("error")
+            return raw_future.result()
+        record_hyde("fused")
+
+    hyde_documents = retrieve(context)
+    return fuse_ranked_lists([raw_future.result(), hyde_documents], top_k)
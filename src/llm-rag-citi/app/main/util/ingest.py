@@ -0,0 +1,175 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .document import split_documents, clean_text, documents_to_embeddings
+from ..metrics.collectors import record_ingest_stage
+
+# Sentinel pushed through the queues once a stage has no more work
+_DONE = object()
+
+
+class IngestAborted(Exception):
+    """Raised inside a stage when another stage already failed."""
+
+
+def _put(q: queue.Queue, item, abort: threading.Event):
+    # Blocking put (backpressure) that still notices when the pipeline is aborted
+    while True:
+        if abort.is_set():
+            raise IngestAborted()
+        try:
+            q.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(q: queue.Queue, abort: threading.Event):
+    while True:
+        if abort.is_set():
+            raise IngestAborted()
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+
+def ingest_documents(documents: Iterable, collection, build_row: Callable[[Any, Dict[str, Any]], Dict[str, Any]],
+                     embed_batch_size: int = 32, embed_workers: int = 2, insert_batch_size: int = 256,
+                     queue_size: int = 4,
+                     progress_callback: Optional[Callable[[Dict[str, int]], None]] = None,
+                     colbert_store=None) -> int:
+    """
+    Streaming ingestion: parse -> split -> embed -> insert, each stage running
+    concurrently and connected by bounded queues.
+
+    `documents` may be a lazy iterator (pages are split as soon as they are
+    parsed). Chunks are embedded in batches of `embed_batch_size` by
+    `embed_workers` threads and written to Milvus in batches of
+    `insert_batch_size` rows. Full queues block the upstream stage, so at most
+    ~`queue_size` batches per stage are held in memory regardless of document
+    size. `progress_callback` receives counters (pages, chunks, embedded,
+    inserted) and may be called from any stage thread. With a `colbert_store`
+    the chunks' ColBERT token vectors are requested too and saved under
+    (collection, user_id, document_id, row id) before the rows are queued for insert. Returns the
+    number of inserted rows; re-raises the first stage error.
+    """
+    embed_queue = queue.Queue(maxsize=queue_size)
+    insert_queue = queue.Queue(maxsize=queue_size)
+    abort = threading.Event()
+    errors: List[BaseException] = []
+    progress = {"pages": 0, "chunks": 0, "embedded": 0, "inserted": 0}
+    progress_lock = threading.Lock()
+
+    def fail(e: BaseException):
+        if not isinstance(e, IngestAborted):
+            errors.append(e)
+        abort.set()
+
+    def report(**increments):
+        with progress_lock:
+            for key, value in increments.items():
+                progress[key] += value
+            snapshot = dict(progress)
+        if progress_callback is not None:
+            progress_callback(snapshot)
+
+    def produce():
+        try:
+            batch = []
+            iterator = iter(documents)
+            while True:
+                started = time.perf_counter()
+                try:
+                    document = next(iterator)
+                except StopIteration:
+                    break
+                record_ingest_stage("parse", time.perf_counter() - started)
+
+                started = time.perf_counter()
+                nodes = split_documents([document])
+                for node in nodes:
+                    node.text = clean_text(node.text)
+                # Chunk kosong gak usah di-embed
+                nodes = [node for node in nodes if node.text]
+                record_ingest_stage("split", time.perf_counter() - started)
+                report(pages=1, chunks=len(nodes))
+
+                for node in nodes:
+                    batch.append(node)
+                    if len(batch) >= embed_batch_size:
+                        _put(embed_queue, batch, abort)
+                        batch = []
+            if batch:
+                _put(embed_queue, batch, abort)
+        except BaseException as e:
+            fail(e)
+        finally:
+            for _ in range(embed_workers):
+                try:
+                    _put(embed_queue, _DONE, abort)
+                except IngestAborted:
+                    break
+
+    def embed():
+        try:
+            while True:
+                nodes = _get(embed_queue, abort)
+                if nodes is _DONE:
+                    break
+                started = time.perf_counter()
+                embeddings = documents_to_embeddings([node.text for node in nodes], return_colbert=colbert_store is not None)
+                record_ingest_stage("embed", time.perf_counter() - started)
+                rows = [build_row(node, embedding) for node, embedding in zip(nodes, embeddings)]
+                if colbert_store is not None:
+                    colbert_store.put_many({
+                        colbert_store.key(collection.name, row["user_id"], row["document_id"], row["id"]): embedding["colbert"]
+                        for row, embedding in zip(rows, embeddings)
+                    })
+                _put(insert_queue, rows, abort)
+                report(embedded=len(rows))
+        except BaseException as e:
+            fail(e)
+        finally:
+            try:
+                _put(insert_queue, _DONE, abort)
+            except IngestAborted:
+                pass
+
+    threads = [threading.Thread(target=produce, name="ingest-parse", daemon=True)]
+    threads += [threading.Thread(target=embed, name=f"ingest-embed-{i}", daemon=True) for i in range(embed_workers)]
+    for thread in threads:
+        thread.start()
+
+    def flush(rows):
+        started = time.perf_counter()
+        collection.insert(data=rows)
+        record_ingest_stage("insert", time.perf_counter() - started)
+        report(inserted=len(rows))
+
+    # Insert stage runs on the calling thread
+    pending = []
+    finished_workers = 0
+    try:
+        while finished_workers < embed_workers:
+            rows = _get(insert_queue, abort)
+            if rows is _DONE:
+                finished_workers += 1
+                continue
+            pending.extend(rows)
+            while len(pending) >= insert_batch_size:
+                flush(pending[:insert_batch_size])
+                pending = pending[insert_batch_size:]
+        if pending:
+            flush(pending)
+    except BaseException as e:
+        fail(e)
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return progress["inserted"]
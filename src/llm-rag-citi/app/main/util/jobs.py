@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobStore:
+    """
+    Durable job queue on a SQLite file, shared by the API and the worker processes.
+
+    Workers claim a job with a time-limited lease and renew it while they run.
+    If a worker dies, its lease expires and the job becomes claimable again, so
+    nothing is lost on a crash; handlers see `attempts > 1` and can clean up the
+    partial work first. Every call opens its own connection, which keeps the
+    store safe to use from any thread or process.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 3):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_attempts = max_attempts
+
+        with self._connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, status TEXT NOT NULL, "
+                "progress TEXT, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "lease_owner TEXT, lease_expires REAL, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, kind: str, payload: Dict[str, Any]) -> str:
+        job_id = str(uuid4())
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), JOB_QUEUED, now, now)
+            )
+        return job_id
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest queued job (or one whose lease expired)."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            # IMMEDIATE takes the write lock up front so two workers can't claim the same row
+            conn.execute("BEGIN IMMEDIATE")
+            # A job that keeps killing its worker must not be retried forever
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (JOB_FAILED, "Worker lost the job too many times", now, JOB_RUNNING, now, self.max_attempts)
+            )
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (JOB_QUEUED, JOB_RUNNING, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE id = ?",
+                (JOB_RUNNING, owner, now + lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return self.get(row["id"])
+
+    def heartbeat(self, job_id: str, owner: str, lease_seconds: float,
+                  progress: Optional[Dict[str, Any]] = None) -> bool:
+        """Renew the lease (and store progress). False means the job was taken over."""
+        now = time.time()
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, progress = COALESCE(?, progress), updated_at = ? "
+                "WHERE id = ? AND lease_owner = ? AND status = ?",
+                (now + lease_seconds, json.dumps(progress) if progress is not None else None, now,
+                 job_id, owner, JOB_RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, owner: str, result: Any = None, progress: Optional[Dict[str, Any]] = None):
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, progress = COALESCE(?, progress), error = NULL, "
+                "lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (JOB_SUCCEEDED, json.dumps(result), json.dumps(progress) if progress is not None else None,
+                 now, job_id, owner)
+            )
+
+    def fail(self, job_id: str, owner: str, error: str, retry: bool = True):
+        """Record an error; the job is queued again until it has used `max_attempts`."""
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN ? AND attempts < ? THEN ? ELSE ? END, error = ?, "
+                "lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ? AND lease_owner = ?",
+                (int(retry), self.max_attempts, JOB_QUEUED, JOB_FAILED, error, now, job_id, owner)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "payload": json.loads(row["payload"]),
+            "status": row["status"],
+            "progress": json.loads(row["progress"]) if row["progress"] else {},
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
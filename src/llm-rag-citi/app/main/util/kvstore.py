@@ -0,0 +1,166 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+
+class SQLiteKV:
+    """
+    Small size-bounded key/value store on a single SQLite file.
+
+    Values are opaque bytes. Every read refreshes the entry's access time, and
+    once the stored payload grows past `max_bytes` the least recently used
+    entries are evicted until it drops below ~90% of the budget. Safe to share
+    between threads (one connection guarded by a lock, WAL journal) and between
+    processes: triggers keep a running byte total in a one-row `<table>_meta`
+    table, read inside each write transaction, so every process enforces the
+    budget against the same file at O(1) per write.
+    """
+
+    def __init__(self, path: str, max_bytes: int, table: str = "kv"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Rows replaced by INSERT/UPDATE OR REPLACE only fire the delete trigger with this on
+        self._conn.execute("PRAGMA recursive_triggers=ON")
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, atime REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_atime ON {table} (atime)")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}_meta (id INTEGER PRIMARY KEY CHECK (id = 0), total_bytes INTEGER NOT NULL)"
+            )
+            if self._conn.execute(f"SELECT 1 FROM {table}_meta").fetchone() is None:
+                # One full scan for files written before the counter existed
+                self._conn.execute(f"INSERT INTO {table}_meta (id, total_bytes) SELECT 0, COALESCE(SUM(size), 0) FROM {table}")
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_bytes_insert AFTER INSERT ON {table} "
+                f"BEGIN UPDATE {table}_meta SET total_bytes = total_bytes + NEW.size; END"
+            )
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_bytes_delete AFTER DELETE ON {table} "
+                f"BEGIN UPDATE {table}_meta SET total_bytes = total_bytes - OLD.size; END"
+            )
+            self._conn.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_bytes_update AFTER UPDATE OF size ON {table} "
+                f"BEGIN UPDATE {table}_meta SET total_bytes = total_bytes + NEW.size - OLD.size; END"
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found = {}
+        with self._lock:
+            # SQLite caps bound parameters, so look keys up in chunks
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET atime = ? WHERE key = ?", [(now, key) for key in found]
+                )
+        return found
+
+    def put(self, key: str, value: bytes):
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, bytes]):
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            # IMMEDIATE: take the write lock first, so no other process writes between the total and the eviction
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, atime) VALUES (?, ?, ?, ?)",
+                    [(key, value, len(value), now) for key, value in items.items()]
+                )
+                total = self._stored_bytes()
+                if total > self.max_bytes:
+                    self._evict(total)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, keys: Iterable[str]):
+        keys = list(keys)
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key IN ({placeholders})", chunk)
+
+    def delete_prefix(self, prefix: str):
+        """Delete every key starting with `prefix` (a range scan on the primary key)."""
+        if not prefix:
+            raise ValueError("prefix must not be empty")
+        # Keys in [prefix, prefix with its last character incremented) share the prefix
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key >= ? AND key < ?", (prefix, upper))
+
+    def rename_prefix(self, prefix: str, new_prefix: str):
+        """Re-key every entry starting with `prefix` to start with `new_prefix` (existing targets are replaced)."""
+        if not prefix:
+            raise ValueError("prefix must not be empty")
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE OR REPLACE {self.table} SET key = ? || substr(key, ?) WHERE key >= ? AND key < ?",
+                (new_prefix, len(prefix) + 1, prefix, upper)
+            )
+
+    def _stored_bytes(self) -> int:
+        return self._conn.execute(f"SELECT total_bytes FROM {self.table}_meta").fetchone()[0]
+
+    def _evict(self, total: int):
+        """Drop least recently used entries until ~90% of the budget is left (lock held, inside the write transaction)."""
+        target = int(self.max_bytes * 0.9)
+        removed = []
+        freed = 0
+        cursor = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY atime")
+        for key, size in cursor:
+            if total - freed <= target:
+                break
+            removed.append((key,))
+            freed += size
+        cursor.close()
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", removed)
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._stored_bytes()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -3,6 +3,7 @@
 
 from ...main import hyde_llm
 from ..constant.llm import HYDE_PROMPT_TEMPLATE
+from ..metrics.collectors import time_stage
 
 from llama_index.core import PromptTemplate
 from llama_index.core.llms import ChatMessage
@@ -22,7 +23,8 @@ async def get_context(question:str):
     formatted_prompt = prompt_template.format(question=question)
     print(f'[get_context] Formatted prompt: {formatted_prompt[:200]}...')  # Print first 200 chars
     
-    response = await hyde_llm.acomplete(formatted_prompt)
+    with time_stage("hyde"):
+        response = await hyde_llm.acomplete(formatted_prompt)
     context = response.text
     print(f'[get_context] LLM response: {context}')
     
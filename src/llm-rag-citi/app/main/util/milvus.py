@@ -0,0 +1,89 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Tuple, TypeVar
+
+from pymilvus import Collection, utility
+from pymilvus.exceptions import MilvusException
+
+T = TypeVar("T")
+
+
+class CollectionRegistry:
+    """
+    Process-wide cache of Milvus collection handles.
+
+    `Collection(name)` and `utility.has_collection` each cost a describe round
+    trip. The registry resolves a handle (and its schema) once and reuses it
+    until `ttl_seconds` have passed; `run` drops the cached handle and retries
+    once when Milvus reports an error, so a dropped/recreated collection is
+    picked up without a restart.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._handles: Dict[str, Tuple[Collection, float]] = {}
+        self._exists: Dict[str, Tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, resolved_at: float) -> bool:
+        return time.monotonic() - resolved_at < self.ttl_seconds
+
+    def get(self, name: str) -> Collection:
+        entry = self._handles.get(name)
+        if entry is not None and self._fresh(entry[1]):
+            return entry[0]
+
+        with self._lock:
+            entry = self._handles.get(name)
+            if entry is not None and self._fresh(entry[1]):
+                return entry[0]
+            collection = Collection(name)
+            self._handles[name] = (collection, time.monotonic())
+            self._exists[name] = (True, time.monotonic())
+            return collection
+
+    def schema(self, name: str):
+        return self.get(name).schema
+
+    def exists(self, name: str) -> bool:
+        entry = self._exists.get(name)
+        if entry is not None and self._fresh(entry[1]):
+            return entry[0]
+
+        exists = utility.has_collection(name)
+        with self._lock:
+            self._exists[name] = (exists, time.monotonic())
+            if not exists:
+                self._handles.pop(name, None)
+        return exists
+
+    def invalidate(self, name: str = None):
+        with self._lock:
+            if name is None:
+                self._handles.clear()
+                self._exists.clear()
+            else:
+                self._handles.pop(name, None)
+                self._exists.pop(name, None)
+
+    def run(self, name: str, fn: Callable[[], T]) -> T:
+        """Run `fn` (which uses `get(name)`); on a Milvus error refresh the handle and retry once."""
+        try:
+            return fn()
+        except MilvusException as e:
+            print(f"Milvus error on collection {name} ({e}), refreshing handle and retrying")
+            self.invalidate(name)
+            return fn()
+
+    def preload(self, names: Iterable[str]):
+        """Resolve and load() collections up front so the first request doesn't pay for it."""
+        for name in names:
+            try:
+                if not self.exists(name):
+                    print(f"Collection {name} doesn't exist, skipping preload")
+                    continue
+                started = time.perf_counter()
+                self.get(name).load()
+                print(f"Collection {name} loaded in {time.perf_counter() - started:.2f}s")
+            except Exception as e:
+                print(f"Failed to preload collection {name}: {e}")
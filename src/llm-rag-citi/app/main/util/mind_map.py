@@ -0,0 +1,105 @@
+"""
+Map-reduce mind maps over a whole document.
+
+The document is cut into chunks of whole pages, each chunk is summarised into a
+partial Markdown outline (concurrently, at most `concurrency` LLM calls in
+flight), and the outlines are merged `fan_in` at a time until they fit in one
+final MINDMAP_PROMPT_TEMPLATE call. Wall time grows with the depth of the
+reduction tree, not with the number of pages. Chunk outlines are cached by
+content hash, so regenerating a mind map only redoes the reduce steps.
+"""
+
+import asyncio
+import hashlib
+from typing import Awaitable, Callable, List, Optional
+
+from .kvstore import SQLiteKV
+from ..constant.llm import (
+    MODEL, MINDMAP_PROMPT_TEMPLATE, MINDMAP_CHUNK_PROMPT_TEMPLATE, MINDMAP_REDUCE_PROMPT_TEMPLATE,
+    MINDMAP_CHUNK_CHARS, MINDMAP_LLM_CONCURRENCY, MINDMAP_REDUCE_FAN_IN
+)
+
+OUTLINE_SEPARATOR = "\n\n---\n\n"
+
+
+def chunk_document(texts: List[str], max_chars: int = MINDMAP_CHUNK_CHARS) -> List[str]:
+    """Pack page texts in order into chunks of at most `max_chars`; longer pages are split on paragraphs."""
+    pieces = []
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        while len(text) > max_chars:
+            cut = text.rfind("\n\n", 0, max_chars)
+            if cut <= 0:
+                cut = text.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(text[:cut].strip())
+            text = text[cut:].strip()
+        if text:
+            pieces.append(text)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def summary_key(chunk: str) -> str:
+    """Same chunk, model and chunk prompt give the same outline."""
+    return hashlib.sha256(f"{MODEL}\0{MINDMAP_CHUNK_PROMPT_TEMPLATE}\0{chunk}".encode("utf-8")).hexdigest()
+
+
+async def build_mind_map(texts: List[str], complete: Callable[[str], Awaitable[str]],
+                         cache: Optional[SQLiteKV] = None, concurrency: int = MINDMAP_LLM_CONCURRENCY,
+                         fan_in: int = MINDMAP_REDUCE_FAN_IN, max_chars: int = MINDMAP_CHUNK_CHARS) -> str:
+    """Markdown mind map of the whole document; `complete` sends one prompt to the LLM and returns its text."""
+    chunks = chunk_document(texts, max_chars)
+    if not chunks:
+        raise ValueError("The document has no text")
+    if len(chunks) == 1:
+        # Fits in one prompt: same single call as before
+        return await complete(MINDMAP_PROMPT_TEMPLATE.format(content=chunks[0]))
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def limited(prompt: str) -> str:
+        async with semaphore:
+            return await complete(prompt)
+
+    # Map: partial outline per chunk, cached by content hash
+    keys = [summary_key(chunk) for chunk in chunks]
+    # SQLite calls block: keep them off the event loop, and write new outlines in one batch
+    cached = await asyncio.to_thread(cache.get_many, keys) if cache is not None else {}
+    new_outlines = {}
+
+    async def summarize(chunk: str, key: str) -> str:
+        if key in cached:
+            return cached[key].decode("utf-8")
+        outline = await limited(MINDMAP_CHUNK_PROMPT_TEMPLATE.format(content=chunk))
+        if outline.strip():
+            new_outlines[key] = outline.encode("utf-8")
+        return outline
+
+    outlines = await asyncio.gather(*(summarize(chunk, key) for chunk, key in zip(chunks, keys)))
+    if cache is not None:
+        await asyncio.to_thread(cache.put_many, new_outlines)
+    print(f"Mind map: {len(chunks)} chunks, {sum(key in cached for key in keys)} outlines from cache")
+
+    # Reduce: merge neighbouring outlines until one final prompt can take them all
+    fan_in = max(2, fan_in)
+    while len(outlines) > fan_in:
+        groups = [outlines[i:i + fan_in] for i in range(0, len(outlines), fan_in)]
+        outlines = await asyncio.gather(*(
+            limited(MINDMAP_REDUCE_PROMPT_TEMPLATE.format(outlines=OUTLINE_SEPARATOR.join(group)))
+            if len(group) > 1 else asyncio.sleep(0, result=group[0])
+            for group in groups
+        ))
+    return await limited(MINDMAP_PROMPT_TEMPLATE.format(content=OUTLINE_SEPARATOR.join(outlines)))
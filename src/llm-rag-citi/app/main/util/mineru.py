@@ -0,0 +1,88 @@
+"""
+Page-parallel MinerU parsing.
+
+parse_doc analyses a whole PDF in one go, so ingestion of a long document waits
+for the last page before chunking and embedding can start. Here PDFs are split
+into page ranges (start_page_id/end_page_id), the ranges are analysed by a
+bounded process pool and their content-list items are yielded in page order as
+soon as each range (and every range before it) is done.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..constant.parse import MINERU_WORKERS, MINERU_PAGES_PER_RANGE, MINERU_DEBUG_DUMPS, MINERU_OUTPUT_DIR
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def page_ranges(total_pages: int, pages_per_range: int) -> List[Tuple[int, Optional[int]]]:
+    """(start, inclusive end) page ids covering the document; one open range when it isn't split."""
+    if total_pages <= 0 or pages_per_range <= 0 or total_pages <= pages_per_range:
+        return [(0, None)]
+    return [(start, min(start + pages_per_range, total_pages) - 1) for start in range(0, total_pages, pages_per_range)]
+
+
+def count_pages(file_path: str) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(file_path) as doc:
+        return len(doc)
+
+
+def parse_range(file_path: str, start: int, end: Optional[int], lang: str, backend: str, method: str) -> List[Dict]:
+    """Content-list items of one page range, page_idx relative to the whole document (runs in a pool process)."""
+    # Imported here: loads MinerU (and its models) only in the processes that parse
+    from .demo.demo import parse_doc
+
+    contents = parse_doc(
+        path_list=[file_path],
+        output_dir=MINERU_OUTPUT_DIR,
+        lang=lang,
+        backend=backend,
+        method=method,
+        start_page_id=start,
+        end_page_id=end,
+        debug=MINERU_DEBUG_DUMPS,
+    )
+    items = []
+    for item in contents[0]:
+        page_idx = item.get("page_idx", -1)
+        items.append({"text": item.get("text", ""), "page_idx": page_idx + start if page_idx >= 0 else -1})
+    return items
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process pool shared by every parse in this process; the workers keep their models loaded."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: MinerU/torch state (CUDA above all) must not be forked
+            _pool = ProcessPoolExecutor(max_workers=MINERU_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def iter_mineru_items(file_path: str, tag: str, lang: str = "en", backend: str = "pipeline",
+                      method: str = "auto") -> Iterator[Dict]:
+    """Yield {"text", "page_idx"} items of the document in page order, range by range."""
+    ranges = page_ranges(count_pages(file_path), MINERU_PAGES_PER_RANGE) if tag == 'pdf' else [(0, None)]
+    if len(ranges) > 1:
+        print(f"MinerU: {file_path} split into {len(ranges)} page ranges")
+
+    if MINERU_WORKERS <= 0:
+        for start, end in ranges:
+            yield from parse_range(file_path, start, end, lang, backend, method)
+        return
+
+    pool = get_pool()
+    futures = [pool.submit(parse_range, file_path, start, end, lang, backend, method) for start, end in ranges]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        # Consumer stopped early (or a range failed): don't parse the rest for nothing
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import zlib
+from functools import lru_cache
+from importlib import metadata
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from llama_index.core.schema import Document
+
+from .kvstore import SQLiteKV
+from ..metrics.collectors import record_parse_cache
+
+# Bump when the normalization of parsed items changes (clean_text, metadata layout...)
+PARSE_FORMAT_VERSION = 1
+
+# Distribution whose version goes into the key of each parser
+PARSER_PACKAGES = {
+    "pymu": ("PyMuPDF", "llama-index-readers-file"),
+    "docling": ("llama-index-readers-docling", "docling"),
+    "mineru": ("mineru",),
+}
+
+
+@lru_cache(maxsize=None)
+def parser_version(parser: str) -> str:
+    """Installed versions of the packages doing the parsing, so an upgrade never serves stale text."""
+    versions = []
+    for package in PARSER_PACKAGES.get(parser, ()):
+        try:
+            versions.append(f"{package}={metadata.version(package)}")
+        except metadata.PackageNotFoundError:
+            versions.append(f"{package}=none")
+    return ",".join(versions)
+
+
+def file_digest(file_path: str, block_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pack_documents(documents: Iterable[Document]) -> bytes:
+    """zlib-compressed JSON list of [text, metadata] items."""
+    items = [[document.text, document.metadata] for document in documents]
+    return zlib.compress(json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def unpack_documents(blob: bytes, file_path: str) -> List[Document]:
+    documents = []
+    for text, document_metadata in json.loads(zlib.decompress(blob)):
+        if "file_path" in document_metadata:
+            # Same bytes, but this copy lives at a new local path
+            document_metadata["file_path"] = file_path
+        documents.append(Document(text=text, metadata=document_metadata))
+    return documents
+
+
+class ParseCache:
+    """
+    Parsed documents keyed by file content hash + file type + parser + parser version.
+
+    Parsing (above all MinerU layout/OCR) is the most expensive CPU stage of
+    ingestion, and the same bytes come back on re-index, private/public moves and
+    mind maps. Entries are the normalized page-tagged Documents (text + metadata)
+    stored compressed in a size-bounded SQLite file with LRU eviction (SQLiteKV).
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.store = SQLiteKV(path, max_bytes, table="parsed")
+
+    def key(self, file_path: str, tag: str, parser: str, digest: Optional[str] = None) -> str:
+        """`digest` (SHA-256 of the content) spares re-hashing, e.g. for bytes never written to `file_path`."""
+        identity = f"{digest or file_digest(file_path)}\0{tag}\0{parser}\0{parser_version(parser)}\0{PARSE_FORMAT_VERSION}"
+        return hashlib.sha256(identity.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, file_path: str, parser: str) -> Optional[List[Document]]:
+        blob = self.store.get(key)
+        record_parse_cache(parser, "hit" if blob is not None else "miss")
+        return unpack_documents(blob, file_path) if blob is not None else None
+
+    def lookup(self, file_path: str, tag: str, parser: str) -> Optional[List[Document]]:
+        """Cached documents of the file if it was parsed before, without parsing it otherwise."""
+        try:
+            return self.get(self.key(file_path, tag, parser), file_path, parser)
+        except Exception as e:
+            print(f"Parse cache lookup failed: {e}")
+            return None
+
+    def put(self, key: str, documents: List[Document]):
+        self.store.put(key, pack_documents(documents))
+
+    def cached(self, file_path: str, tag: str, parser: str, parse: Callable[[], Iterable[Document]],
+               digest: Optional[str] = None) -> Iterator[Document]:
+        """
+        Yield the cached documents of the file, or the ones `parse()` yields (lazily,
+        so streaming readers keep streaming) and keep them once fully consumed.
+        Cache failures only cost the cache, parsing goes on.
+        """
+        try:
+            key = self.key(file_path, tag, parser, digest)
+            documents = self.get(key, file_path, parser)
+        except Exception as e:
+            print(f"Parse cache lookup failed: {e}")
+            yield from parse()
+            return
+
+        if documents is not None:
+            print(f"Parse cache hit for {file_path} ({parser}), {len(documents)} items")
+            yield from documents
+            return
+
+        parsed = []
+        for document in parse():
+            parsed.append(document)
+            yield document
+        try:
+            self.put(key, parsed)
+        except Exception as e:
+            print(f"Parse cache store failed: {e}")
@@ -0,0 +1,318 @@
+"""
+Pooled SFTP transfers to the NAS.
+
+Every fetch/move used to open its own SSHClient (TCP + SSH handshake + password
+auth) and download into DOCUMENT_DIR before anything else could happen.
+SFTPPool keeps a bounded set of authenticated sessions per process and probes
+idle ones before reuse. SFTPTransfer downloads with pipelined reads (paramiko
+prefetch), resumes an interrupted download from the last byte received on a
+fresh session, can hand back the bytes without a local file, and keeps local
+copies keyed by remote path + mtime + size so repeated operations on an
+unchanged file cost one stat round trip instead of a download.
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional, Tuple
+
+from ..metrics.collectors import record_sftp_fetch
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class SFTPConnectionError(Exception):
+    """No session could be opened to the NAS (network, handshake or authentication)."""
+
+
+def paramiko_connector(host: str, port: int, username: str, password: str, timeout: float) -> Callable:
+    """Factory of (SSHClient, SFTPClient) sessions to the NAS."""
+    def connect():
+        import paramiko
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(hostname=host, port=port, username=username, password=password,
+                       timeout=timeout, banner_timeout=timeout, auth_timeout=timeout)
+        client.get_transport().set_keepalive(30)
+        return client, client.open_sftp()
+    return connect
+
+
+class _Session:
+    def __init__(self, client, sftp):
+        self.client = client
+        self.sftp = sftp
+        self.last_used = time.monotonic()
+
+    def active(self) -> bool:
+        transport = self.client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def close(self):
+        try:
+            self.sftp.close()
+        finally:
+            self.client.close()
+
+
+class SFTPPool:
+    """
+    At most `max_size` SFTP sessions checked out at once; released sessions are
+    kept for reuse. A session idle for more than `idle_check_seconds` is probed
+    with a cheap round trip before it is handed out, dead ones are replaced.
+    """
+
+    def __init__(self, connect: Callable[[], Tuple[object, object]], max_size: int = 4,
+                 idle_check_seconds: float = 30.0):
+        self._connect = connect
+        self.idle_check_seconds = idle_check_seconds
+        self._idle: List[_Session] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _healthy(self, session: _Session) -> bool:
+        if not session.active():
+            return False
+        if time.monotonic() - session.last_used < self.idle_check_seconds:
+            return True
+        try:
+            session.sftp.normalize(".")
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self) -> _Session:
+        while True:
+            with self._lock:
+                session = self._idle.pop() if self._idle else None
+            if session is None:
+                try:
+                    return _Session(*self._connect())
+                except Exception as e:
+                    raise SFTPConnectionError(str(e)) from e
+            if self._healthy(session):
+                return session
+            session.close()
+
+    @contextmanager
+    def session(self):
+        """Yield an SFTPClient; it goes back to the pool unless its connection died."""
+        self._slots.acquire()
+        session = None
+        try:
+            session = self._checkout()
+            yield session.sftp
+        finally:
+            if session is not None:
+                if session.active():
+                    session.last_used = time.monotonic()
+                    with self._lock:
+                        self._idle.append(session)
+                else:
+                    session.close()
+            self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            session.close()
+
+
+class FileCache:
+    """Local copies of remote files in one directory, bounded to `max_bytes` (least recently used evicted first)."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(remote_path: str, mtime: int, size: int) -> str:
+        return hashlib.sha256(f"{remote_path}\0{mtime}\0{size}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def _hit(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            os.utime(path)  # mtime doubles as last access for eviction
+            return path
+        except FileNotFoundError:
+            return None
+
+    def copy_to(self, key: str, target_path: str) -> bool:
+        """Place the cached copy at `target_path` (hard link when possible); False on a miss."""
+        path = self._hit(key)
+        if path is None:
+            return False
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        try:
+            os.link(path, target_path)
+        except OSError:
+            shutil.copyfile(path, target_path)
+        return True
+
+    def read(self, key: str) -> Optional[bytes]:
+        path = self._hit(key)
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def put_file(self, key: str, source_path: str):
+        staging = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        shutil.copyfile(source_path, staging)
+        os.replace(staging, self._path(key))
+        self._evict()
+
+    def put_bytes(self, key: str, data: bytes):
+        staging = f"{self._path(key)}.{threading.get_ident()}.tmp"
+        with open(staging, "wb") as f:
+            f.write(data)
+        os.replace(staging, self._path(key))
+        self._evict()
+
+    def rekey(self, old_key: str, new_key: str):
+        try:
+            os.replace(self._path(old_key), self._path(new_key))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            if total <= self.max_bytes:
+                return
+            target = int(self.max_bytes * 0.9)
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+class SFTPTransfer:
+    """Downloads, streaming reads and renames on the NAS through an SFTPPool (+ optional FileCache)."""
+
+    def __init__(self, pool: SFTPPool, cache: Optional[FileCache] = None, prefetch_requests: int = 64,
+                 max_retries: int = 3):
+        self.pool = pool
+        self.cache = cache
+        self.prefetch_requests = prefetch_requests
+        self.max_retries = max_retries
+
+    def _stat(self, remote_path: str):
+        with self.pool.session() as sftp:
+            return sftp.stat(remote_path)
+
+    def _cache_key(self, remote_path: str, attrs) -> str:
+        return FileCache.key(remote_path, int(attrs.st_mtime or 0), int(attrs.st_size or 0))
+
+    def _transfer(self, remote_path: str, size: int, out):
+        """Copy the remote file into `out`, reconnecting and resuming from out.tell() when a session drops."""
+        attempt = 0
+        while True:
+            offset = out.tell()
+            try:
+                with self.pool.session() as sftp, sftp.open(remote_path, "rb") as remote_file:
+                    remote_file.seek(offset)
+                    try:
+                        remote_file.prefetch(size, self.prefetch_requests)
+                    except TypeError:
+                        # paramiko < 3.3 has no max_concurrent_requests
+                        remote_file.prefetch(size)
+                    while True:
+                        chunk = remote_file.read(READ_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                if out.tell() < size:
+                    raise EOFError(f"got {out.tell()} of {size} bytes")
+                return
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries or isinstance(e, FileNotFoundError):
+                    raise
+                print(f"SFTP download of {remote_path} interrupted at {out.tell()} bytes ({e}), resuming")
+
+    def fetch(self, remote_path: str, local_path: str):
+        """Download `remote_path` to `local_path`, from the local cache when the file didn't change."""
+        attrs = self._stat(remote_path)
+        key = self._cache_key(remote_path, attrs)
+        if self.cache is not None and self.cache.copy_to(key, local_path):
+            record_sftp_fetch("cache")
+            return
+
+        partial = f"{local_path}.part"
+        with open(partial, "wb") as out:
+            self._transfer(remote_path, attrs.st_size, out)
+        os.replace(partial, local_path)
+        record_sftp_fetch("nas")
+        if self.cache is not None:
+            self.cache.put_file(key, local_path)
+
+    def read_bytes(self, remote_path: str) -> bytes:
+        """Content of `remote_path` in memory, without writing it to DOCUMENT_DIR."""
+        attrs = self._stat(remote_path)
+        key = self._cache_key(remote_path, attrs)
+        if self.cache is not None:
+            data = self.cache.read(key)
+            if data is not None:
+                record_sftp_fetch("cache")
+                return data
+
+        buffer = io.BytesIO()
+        self._transfer(remote_path, attrs.st_size, buffer)
+        data = buffer.getvalue()
+        record_sftp_fetch("nas")
+        if self.cache is not None:
+            self.cache.put_bytes(key, data)
+        return data
+
+    def exists(self, remote_path: str) -> bool:
+        try:
+            self._stat(remote_path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def rename(self, source_path: str, target_path: str) -> bool:
+        """
+        Move a file on the NAS (creating the target directory); its cached copy follows it.
+        Idempotent: when the source is gone but the target exists (a previous attempt already
+        moved it) nothing is done and False is returned.
+        """
+        with self.pool.session() as sftp:
+            try:
+                attrs = sftp.stat(source_path)
+            except FileNotFoundError:
+                sftp.stat(target_path)  # neither exists: FileNotFoundError for the caller
+                print(f"{source_path} was already moved to {target_path}")
+                return False
+            target_directory = os.path.dirname(target_path)
+            try:
+                sftp.stat(target_directory)
+            except IOError:
+                sftp.mkdir(target_directory)
+            sftp.rename(source_path, target_path)
+        if self.cache is not None:
+            # A rename keeps mtime and size, only the path part of the key changes
+            self.cache.rekey(self._cache_key(source_path, attrs), self._cache_key(target_path, attrs))
+        return True
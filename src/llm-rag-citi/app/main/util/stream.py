@@ -0,0 +1,120 @@
+import json
+import time
+from typing import Callable, Dict, List
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+
+def sse_event(payload) -> str:
+    """One Server-Sent Events frame; dict payloads are sent as JSON."""
+    data = payload if isinstance(payload, str) else json.dumps(payload)
+    return f"data: {data}\n\n"
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of `text` that is a proper prefix of `tag` (at most len(tag) - 1)."""
+    # The tags only contain "<" as their first character, so only the last "<" can start one
+    start = text.rfind("<", max(0, len(text) - len(tag) + 1))
+    if start < 0 or not tag.startswith(text[start:]):
+        return 0
+    return len(text) - start
+
+
+class ThinkTagParser:
+    """
+    Incremental splitter of streamed LLM tokens into answer and thinking parts.
+
+    With `enabled` (ultrathink), text inside <think>...</think> is emitted as
+    {"thinking_token": ...} and everything else as {"answer_token": ...}.
+    Two states (answer / thinking) plus at most len("</think>") - 1 held-back
+    characters that may start the next tag, so each token costs O(len(token))
+    no matter how long the answer already is. Without `enabled` every token
+    is passed through as an answer token.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.in_thinking = False
+        self._held = ""
+
+    def _emit(self, events: List[Dict[str, str]], text: str):
+        if text:
+            events.append({"thinking_token" if self.in_thinking else "answer_token": text})
+
+    def feed(self, token: str) -> List[Dict[str, str]]:
+        if not token:
+            return []
+        if not self.enabled:
+            # No thinking mode, stream normally
+            return [{"answer_token": token}]
+
+        events = []
+        text = self._held + token
+        self._held = ""
+        while text:
+            tag = THINK_CLOSE if self.in_thinking else THINK_OPEN
+            index = text.find(tag)
+            if index < 0:
+                # Hold back a possible partial tag at the end, emit the rest
+                held = _partial_tag_length(text, tag)
+                self._emit(events, text[:len(text) - held])
+                self._held = text[len(text) - held:]
+                break
+            self._emit(events, text[:index])
+            self.in_thinking = not self.in_thinking
+            text = text[index + len(tag):]
+        return events
+
+    def flush(self) -> List[Dict[str, str]]:
+        """Whatever is still held back once the LLM stream ended."""
+        events = []
+        self._emit(events, self._held)
+        self._held = ""
+        return events
+
+
+class SSECoalescer:
+    """
+    Packs consecutive answer/thinking events into fewer SSE frames.
+
+    Text of the same kind is buffered and sent as one frame once `max_bytes`
+    of text is buffered or the oldest buffered text is `max_delay_ms` old,
+    whichever comes first (checked whenever events arrive); a change of kind
+    sends the buffered text first so ordering is kept. With both limits at 0
+    every batch of events is sent right away.
+    """
+
+    def __init__(self, max_delay_ms: float = 0, max_bytes: int = 0, clock: Callable[[], float] = time.monotonic):
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._kind = None
+        self._parts: List[str] = []
+        self._size = 0
+        self._since = None
+
+    def _frame(self) -> str:
+        frame = sse_event({self._kind: "".join(self._parts)})
+        self._parts = []
+        self._size = 0
+        self._since = None
+        return frame
+
+    def add(self, events: List[Dict[str, str]]) -> List[str]:
+        frames = []
+        for event in events:
+            for kind, text in event.items():
+                if kind != self._kind and self._parts:
+                    frames.append(self._frame())
+                self._kind = kind
+                self._parts.append(text)
+                self._size += len(text.encode("utf-8"))
+                if self._since is None:
+                    self._since = self.clock()
+        if self._parts and (self._size >= self.max_bytes or self.clock() - self._since >= self.max_delay):
+            frames.append(self._frame())
+        return frames
+
+    def flush(self) -> List[str]:
+        return [self._frame()] if self._parts else []
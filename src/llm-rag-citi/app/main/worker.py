@@ -0,0 +1,146 @@
+"""
+Background job workers for document ingestion, deletion and mind maps.
+
+Jobs are stored in the SQLite JobStore (util/jobs.py). Each worker is a
+separate process with its own Milvus connection that claims one job at a
+time, renews the job's lease while it runs and publishes progress.
+Workers are started by create_app (JOB_WORKERS) or separately with
+`python worker.py`, so ingestion can be scaled independently of chat.
+"""
+
+import asyncio
+import atexit
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from .constant.job import JOB_DB_PATH, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL
+from .response import HTTPRequestException
+from .util.jobs import JobStore
+
+# Progress is written to the store at most this often (and the lease renewed with it)
+HEARTBEAT_INTERVAL = min(JOB_LEASE_SECONDS / 3, 2.0)
+
+# Set in the environment of the job worker processes only, so their create_app doesn't
+# spawn workers of its own. (Any other child process, e.g. uvicorn --workers/--reload,
+# still starts its workers.)
+JOB_WORKER_ENV = "CITI_JOB_WORKER"
+
+
+async def run_closing_clients(coroutine):
+    """Await `coroutine`, then close the pooled HTTP clients bound to this (short-lived) loop."""
+    from . import langchain_embedding_model
+
+    try:
+        return await coroutine
+    finally:
+        await langchain_embedding_model.aclose()
+
+
+def run_job(job: Dict[str, Any], report: Callable[[Dict[str, int]], None]) -> Any:
+    # Imported here: the services need the app package fully initialised
+    from .service.document_service import insert_doc, delete_doc, mind_map
+
+    payload = job["payload"]
+    kind = job["kind"]
+
+    if kind == "insert_doc":
+        if job["attempts"] > 1 and not payload.get("change"):
+            # A previous attempt may have died halfway, drop its rows before re-ingesting
+            print(f"Retrying insert of {payload['document_id']}, removing partial rows first")
+            delete_doc(payload["document_id"], payload["collection_name"], payload["user_id"])
+        insert_doc(progress_callback=report, **payload)
+        return None
+
+    if kind == "delete_doc":
+        delete_doc(**payload)
+        return None
+
+    if kind == "mind_map":
+        return asyncio.run(run_closing_clients(mind_map(**payload)))
+
+    raise HTTPRequestException(message=f"Unknown job type: {kind}")
+
+
+def process_job(store: JobStore, job: Dict[str, Any], owner: str):
+    progress = {}
+    done = threading.Event()
+
+    def heartbeat():
+        while not done.wait(HEARTBEAT_INTERVAL):
+            if not store.heartbeat(job["id"], owner, JOB_LEASE_SECONDS, dict(progress)):
+                print(f"Lost the lease on job {job['id']}")
+                return
+
+    beat = threading.Thread(target=heartbeat, name=f"job-heartbeat-{job['id']}", daemon=True)
+    beat.start()
+    print(f"[{owner}] running {job['kind']} job {job['id']} (attempt {job['attempts']})")
+
+    try:
+        result = run_job(job, progress.update)
+        store.complete(job["id"], owner, result, dict(progress))
+    except HTTPRequestException as e:
+        # Client errors (bad input, missing document) won't get better on retry
+        print(f"[{owner}] job {job['id']} failed: {e.message}")
+        store.fail(job["id"], owner, e.message, retry=e.status_code >= 500)
+    except Exception as e:
+        print(f"[{owner}] job {job['id']} failed: {str(e)}")
+        store.fail(job["id"], owner, str(e))
+    finally:
+        done.set()
+        beat.join()
+
+
+def worker_loop(store: JobStore, owner: str, stop_event: threading.Event = None):
+    while stop_event is None or not stop_event.is_set():
+        job = store.claim(owner, JOB_LEASE_SECONDS)
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+        process_job(store, job, owner)
+
+
+def run_worker(config_name: str, index: int = 0):
+    """Entry point of a worker process."""
+    from . import create_app
+
+    os.environ[JOB_WORKER_ENV] = "1"
+    create_app(config_name)
+    owner = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    worker_loop(JobStore(JOB_DB_PATH, JOB_MAX_ATTEMPTS), owner)
+
+
+def start_workers(config_name: str, count: int):
+    """Spawn `count` worker processes (no-op inside a job worker)."""
+    if count <= 0 or os.getenv(JOB_WORKER_ENV) == "1":
+        return []
+
+    # spawn: workers must not inherit the parent's Milvus/HTTP connections
+    context = multiprocessing.get_context("spawn")
+    processes = []
+    # The spawn bootstrap re-imports the launching module (runner.py calls create_app at
+    # import) before run_worker runs: mark the children through the environment they
+    # inherit, so that import doesn't try to start workers too
+    previous = os.environ.get(JOB_WORKER_ENV)
+    os.environ[JOB_WORKER_ENV] = "1"
+    try:
+        for index in range(count):
+            process = context.Process(target=run_worker, args=(config_name, index), name=f"job-worker-{index}")
+            process.start()
+            processes.append(process)
+    finally:
+        if previous is None:
+            del os.environ[JOB_WORKER_ENV]
+        else:
+            os.environ[JOB_WORKER_ENV] = previous
+
+    def stop():
+        for process in processes:
+            process.terminate()
+
+    atexit.register(stop)
+    print(f"Started {count} job worker processes")
+    return processes
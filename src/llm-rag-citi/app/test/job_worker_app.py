@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Launcher used by test_jobs: like runner.py it starts the job workers at import
+time (through create_app), so each spawned worker re-imports this module before
+running. create_app and run_job are replaced, no Milvus or services are needed.
+Exits 0 once a worker has completed the queued job.
+"""
+
+import os
+import sys
+import time
+
+import app.main as main_package
+from app.main import worker
+from app.main.constant.job import JOB_DB_PATH, JOB_MAX_ATTEMPTS
+from app.main.util.jobs import JobStore, JOB_SUCCEEDED
+
+
+def create_app(config_name: str):
+    worker.start_workers(config_name, 1)
+
+
+def run_job(job, report):
+    report({"processed": 1})
+    return {"worker_pid": os.getpid()}
+
+
+main_package.create_app = create_app
+worker.run_job = run_job
+
+# At import, like runner.py's `app = create_app(env)`
+create_app("test")
+
+
+if __name__ == "__main__":
+    store = JobStore(JOB_DB_PATH, JOB_MAX_ATTEMPTS)
+    job_id = store.enqueue("insert_doc", {"document_id": "spawned"})
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] == JOB_SUCCEEDED:
+            print(f"Job {job_id} completed by worker {job['result']['worker_pid']}")
+            sys.exit(0)
+        time.sleep(0.2)
+    print(f"Job {job_id} not completed: {store.get(job_id)}")
+    sys.exit(1)
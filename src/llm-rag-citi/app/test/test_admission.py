@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Admission controller test: concurrency limit, per-user round-robin,
+bounded queue (429) and queue timeout. Runs without any backend.
+"""
+
+import asyncio
+
+from app.main.util.admission import AdmissionController, AdmissionRejected
+
+
+async def hold(controller, user, order, release_event):
+    async with controller.slot(user):
+        order.append(user)
+        await release_event.wait()
+
+
+async def main():
+    # Test 1: limit + round-robin across users
+    print("=== Test 1: fairness ===")
+    controller = AdmissionController("test", limit=1, max_queue=10, queue_timeout=5)
+    order, gate = [], asyncio.Event()
+    gate.set()
+    blocker = asyncio.Event()
+
+    first = asyncio.create_task(hold(controller, "a", order, blocker))
+    await asyncio.sleep(0)
+    assert controller.stats()["active"] == 1
+
+    # User "a" floods the queue before "b" and "c" show up
+    tasks = [asyncio.create_task(hold(controller, user, order, gate)) for user in ("a", "a", "a", "b", "c")]
+    await asyncio.sleep(0.01)
+    assert controller.stats()["waiting"] == 5 and controller.stats()["users_waiting"] == 3
+
+    blocker.set()
+    await asyncio.gather(first, *tasks)
+    assert order == ["a", "a", "b", "c", "a", "a"], f"Unfair order: {order}"
+    assert controller.stats() == {"limit": 1, "active": 0, "waiting": 0, "users_waiting": 0}
+    print(f"✓ Slots handed out round-robin: {order}\n")
+
+    # Test 2: full queue is rejected right away
+    print("=== Test 2: bounded queue ===")
+    controller = AdmissionController("test", limit=1, max_queue=1, queue_timeout=5)
+    blocker = asyncio.Event()
+    running = asyncio.create_task(hold(controller, "a", [], blocker))
+    queued = asyncio.create_task(hold(controller, "b", [], blocker))
+    await asyncio.sleep(0.01)
+    try:
+        await controller.acquire("c")
+        raise AssertionError("Third request should be rejected")
+    except AdmissionRejected as e:
+        assert e.reason == "queue full" and e.retry_after >= 1
+    blocker.set()
+    await asyncio.gather(running, queued)
+    print("✓ Request beyond the queue bound rejected (429)\n")
+
+    # Test 3: queue timeout and cancellation don't leak slots
+    print("=== Test 3: timeout / cancel ===")
+    controller = AdmissionController("test", limit=1, max_queue=5, queue_timeout=0.05)
+    blocker = asyncio.Event()
+    running = asyncio.create_task(hold(controller, "a", [], blocker))
+    await asyncio.sleep(0)
+    try:
+        await controller.acquire("b")
+        raise AssertionError("Queued request should time out")
+    except AdmissionRejected as e:
+        assert e.reason == "queue timeout"
+
+    cancelled = asyncio.create_task(controller.acquire("c"))
+    await asyncio.sleep(0.01)
+    cancelled.cancel()
+    await asyncio.gather(cancelled, return_exceptions=True)
+    assert controller.stats()["waiting"] == 0
+
+    blocker.set()
+    await running
+    assert controller.stats()["active"] == 0, controller.stats()
+    print("✓ Timed out and cancelled waiters leave no slot or queue entry behind\n")
+
+
+asyncio.run(main())
+print("All admission tests passed")
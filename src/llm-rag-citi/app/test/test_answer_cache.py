@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Semantic answer cache test: lookup by scope + retrieved chunks + question
+similarity, invalidation by cited document, TTL and size eviction.
+Runs on a temporary SQLite file, no backend needed.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from app.main.util.answer_cache import AnswerCache, answer_scope, merge_events, split_events
+
+tmp = tempfile.mkdtemp()
+cache = AnswerCache(os.path.join(tmp, "answers.db"), max_bytes=1024 * 1024, ttl_seconds=60, threshold=0.95)
+
+rng = np.random.default_rng(0)
+question = rng.normal(size=1024).astype(np.float32)
+paraphrase = question + rng.normal(scale=0.05, size=1024).astype(np.float32)
+unrelated = rng.normal(size=1024).astype(np.float32)
+scope = answer_scope("user-1", ["doc-b", "doc-a"], hyde=False, reranking=True, ultrathink=False)
+events = merge_events([{"thinking_token": "hm"}, {"thinking_token": "m"}, {"answer_token": "Jawaban "}, {"answer_token": "42"}])
+assert events == [{"thinking_token": "hmm"}, {"answer_token": "Jawaban 42"}]
+
+# Test 1: hit only for the same scope, same chunk set and a similar question
+print("=== Test 1: lookup ===")
+cache.put(scope, question, ["c2", "c1"], ["doc-a", "doc-b"], events)
+assert cache.get(scope, paraphrase, ["c1", "c2"]) == events
+assert cache.get(answer_scope("user-1", ["doc-a", "doc-b"], False, True, False), question, ["c1", "c2"]) == events
+assert cache.get(answer_scope("user-2", ["doc-a", "doc-b"], False, True, False), question, ["c1", "c2"]) is None
+assert cache.get(scope, question, ["c1", "c3"]) is None
+assert cache.get(scope, unrelated, ["c1", "c2"]) is None
+print("✓ Paraphrase hits; other user, other chunks or unrelated question miss\n")
+
+# Test 2: invalidation by cited document
+print("=== Test 2: invalidation ===")
+assert cache.invalidate_documents(["doc-x"]) == 0
+assert cache.invalidate_documents(["doc-b"]) == 1
+assert cache.get(scope, question, ["c1", "c2"]) is None
+assert cache.stats() == {"entries": 0, "bytes": 0}
+print("✓ Entries citing a changed document are dropped\n")
+
+# Test 3: TTL and size budget
+print("=== Test 3: TTL / eviction ===")
+short = AnswerCache(os.path.join(tmp, "short.db"), max_bytes=1024 * 1024, ttl_seconds=0.05, threshold=0.95)
+short.put(scope, question, ["c1"], ["doc-a"], events)
+time.sleep(0.1)
+assert short.get(scope, question, ["c1"]) is None
+
+small = AnswerCache(os.path.join(tmp, "small.db"), max_bytes=20000, ttl_seconds=60, threshold=0.95)
+for i in range(10):
+    small.put(scope, question, [f"c{i}"], ["doc-a"], [{"answer_token": f"answer {i}"}])
+assert 0 < small.stats()["bytes"] <= 20000
+stored = sqlite3.connect(small.path).execute("SELECT SUM(size) FROM answers").fetchone()[0]
+assert small.stats()["bytes"] == stored, "The running byte total should match the table"
+assert small.get(scope, question, ["c9"]) == [{"answer_token": "answer 9"}]
+assert small.get(scope, question, ["c0"]) is None
+print("✓ Expired and least recently used entries are dropped\n")
+
+assert split_events([{"answer_token": "abcdefg"}], 3) == [{"answer_token": "abc"}, {"answer_token": "def"}, {"answer_token": "g"}]
+print("All answer cache tests passed")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Embedding cache test: packing round-trip, LRU byte bound and the SQLite tier.
+Runs without the embedding service or Milvus.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+
+from app.main.util.embedding_cache import EmbeddingCache, pack_embedding, unpack_embedding
+
+# Test 1: compact packing round-trip
+print("=== Test 1: pack/unpack ===")
+embedding = {"dense": np.arange(1024, dtype=np.float32) / 1024, "sparse": {"12": 0.5, 7: 0.25}}
+blob = pack_embedding(embedding)
+assert len(blob) == 8 + 1024 * 4 + 2 * 8, f"Unexpected packed size {len(blob)}"
+restored = unpack_embedding(blob)
+assert np.array_equal(restored["dense"], embedding["dense"])
+assert restored["sparse"] == {12: 0.5, 7: 0.25}
+print(f"✓ 1024-dim dense + 2 sparse weights packed into {len(blob)} bytes\n")
+
+# Test 2: memory tier only embeds unseen texts and stays within its byte budget
+print("=== Test 2: memory LRU ===")
+calls = []
+
+def fake_embed(texts):
+    calls.append(list(texts))
+    return [{"dense": [float(len(text))] * 4, "sparse": {len(text): 1.0}} for text in texts]
+
+cache = EmbeddingCache("bge-m3", max_bytes=10 * len(pack_embedding(fake_embed(["x"])[0])))
+calls.clear()
+results = cache.get_or_embed(["a", "bb", "a"], fake_embed)
+assert calls == [["a", "bb"]], f"Duplicates should be embedded once, got {calls}"
+assert [r["sparse"] for r in results] == [{1: 1.0}, {2: 1.0}, {1: 1.0}]
+
+cache.get_or_embed(["a", "bb", "ccc"], fake_embed)
+assert calls[-1] == ["ccc"], f"Only the new text should be embedded, got {calls[-1]}"
+
+cache.get_or_embed([f"text-{i}" for i in range(50)], fake_embed)
+assert cache.stats()["memory_bytes"] <= cache.max_bytes
+assert cache.get("a") is None, "Oldest entry should have been evicted"
+print("✓ Cache hits skip the embedder and eviction respects the byte budget\n")
+
+# Test 3: disk tier survives a new process-level cache
+print("=== Test 3: SQLite tier ===")
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "embeddings.db")
+    EmbeddingCache("bge-m3", max_bytes=1024, disk_path=path, disk_max_bytes=1 << 20).put(
+        "persisted", {"dense": [1.0, 2.0], "sparse": {3: 0.5}})
+
+    fresh = EmbeddingCache("bge-m3", max_bytes=1024, disk_path=path, disk_max_bytes=1 << 20)
+    hit = fresh.get("persisted")
+    assert hit is not None and hit["dense"].tolist() == [1.0, 2.0] and hit["sparse"] == {3: 0.5}
+    assert EmbeddingCache("other-model", max_bytes=1024, disk_path=path,
+                          disk_max_bytes=1 << 20).get("persisted") is None, "Keys must include the model"
+
+    small = EmbeddingCache("bge-m3", max_bytes=0, disk_path=path, disk_max_bytes=2000)
+    small.put_many([f"doc-{i}" for i in range(100)], [{"dense": [0.0] * 16, "sparse": {}}] * 100)
+    assert small.disk.total_bytes <= 2000, "Disk tier should evict down to its budget"
+    fresh.disk.close()
+    small.disk.close()
+print("✓ Disk tier persists entries, separates models and evicts by size\n")
+
+# Test 4: several processes writing one file share the budget
+print("=== Test 4: Shared SQLite budget ===")
+import sqlite3
+from app.main.util.kvstore import SQLiteKV
+
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "shared.db")
+    # Two connections to one file, like the API and a job worker
+    writers = [SQLiteKV(path, max_bytes=10_000) for _ in range(2)]
+    for i in range(40):
+        writers[i % 2].put(f"key-{i}", b"x" * 1000)
+    stored = sqlite3.connect(path).execute("SELECT SUM(size) FROM kv").fetchone()[0]
+    assert stored <= 10_000, f"Both writers should enforce one budget, file holds {stored} bytes"
+    for kv in writers:
+        kv.close()
+print("✓ Eviction counts every process's writes\n")
+
+# Test 5: the running byte total follows replaces, deletes and renames
+print("=== Test 5: Byte counter ===")
+with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, "counter.db")
+    legacy = sqlite3.connect(path)
+    legacy.execute("CREATE TABLE kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, atime REAL NOT NULL)")
+    legacy.execute("INSERT INTO kv VALUES ('old', x'00000000', 4, 0)")
+    legacy.commit()
+    legacy.close()
+
+    kv = SQLiteKV(path, max_bytes=1_000_000)
+    assert kv.total_bytes == 4, "A file written before the counter should be counted once on open"
+    kv.put_many({"a/1": b"x" * 100, "a/2": b"x" * 200, "b/2": b"x" * 50})
+    kv.put("a/1", b"x" * 10)
+    kv.rename_prefix("a/", "b/")
+    kv.delete(["old"])
+    kv.delete_prefix("c/")
+    stored = sqlite3.connect(path).execute("SELECT SUM(size) FROM kv").fetchone()[0]
+    assert kv.total_bytes == stored == 210, f"Counter {kv.total_bytes}, table {stored}"
+    kv.close()
+print("✓ Counter matches the table\n")
+
+print("All embedding cache tests passed!")
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Embedding client test with a mocked service: gateway errors are retried,
+a 500 is not, and the loop's AsyncClient is closed by aclose(). Runs without
+the embedding service.
+"""
+
+import asyncio
+
+import httpx
+
+from app.main.util.embedding import CustomAPIEmbeddings
+
+statuses = []
+
+
+def handler(request):
+    status = statuses.pop(0)
+    return httpx.Response(status, json={"detail": "mocked"})
+
+
+embeddings = CustomAPIEmbeddings("http://embed.test/embed", max_retries=3, retry_backoff=0)
+embeddings._client = httpx.Client(transport=httpx.MockTransport(handler))
+
+# Test 1: 502/503 retried until success
+print("=== Test 1: Retry gateway errors ===")
+statuses[:] = [502, 503, 200]
+assert embeddings._post(embeddings.api_url, {}).status_code == 200 and not statuses
+print("✓ 502 and 503 retried\n")
+
+# Test 2: 500 fails right away
+print("=== Test 2: No retry on 500 ===")
+statuses[:] = [500, 200]
+try:
+    embeddings._post(embeddings.api_url, {})
+    raise AssertionError("A 500 should be raised")
+except httpx.HTTPStatusError as e:
+    assert e.response.status_code == 500 and statuses == [200], "A 500 must not be retried"
+print("✓ 500 raised without retrying\n")
+
+
+# Test 3: aclose closes the loop's AsyncClient
+print("=== Test 3: AsyncClient lifecycle ===")
+async def use_and_close():
+    statuses[:] = [200]
+    loop = asyncio.get_running_loop()
+    embeddings._async_clients[loop] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client = embeddings._get_async_client()
+    assert (await embeddings._apost(embeddings.api_url, {})).status_code == 200
+    await embeddings.aclose()
+    return client
+
+client = asyncio.run(use_and_close())
+assert client.is_closed and len(embeddings._async_clients) == 0
+print("✓ AsyncClient closed and dropped\n")
+
+embeddings.close()
+
+print("=" * 60)
+print("✅ ALL EMBEDDING CLIENT TESTS PASSED")
+print("=" * 60)
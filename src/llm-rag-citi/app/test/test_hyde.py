@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Speculative HyDE test with a fake retriever and fake generations: results are
+fused when the hypothetical document is ready in time, the raw-question results
+come back at the deadline otherwise (also with the generation pool saturated,
+where queued generations are cancelled), and cached hypothetical documents skip
+the LLM. Runs without an LLM or Milvus.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.main.util.hyde import HydeCache, speculative_retrieve
+
+retrieved = []
+
+
+def retrieve(text):
+    retrieved.append(text)
+    if text.startswith("hypothetical"):
+        return [{"id": "h1"}, {"id": "both"}]
+    return [{"id": "both"}, {"id": "r1"}]
+
+
+def run(question, generate, deadline=1.0, cache=None, generation_executor=None):
+    return speculative_retrieve(
+        question, retrieve, generate=generate, deadline=deadline, top_k=10,
+        cache=cache if cache is not None else HydeCache(16, 60),
+        retrieval_executor=ThreadPoolExecutor(max_workers=2),
+        generation_executor=generation_executor or ThreadPoolExecutor(max_workers=2),
+    )
+
+
+# Test 1: fuse when the hypothetical document is ready in time
+print("=== Test 1: Fuse ===")
+documents = run("What is HyDE?", lambda question: f"hypothetical answer to {question}")
+assert [document["id"] for document in documents][0] == "both", "A chunk found by both retrievals ranks first"
+assert {document["id"] for document in documents} == {"both", "r1", "h1"}
+print(f"✓ Fused: {[document['id'] for document in documents]}\n")
+
+# Test 2: raw results at the deadline, even with the generation pool saturated
+print("=== Test 2: Timeout fallback ===")
+release = threading.Event()
+generations = []
+
+
+def slow_generate(question):
+    generations.append(question)
+    release.wait(5)
+    return "hypothetical late"
+
+
+pool = ThreadPoolExecutor(max_workers=1)
+started = time.perf_counter()
+first = run("slow question", slow_generate, deadline=0.1, generation_executor=pool)
+second = run("queued question", slow_generate, deadline=0.1, generation_executor=pool)
+elapsed = time.perf_counter() - started
+assert [document["id"] for document in first] == ["both", "r1"] and first == second, "Raw-question results only"
+assert elapsed < 1.0, f"Fallbacks should return at their deadlines, took {elapsed:.2f}s"
+release.set()
+pool.shutdown(wait=True)
+assert generations == ["slow question"], f"The queued generation should be cancelled, ran {generations}"
+print(f"✓ Both fell back in {elapsed:.2f}s, the queued generation never ran\n")
+
+# Test 3: cache hit skips the LLM
+print("=== Test 3: Cache ===")
+cache = HydeCache(16, 60)
+calls = []
+
+
+def counted_generate(question):
+    calls.append(question)
+    return "hypothetical cached"
+
+
+run("What is ColBERT?", counted_generate, cache=cache)
+retrieved.clear()
+documents = run("what is colbert", counted_generate, cache=cache)
+assert calls == ["What is ColBERT?"], "Same normalized question should not reach the LLM twice"
+assert "hypothetical cached" in retrieved and {document["id"] for document in documents} == {"both", "r1", "h1"}
+print("✓ Cached hypothetical document reused\n")
+
+print("=" * 60)
+print("✅ ALL HYDE TESTS PASSED")
+print("=" * 60)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Job queue test: claiming, progress, retries and lease expiry of the SQLite JobStore,
+and a real spawned worker completing a job. Runs without Milvus.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.main.util.jobs import JobStore, JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED
+
+with tempfile.TemporaryDirectory() as tmp:
+    store = JobStore(os.path.join(tmp, "jobs.db"), max_attempts=2)
+
+    # Test 1: jobs are claimed once, in order
+    print("=== Test 1: enqueue and claim ===")
+    first = store.enqueue("insert_doc", {"document_id": "1"})
+    second = store.enqueue("delete_doc", {"document_id": "2"})
+    job = store.claim("worker-a", lease_seconds=30)
+    assert job["id"] == first and job["status"] == JOB_RUNNING and job["attempts"] == 1
+    assert store.claim("worker-b", lease_seconds=30)["id"] == second
+    assert store.claim("worker-c", lease_seconds=30) is None, "Running jobs must not be claimed twice"
+    print("✓ Oldest job claimed first, never by two workers\n")
+
+    # Test 2: progress and completion
+    print("=== Test 2: progress and completion ===")
+    assert store.heartbeat(first, "worker-a", 30, {"pages": 3, "inserted": 40})
+    assert not store.heartbeat(first, "worker-b", 30, {"pages": 99}), "Only the lease owner may report"
+    assert store.get(first)["progress"] == {"pages": 3, "inserted": 40}
+    store.complete(first, "worker-a", result="done")
+    job = store.get(first)
+    assert job["status"] == JOB_SUCCEEDED and job["result"] == "done"
+    print("✓ Progress is stored and completion records the result\n")
+
+    # Test 3: retries until max_attempts
+    print("=== Test 3: retries ===")
+    store.fail(second, "worker-b", "embedding service down")
+    assert store.get(second)["status"] == JOB_QUEUED, "First failure should re-queue"
+    retry = store.claim("worker-b", lease_seconds=30)
+    assert retry["id"] == second and retry["attempts"] == 2
+    store.fail(second, "worker-b", "embedding service down")
+    assert store.get(second)["status"] == JOB_FAILED, "Job should fail after max_attempts"
+
+    third = store.enqueue("insert_doc", {"document_id": "3"})
+    store.claim("worker-a", lease_seconds=30)
+    store.fail(third, "worker-a", "bad input", retry=False)
+    assert store.get(third)["status"] == JOB_FAILED, "Non-retryable errors fail immediately"
+    print("✓ Retryable errors re-queue, the rest fail\n")
+
+    # Test 4: a crashed worker's job is resumed after its lease expires
+    print("=== Test 4: lease expiry ===")
+    fourth = store.enqueue("insert_doc", {"document_id": "4"})
+    store.claim("crashed-worker", lease_seconds=0.05)
+    assert store.claim("worker-a", lease_seconds=30) is None
+    time.sleep(0.1)
+    resumed = store.claim("worker-a", lease_seconds=0.05)
+    assert resumed["id"] == fourth and resumed["attempts"] == 2
+    time.sleep(0.1)
+    assert store.claim("worker-b", lease_seconds=30) is None, "Out of attempts, should not be claimed again"
+    assert store.get(fourth)["status"] == JOB_FAILED
+    print("✓ Expired leases are reclaimed, and poison jobs stop after max_attempts\n")
+
+# Test 5: only the job workers themselves skip spawning workers
+print("=== Test 5: worker start guard ===")
+from app.main.worker import JOB_WORKER_ENV, start_workers
+
+os.environ[JOB_WORKER_ENV] = "1"
+assert start_workers("dev", 2) == [], "A job worker must not spawn workers of its own"
+del os.environ[JOB_WORKER_ENV]
+print("✓ Job workers don't spawn workers\n")
+
+# Test 6: workers spawned by a launcher that calls create_app at import (like runner.py)
+print("=== Test 6: spawned worker completes a job ===")
+with tempfile.TemporaryDirectory() as tmp:
+    env = dict(os.environ, JOB_DB_PATH=os.path.join(tmp, "jobs.db"), JOB_POLL_INTERVAL="0.1")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    launched = subprocess.run([sys.executable, "-m", "app.test.job_worker_app"], cwd=root, env=env,
+                              capture_output=True, text=True, timeout=60)
+    assert launched.returncode == 0, f"Spawned worker did not complete the job:\n{launched.stdout}{launched.stderr}"
+    assert "bootstrapping phase" not in launched.stderr, launched.stderr
+print(f"✓ {launched.stdout.strip().splitlines()[-1]}\n")
+
+print("All job queue tests passed!")
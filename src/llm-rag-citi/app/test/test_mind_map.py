@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Map-reduce mind map test with a fake async LLM: every page reaches a prompt,
+LLM concurrency stays bounded, outlines are merged in a tree and a
+regeneration reuses the cached chunk outlines. Runs without an LLM server.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+
+from app.main.util.kvstore import SQLiteKV
+from app.main.util.mind_map import build_mind_map, chunk_document
+
+pages = [f"Page {i} talks about topic-{i}. " * 40 for i in range(30)]
+calls = {"chunk": 0, "reduce": 0, "final": 0}
+in_flight = {"now": 0, "max": 0}
+seen_topics = set()
+
+
+async def fake_complete(prompt):
+    in_flight["now"] += 1
+    in_flight["max"] = max(in_flight["max"], in_flight["now"])
+    await asyncio.sleep(0.01)
+    in_flight["now"] -= 1
+    if "OUTLINES:" in prompt:
+        calls["reduce"] += 1
+        return prompt.split("OUTLINES:", 1)[1]
+    if "one part of a longer document" in prompt:
+        calls["chunk"] += 1
+        topics = sorted({word.rstrip(".") for word in prompt.split() if word.startswith("topic-")})
+        return "\n".join(f"## {topic}" for topic in topics)
+    calls["final"] += 1
+    seen_topics.update(word for word in prompt.split() if word.startswith("topic-"))
+    return "# Document"
+
+
+# Test 1: chunking keeps every page, in order
+print("=== Test 1: Chunking ===")
+chunks = chunk_document(pages, max_chars=5000)
+assert len(chunks) > 1 and all(len(chunk) <= 5000 for chunk in chunks)
+assert "".join(chunks).replace("\n", "").replace(" ", "") == "".join(pages).replace(" ", "")
+assert chunk_document(["x" * 120], max_chars=50) == ["x" * 50, "x" * 50, "x" * 20]
+print(f"✓ {len(pages)} pages -> {len(chunks)} chunks\n")
+
+# Test 2: map-reduce covers the whole document with bounded concurrency
+print("=== Test 2: Map-reduce ===")
+workdir = tempfile.mkdtemp()
+cache = SQLiteKV(os.path.join(workdir, "mind_map.db"), max_bytes=10 * 1024 * 1024, table="mind_map_outlines")
+result = asyncio.run(build_mind_map(pages, fake_complete, cache=cache, concurrency=3, fan_in=2, max_chars=5000))
+assert result == "# Document"
+assert seen_topics == {f"topic-{i}" for i in range(30)}, "Every page should reach the final prompt"
+assert calls["chunk"] == len(chunks) and calls["reduce"] > 0 and calls["final"] == 1
+assert in_flight["max"] == 3, f"At most 3 LLM calls in flight, saw {in_flight['max']}"
+print(f"✓ {calls['chunk']} chunk + {calls['reduce']} reduce calls, max {in_flight['max']} in flight\n")
+
+# Test 3: regeneration only redoes the reduce steps
+print("=== Test 3: Chunk outline cache ===")
+chunk_calls = calls["chunk"]
+asyncio.run(build_mind_map(pages, fake_complete, cache=cache, concurrency=3, fan_in=2, max_chars=5000))
+assert calls["chunk"] == chunk_calls and calls["final"] == 2
+print("✓ Chunk outlines served from the cache\n")
+
+# Test 4: short documents keep the single call
+print("=== Test 4: Short document ===")
+before = dict(calls)
+asyncio.run(build_mind_map(pages[:1], fake_complete, cache=cache))
+assert calls["chunk"] == before["chunk"] and calls["reduce"] == before["reduce"] and calls["final"] == before["final"] + 1
+print("✓ One prompt for a document that fits\n")
+
+cache.close()
+shutil.rmtree(workdir)
+
+print("=" * 60)
+print("✅ ALL MIND MAP TESTS PASSED")
+print("=" * 60)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Parse cache test: the same bytes are parsed once (whatever the path), the
+parser and file type are part of the key, and an interrupted parse is not kept.
+Runs without MinerU/Docling.
+"""
+
+import os
+import shutil
+import tempfile
+
+from llama_index.core.schema import Document
+
+from app.main.util.parse_cache import ParseCache, pack_documents, unpack_documents
+
+workdir = tempfile.mkdtemp()
+first_path = os.path.join(workdir, "a.pdf")
+with open(first_path, "wb") as f:
+    f.write(b"%PDF-1.4 fake bytes")
+copy_path = os.path.join(workdir, "b.pdf")
+shutil.copy(first_path, copy_path)
+
+calls = []
+
+
+def fake_parse(path):
+    def parse():
+        calls.append(path)
+        for page in range(3):
+            yield Document(text=f"Halaman {page + 1} ✓", metadata={"file_path": path, "source": page + 1})
+    return parse
+
+
+# Test 1: compact round-trip
+print("=== Test 1: pack/unpack ===")
+documents = list(fake_parse(first_path)())
+restored = unpack_documents(pack_documents(documents), copy_path)
+assert [doc.text for doc in restored] == [doc.text for doc in documents]
+assert restored[2].metadata == {"file_path": copy_path, "source": 3}
+print("✓ Text and metadata restored, file_path follows the new copy\n")
+
+# Test 2: parsed once per content
+print("=== Test 2: content-hash hits ===")
+cache = ParseCache(os.path.join(workdir, "parsed.db"), max_bytes=1024 * 1024)
+calls.clear()
+assert len(list(cache.cached(first_path, "pdf", "mineru", fake_parse(first_path)))) == 3
+hit = list(cache.cached(copy_path, "pdf", "mineru", fake_parse(copy_path)))
+assert calls == [first_path], f"Same bytes at another path should hit, parsed {calls}"
+assert hit[0].metadata["file_path"] == copy_path
+assert cache.lookup(copy_path, "pdf", "mineru") is not None
+assert cache.lookup(copy_path, "pdf", "pymu") is None
+list(cache.cached(copy_path, "pdf", "pymu", fake_parse(copy_path)))
+assert calls == [first_path, copy_path], "Another parser must not reuse the entry"
+print("✓ Parsed once per (content, file type, parser)\n")
+
+# Test 3: partial parse isn't cached
+print("=== Test 3: interrupted parse ===")
+with open(first_path, "ab") as f:
+    f.write(b" edited")
+calls.clear()
+stream = cache.cached(first_path, "pdf", "mineru", fake_parse(first_path))
+next(stream)
+stream.close()
+list(cache.cached(first_path, "pdf", "mineru", fake_parse(first_path)))
+assert calls == [first_path, first_path], f"Edited bytes must be reparsed in full, got {calls}"
+print("✓ Only fully consumed parses are stored\n")
+
+cache.store.close()
+shutil.rmtree(workdir)
+
+print("=" * 60)
+print("✅ ALL PARSE CACHE TESTS PASSED")
+print("=" * 60)
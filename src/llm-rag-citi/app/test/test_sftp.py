@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+SFTP transfer test with an in-memory fake NAS: sessions are pooled and
+replaced when dead, interrupted downloads resume, and unchanged files are
+only stat'ed and then served from the local cache (also after a rename),
+and a retried rename is a no-op.
+Runs without paramiko or a NAS.
+"""
+
+import io
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+
+from app.main.util.sftp import FileCache, SFTPPool, SFTPTransfer
+
+NAS = {"/private/u1/doc.pdf": os.urandom(300_000)}
+connections = []
+
+
+class FakeTransport:
+    def __init__(self):
+        self.alive = True
+
+    def is_active(self):
+        return self.alive
+
+
+class FakeRemoteFile(io.BytesIO):
+    def __init__(self, data, fail_after=None):
+        super().__init__(data)
+        self.fail_after = fail_after
+
+    def prefetch(self, size, max_concurrent_requests=None):
+        pass
+
+    def read(self, size=-1):
+        if self.fail_after is not None and self.tell() >= self.fail_after:
+            raise EOFError("connection reset")
+        return super().read(min(size, 64_000))
+
+
+class FakeSFTP:
+    fail_next_at = None
+    downloads = 0
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    def stat(self, path):
+        if path not in NAS:
+            if any(key.startswith(path + "/") for key in NAS):
+                return SimpleNamespace(st_size=0, st_mtime=0)
+            raise FileNotFoundError(path)
+        return SimpleNamespace(st_size=len(NAS[path]), st_mtime=1700000000)
+
+    def open(self, path, mode):
+        FakeSFTP.downloads += 1
+        fail_at, FakeSFTP.fail_next_at = FakeSFTP.fail_next_at, None
+        if fail_at is not None:
+            self.transport.alive = False  # the session dies with the read
+        return FakeRemoteFile(NAS[path], fail_at)
+
+    def rename(self, source, target):
+        NAS[target] = NAS.pop(source)
+
+    def mkdir(self, path):
+        pass
+
+    def normalize(self, path):
+        if not self.transport.alive:
+            raise EOFError("dead")
+        return "/"
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.transport.alive = False
+
+
+def connect():
+    client = FakeClient()
+    connections.append(client)
+    return client, FakeSFTP(client.transport)
+
+
+workdir = tempfile.mkdtemp()
+cache = FileCache(os.path.join(workdir, "cache"), max_bytes=10 * 1024 * 1024)
+transfer = SFTPTransfer(SFTPPool(connect, max_size=2, idle_check_seconds=0), cache, max_retries=2)
+
+# Test 1: pooled sessions
+print("=== Test 1: Session reuse ===")
+target = os.path.join(workdir, "doc.pdf")
+transfer.fetch("/private/u1/doc.pdf", target)
+assert open(target, "rb").read() == NAS["/private/u1/doc.pdf"]
+assert len(connections) == 1, f"stat + download should share one session, opened {len(connections)}"
+connections[0].transport.alive = False
+transfer.pool.close()
+assert transfer.read_bytes("/private/u1/doc.pdf") == NAS["/private/u1/doc.pdf"]
+assert len(connections) == 2 and FakeSFTP.downloads == 1, "An unchanged file is only stat'ed, not downloaded again"
+print("✓ One session for stat + download, cache hit skips the download\n")
+
+# Test 2: resume after a dropped session
+print("=== Test 2: Resume ===")
+NAS["/private/u1/big.pdf"] = os.urandom(500_000)
+FakeSFTP.fail_next_at = 200_000
+data = transfer.read_bytes("/private/u1/big.pdf")
+assert data == NAS["/private/u1/big.pdf"]
+assert len(connections) == 3 and FakeSFTP.downloads == 3, f"The dead session should be replaced once, opened {len(connections)}"
+print("✓ Download resumed on a fresh session after the drop\n")
+
+# Test 3: rename keeps the cached copy
+print("=== Test 3: Rename ===")
+transfer.rename("/private/u1/big.pdf", "/public/u1/big.pdf")
+transfer.fetch("/public/u1/big.pdf", os.path.join(workdir, "moved.pdf"))
+assert open(os.path.join(workdir, "moved.pdf"), "rb").read() == data and FakeSFTP.downloads == 3
+assert cache.read(FileCache.key("/private/u1/big.pdf", 1700000000, len(data))) is None
+print("✓ Cached copy follows the renamed file\n")
+
+# Test 4: a retried move (rename went through, the rest of move_doc failed) is a no-op
+print("=== Test 4: Retried rename ===")
+assert transfer.exists("/public/u1/big.pdf") and not transfer.exists("/private/u1/big.pdf")
+assert transfer.rename("/private/u1/big.pdf", "/public/u1/big.pdf") is False
+assert NAS["/public/u1/big.pdf"] == data
+try:
+    transfer.rename("/private/u1/missing.pdf", "/public/u1/missing.pdf")
+    raise AssertionError("Renaming a file that exists nowhere should fail")
+except FileNotFoundError:
+    pass
+print("✓ A second rename finds the file already moved\n")
+
+shutil.rmtree(workdir)
+
+print("=" * 60)
+print("✅ ALL SFTP TESTS PASSED")
+print("=" * 60)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Stream helpers test: <think> tag parsing must not depend on how the LLM splits
+tokens, and SSE coalescing must flush on size, age and kind changes.
+"""
+
+import json
+import random
+
+from app.main.util.stream import SSECoalescer, ThinkTagParser
+
+TEXT = "Intro <b>bold</b> <think>step 1 </th> <thinking? a<b</think>Jawaban: 42 <thin"
+
+
+def split_randomly(text, rng):
+    tokens, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 9)
+        tokens.append(text[i:i + size])
+        i += size
+    return tokens
+
+
+def parse(tokens, coalescer=None):
+    parser = ThinkTagParser(True)
+    events = [event for token in tokens for event in parser.feed(token)] + parser.flush()
+    joined = {"answer_token": "", "thinking_token": ""}
+    for event in events:
+        for kind, text in event.items():
+            joined[kind] += text
+    return events, joined
+
+
+# Test 1: same output for any tokenization
+print("=== Test 1: think tag parsing ===")
+_, expected = parse([TEXT])
+assert expected == {"answer_token": "Intro <b>bold</b> Jawaban: 42 <thin",
+                    "thinking_token": "step 1 </th> <thinking? a<b"}, expected
+rng = random.Random(7)
+for _ in range(200):
+    events, joined = parse(split_randomly(TEXT, rng))
+    assert joined == expected, joined
+    assert all(text for event in events for text in event.values())
+assert ThinkTagParser(False).feed("<think>x") == [{"answer_token": "<think>x"}]
+print("✓ 200 random tokenizations give identical answer/thinking text\n")
+
+# Test 2: coalescing by size, age and kind change
+print("=== Test 2: SSE coalescing ===")
+now = [0.0]
+coalescer = SSECoalescer(max_delay_ms=30, max_bytes=8, clock=lambda: now[0])
+assert coalescer.add([{"answer_token": "abc"}]) == []
+assert coalescer.add([{"answer_token": "defgh"}]) == ['data: {"answer_token": "abcdefgh"}\n\n']
+
+assert coalescer.add([{"thinking_token": "x"}]) == []
+now[0] = 0.031
+assert coalescer.add([{"thinking_token": "y"}]) == ['data: {"thinking_token": "xy"}\n\n']
+
+assert coalescer.add([{"answer_token": "a"}]) == []
+frames = coalescer.add([{"thinking_token": "t"}]) + coalescer.flush()
+assert [json.loads(frame[6:]) for frame in frames] == [{"answer_token": "a"}, {"thinking_token": "t"}]
+assert coalescer.flush() == []
+
+unbuffered = SSECoalescer(0, 0)
+assert len(unbuffered.add([{"answer_token": "a"}])) == 1
+print("✓ Frames flushed on byte limit, age limit and kind change\n")
+
+print("All stream tests passed")
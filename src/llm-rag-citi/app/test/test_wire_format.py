@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Binary embedding format round-trip: buffers packed by the embedding service
+(src/bge-ma012/wire.py) decode back to the same dense, sparse and ColBERT
+values with decode_wire_embeddings, in float32 and float16, including items
+without sparse weights or ColBERT rows. Runs without the embedding service.
+"""
+
+import importlib.util
+import os
+
+import numpy as np
+
+from app.main.util.embedding import decode_wire_embeddings
+
+# The service is not a package: load its wire module from the file
+wire_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "bge-ma012", "wire.py")
+wire_spec = importlib.util.spec_from_file_location("bge_m3_wire", wire_path)
+wire = importlib.util.module_from_spec(wire_spec)
+wire_spec.loader.exec_module(wire)
+
+rng = np.random.default_rng(0)
+dense = [rng.standard_normal(8).astype(np.float32) for _ in range(3)]
+sparse = [{5: 0.25, 17: 0.5}, {}, {3: 1.0}]
+colbert = [rng.standard_normal((4, 8)).astype(np.float32), np.empty((0, 8), dtype=np.float32),
+           rng.standard_normal((2, 8)).astype(np.float32)]
+
+for step, dtype in enumerate(["float32", "float16"], start=1):
+    print(f"=== Test {step}: {dtype} round-trip ===")
+    float_dtype = wire.WIRE_DTYPES[dtype]
+    decoded = decode_wire_embeddings(wire.encode_wire(dense=dense, sparse=sparse, colbert=colbert, dtype=dtype))
+
+    assert decoded["count"] == 3
+    assert decoded["dense"].dtype == np.float32 and decoded["dense"].shape == (3, 8)
+    assert np.array_equal(decoded["dense"], np.stack(dense).astype(float_dtype).astype(np.float32))
+    assert decoded["sparse"] == sparse, "Sparse weights always stay float32"
+    assert [vecs.shape for vecs in decoded["colbert"]] == [(4, 8), (0, 8), (2, 8)]
+    for got, sent in zip(decoded["colbert"], colbert):
+        assert got.dtype == np.float32 and np.array_equal(got, sent.astype(float_dtype).astype(np.float32))
+    print("✓ dense, sparse and ColBERT (one item without rows) decode as sent\n")
+
+# Test 3: only the requested outputs are present
+print("=== Test 3: dense only ===")
+decoded = decode_wire_embeddings(wire.encode_wire(dense=dense[:1]))
+assert set(decoded) == {"count", "dense"} and np.array_equal(decoded["dense"][0], dense[0])
+try:
+    decode_wire_embeddings(b"JSON" + bytes(16))
+    raise AssertionError("A body without the magic must be rejected")
+except ValueError:
+    pass
+print("✓ Missing outputs stay absent, foreign bodies are rejected\n")
+
+print("=" * 60)
+print("✅ ALL WIRE FORMAT TESTS PASSED")
+print("=" * 60)
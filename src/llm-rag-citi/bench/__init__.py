@@ -0,0 +1,4 @@
+"""
+Offline chat benchmark: local stand-ins for the LLM, the embedding service and
+Milvus (Milvus Lite), plus a trace replayer. See bench/run_bench.py.
+"""
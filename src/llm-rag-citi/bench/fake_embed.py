@@ -0,0 +1,144 @@
+"""
+Stand-in for the BGE-M3 embedding service (src/bge-ma012/api_v2.py).
+
+Serves POST /embed and /embed/batch with the same request fields and the same
+responses: JSON, or the binary format of src/bge-ma012/wire.py when the client
+asks for it. The vectors are hashed bag-of-words, so texts sharing words get
+similar dense and sparse vectors and retrieval over a seeded corpus still
+returns related chunks, without a model or a GPU.
+
+    python -m uvicorn bench.fake_embed:app --port 8002
+
+FAKE_EMBED_LATENCY_MS (per request) and FAKE_EMBED_ITEM_MS (per text) add
+simulated model time.
+"""
+
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+DENSE_DIM = 1024
+SPARSE_VOCAB = 250002  # XLM-R vocabulary size used by BGE-M3
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+LATENCY_MS = float(os.getenv("FAKE_EMBED_LATENCY_MS", "5"))
+ITEM_MS = float(os.getenv("FAKE_EMBED_ITEM_MS", "1"))
+
+# Reuse the embedding service's wire encoder so the client's binary path is exercised too
+wire_spec = importlib.util.spec_from_file_location(
+    "bge_wire", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'bge-ma012', 'wire.py')
+)
+wire = importlib.util.module_from_spec(wire_spec)
+wire_spec.loader.exec_module(wire)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.lower() for token in TOKEN_PATTERN.findall(text)] or [""]
+
+
+@lru_cache(maxsize=65536)
+def token_vector(token: str) -> np.ndarray:
+    seed = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(DENSE_DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def token_id(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=4).digest(), "little") % SPARSE_VOCAB
+
+
+def embed_text(text: str, return_dense: bool = True, return_sparse: bool = True, return_colbert: bool = False) -> Dict:
+    """Raw result shaped like BGEM3FlagModel.encode output for one text."""
+    tokens = tokenize(text)
+    result = {}
+    if return_dense:
+        dense = np.sum([token_vector(token) for token in tokens], axis=0)
+        result["dense_vecs"] = (dense / (np.linalg.norm(dense) or 1.0)).astype(np.float32)
+    if return_sparse:
+        weights = {}
+        for token in tokens:
+            weights[token_id(token)] = weights.get(token_id(token), 0.0) + 1.0 / len(tokens)
+        result["lexical_weights"] = weights
+    if return_colbert:
+        result["colbert_vecs"] = np.stack([token_vector(token) for token in tokens])
+    return result
+
+
+def serialize(item: Dict) -> Dict:
+    result = {}
+    if "dense_vecs" in item:
+        result["dense_embeddings"] = item["dense_vecs"].tolist()
+    if "lexical_weights" in item:
+        result["sparse_embeddings"] = {str(key): float(value) for key, value in item["lexical_weights"].items()}
+    if "colbert_vecs" in item:
+        result["colbert_embeddings"] = item["colbert_vecs"].tolist()
+    return result
+
+
+def render(items: List[Dict], accept: str, single: bool):
+    """(content type, body) in the format the client negotiated."""
+    dtype = wire.negotiate_wire_dtype(accept)
+    if dtype is None:
+        if single:
+            payload = serialize(items[0])
+        else:
+            serialized = [serialize(item) for item in items]
+            payload = {key: [item[key] for item in serialized] for key in serialized[0]}
+        return b"application/json", json.dumps(payload).encode()
+
+    first = items[0]
+    content = wire.encode_wire(
+        dense=[item["dense_vecs"] for item in items] if "dense_vecs" in first else None,
+        sparse=[item["lexical_weights"] for item in items] if "lexical_weights" in first else None,
+        colbert=[item["colbert_vecs"] for item in items] if "colbert_vecs" in first else None,
+        dtype=dtype,
+    )
+    return wire.WIRE_MEDIA_TYPE.encode(), content
+
+
+async def read_json(receive) -> Dict:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return json.loads(body or b"{}")
+
+
+async def respond(send, status: int, content_type: bytes, body: bytes):
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    path = scope["path"].rstrip("/")
+    if scope["method"] == "GET" and path == "/health":
+        return await respond(send, 200, b"application/json", b'{"status": "healthy"}')
+    if scope["method"] != "POST" or path not in ("/embed", "/embed/batch"):
+        return await respond(send, 404, b"application/json", b'{"detail": "Not Found"}')
+
+    request = await read_json(receive)
+    single = path == "/embed"
+    contents = [request.get("content", "")] if single else request.get("contents", [])
+    if not contents or any(not content.strip() for content in contents):
+        return await respond(send, 400, b"application/json", b'{"detail": "Content cannot be empty"}')
+
+    await asyncio.sleep((LATENCY_MS + ITEM_MS * len(contents)) / 1000.0)
+    items = [
+        embed_text(content, request.get("return_dense", True), request.get("return_sparse", True),
+                   request.get("return_colbert_vecs", False))
+        for content in contents
+    ]
+    headers = dict(scope["headers"])
+    content_type, body = render(items, headers.get(b"accept", b"").decode(), single)
+    await respond(send, 200, content_type, body)
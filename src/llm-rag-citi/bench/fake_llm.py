@@ -0,0 +1,110 @@
+"""
+Stand-in for the vLLM OpenAI-compatible server used as LLM_URL / HYDE_LLM_URL.
+
+Serves POST /v1/chat/completions and /v1/completions, streamed (SSE chunks
+ending with `data: [DONE]`) or not, with a simulated time-to-first-token and
+decode speed. Like a GPU server it only decodes FAKE_LLM_MAX_RUNNING streams
+at a time; further requests wait, which is where queueing shows up under load.
+
+    python -m uvicorn bench.fake_llm:app --port 8001
+
+    FAKE_LLM_TTFT_MS          prefill time before the first token (default 300)
+    FAKE_LLM_TOKENS_PER_SEC   decode speed per stream (default 40)
+    FAKE_LLM_ANSWER_TOKENS    tokens per answer, capped by max_tokens (default 200)
+    FAKE_LLM_MAX_RUNNING      concurrent streams (default 8)
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+
+TTFT_MS = float(os.getenv("FAKE_LLM_TTFT_MS", "300"))
+TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "40"))
+ANSWER_TOKENS = int(os.getenv("FAKE_LLM_ANSWER_TOKENS", "200"))
+MAX_RUNNING = int(os.getenv("FAKE_LLM_MAX_RUNNING", "8"))
+
+WORDS = ("Berdasarkan dokumen yang tersedia , proses onboarding dimulai dengan pengisian formulir "
+         "dan verifikasi akun oleh tim HR . Setelah itu karyawan baru menerima akses sistem .").split()
+
+running = None
+
+
+def answer_tokens(count: int):
+    for i in range(count):
+        yield WORDS[i % len(WORDS)] + " "
+
+
+async def read_json(receive) -> dict:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return json.loads(body or b"{}")
+
+
+async def respond_json(send, status: int, payload: dict):
+    body = json.dumps(payload).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def chunk(completion_id: str, model: str, chat: bool, text: str = None, finish_reason: str = None) -> bytes:
+    if chat:
+        choice = {"index": 0, "delta": {"content": text} if text is not None else {}, "finish_reason": finish_reason}
+        kind = "chat.completion.chunk"
+    else:
+        choice = {"index": 0, "text": text or "", "finish_reason": finish_reason}
+        kind = "text_completion"
+    payload = {"id": completion_id, "object": kind, "created": int(time.time()), "model": model, "choices": [choice]}
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+async def complete(send, request: dict, chat: bool):
+    global running
+    if running is None:
+        running = asyncio.Semaphore(MAX_RUNNING)
+
+    model = request.get("model", "fake")
+    count = min(ANSWER_TOKENS, request.get("max_tokens") or ANSWER_TOKENS)
+    completion_id = f"cmpl-{uuid.uuid4().hex}"
+
+    async with running:
+        await asyncio.sleep(TTFT_MS / 1000.0)
+        if not request.get("stream"):
+            await asyncio.sleep(count / TOKENS_PER_SEC)
+            text = "".join(answer_tokens(count))
+            choice = ({"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+                      if chat else {"index": 0, "text": text, "finish_reason": "stop"})
+            return await respond_json(send, 200, {
+                "id": completion_id, "object": "chat.completion" if chat else "text_completion",
+                "created": int(time.time()), "model": model, "choices": [choice],
+                "usage": {"prompt_tokens": 0, "completion_tokens": count, "total_tokens": count},
+            })
+
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]})
+        if chat:
+            await send({"type": "http.response.body", "more_body": True,
+                        "body": chunk(completion_id, model, chat, text="")})
+        for token in answer_tokens(count):
+            await send({"type": "http.response.body", "more_body": True,
+                        "body": chunk(completion_id, model, chat, text=token)})
+            await asyncio.sleep(1.0 / TOKENS_PER_SEC)
+        await send({"type": "http.response.body", "more_body": True,
+                    "body": chunk(completion_id, model, chat, finish_reason="stop")})
+        await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    path = scope["path"].rstrip("/")
+    if scope["method"] == "GET" and path in ("/health", "/v1/models"):
+        return await respond_json(send, 200, {"object": "list", "data": [{"id": "fake", "object": "model"}]})
+    if scope["method"] == "POST" and path in ("/v1/chat/completions", "/v1/completions"):
+        return await complete(send, await read_json(receive), chat=path.endswith("chat/completions"))
+    await respond_json(send, 404, {"detail": "Not Found"})
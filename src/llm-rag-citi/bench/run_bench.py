@@ -0,0 +1,302 @@
+"""
+Offline load test of /llm/chat_with_llm with local stand-ins, no GPU box needed.
+
+    python -m bench.run_bench [--trace bench/traces/onboarding.jsonl] [--rate 2] [--requests 50]
+                              [--configs baseline,hyde,rerank,hyde+rerank] [--output bench-results/<commit>.json]
+
+Starts, from a scratch directory (--workdir):
+  - bench.fake_llm    OpenAI-compatible streaming LLM (--llm-ttft-ms, --llm-tokens-per-sec, --llm-answer-tokens)
+  - bench.fake_embed  BGE-M3 /embed stand-in (binary wire format)
+  - Milvus Lite       a local file seeded by bench.seed (--chunks)
+  - the app itself    `uvicorn runner:asgi_app`, i.e. the ASGI front with admission control + Flask
+
+then replays the trace (JSONL with "question" and optional "user_id", or one
+question per line) with Poisson arrivals at --rate requests/s, once per config
+(hyde / rerank on or off). Per config it reports p50/p95/p99 end-to-end latency
+and TTFT (first answer/thinking token on the client), throughput, 429s and
+errors, the mean admission queue wait per stage (from /metrics) and the median
+of each stage of the per-request timings event. Results are written as JSON
+(with the git commit) so two commits can be diffed.
+
+The answer cache is off unless --answer-cache is given, so repeated questions
+measure the full pipeline. Note that config.py loads .env with override=True:
+values in src/llm-rag-citi/.env win over the environment set here, so move it
+aside while benchmarking.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from .seed import seed
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+CONFIGS = {
+    "baseline": (False, False),
+    "hyde": (True, False),
+    "rerank": (False, True),
+    "hyde+rerank": (True, True),
+}
+
+QUEUE_METRIC = re.compile(
+    r'^citi_rag_admission_queue_seconds_(sum|count)\{controller="(\w+)",outcome="admitted"\} ([0-9.e+-]+)$'
+)
+
+
+def load_trace(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if path.endswith(".jsonl"):
+        return [json.loads(line) for line in lines]
+    return [{"question": line} for line in lines]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=APP_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def start_process(module_app: str, port: int, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module_app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def wait_healthy(url: str, process: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}, see its log in the workdir")
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    return {"p50": round(pick(0.50), 4), "p95": round(pick(0.95), 4), "p99": round(pick(0.99), 4),
+            "mean": round(sum(ordered) / len(ordered), 4)}
+
+
+def scrape_queue_seconds(base_url: str) -> Dict[str, List[float]]:
+    """{controller: [sum, count]} of admitted requests' queue wait."""
+    totals: Dict[str, List[float]] = {}
+    text = httpx.get(f"{base_url}/metrics", timeout=10.0).text
+    for line in text.splitlines():
+        match = QUEUE_METRIC.match(line)
+        if match:
+            kind, controller, value = match.groups()
+            totals.setdefault(controller, [0.0, 0.0])[0 if kind == "sum" else 1] += float(value)
+    return totals
+
+
+async def send_request(client: httpx.AsyncClient, base_url: str, item: Dict, hyde: bool, reranking: bool) -> Dict:
+    body = {
+        "question": item["question"],
+        "userId": item.get("user_id", "user-1"),
+        "conversation_history": [],
+        "hyde": "true" if hyde else "false",
+        "reranking": "true" if reranking else "false",
+        "ultrathink": "false",
+        "timings": "true",
+    }
+    started = time.perf_counter()
+    result = {"status": None, "latency": None, "ttft": None, "timings": None, "error": None}
+    try:
+        async with client.stream("POST", f"{base_url}/llm/chat_with_llm", json=body) as response:
+            result["status"] = response.status_code
+            if response.status_code != 200:
+                await response.aread()
+                return result
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    result["latency"] = time.perf_counter() - started
+                    break
+                payload = json.loads(data)
+                if result["ttft"] is None and ("answer_token" in payload or "thinking_token" in payload):
+                    result["ttft"] = time.perf_counter() - started
+                if "timings" in payload:
+                    result["timings"] = payload["timings"]
+            if result["latency"] is None:
+                result["error"] = "stream ended without [DONE]"
+    except httpx.HTTPError as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+async def replay(base_url: str, trace: List[Dict], rate: float, count: int, hyde: bool, reranking: bool,
+                 seed_value: int) -> (List[Dict], float):
+    """Send `count` trace requests with exponential inter-arrival times (Poisson at `rate`/s)."""
+    rng = random.Random(seed_value)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=64)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(300.0), limits=limits) as client:
+        started = time.perf_counter()
+        tasks = []
+        for i in range(count):
+            tasks.append(asyncio.create_task(send_request(client, base_url, trace[i % len(trace)], hyde, reranking)))
+            await asyncio.sleep(rng.expovariate(rate))
+        results = await asyncio.gather(*tasks)
+        return list(results), time.perf_counter() - started
+
+
+def summarize(results: List[Dict], wall: float, queue_before: Dict, queue_after: Dict) -> Dict:
+    completed = [result for result in results if result["latency"] is not None]
+    stages: Dict[str, List[float]] = {}
+    for result in completed:
+        for stage, ms in (result["timings"] or {}).items():
+            stages.setdefault(stage, []).append(ms)
+
+    queue = {}
+    for controller, (total, count) in queue_after.items():
+        before_total, before_count = queue_before.get(controller, [0.0, 0.0])
+        if count > before_count:
+            queue[controller] = round((total - before_total) / (count - before_count), 4)
+
+    return {
+        "requests": len(results),
+        "completed": len(completed),
+        "rejected_429": sum(1 for result in results if result["status"] == 429),
+        "errors": sum(1 for result in results if result["latency"] is None and result["status"] != 429),
+        "throughput_rps": round(len(completed) / wall, 3) if wall else None,
+        "latency_s": percentiles([result["latency"] for result in completed]),
+        "ttft_s": percentiles([result["ttft"] for result in completed if result["ttft"] is not None]),
+        "queue_wait_mean_s": queue,
+        "stage_median_ms": {stage: sorted(values)[len(values) // 2] for stage, values in sorted(stages.items())},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline chat load test with local stand-ins")
+    parser.add_argument("--trace", default=os.path.join(APP_DIR, "bench", "traces", "onboarding.jsonl"))
+    parser.add_argument("--rate", type=float, default=2.0, help="Arrival rate, requests per second")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per config")
+    parser.add_argument("--warmup", type=int, default=2, help="Sequential requests per config before measuring")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help=f"Comma separated, from {', '.join(CONFIGS)}")
+    parser.add_argument("--chunks", type=int, default=2000, help="Synthetic chunks seeded into Milvus Lite")
+    parser.add_argument("--llm-ttft-ms", type=float, default=300)
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=40)
+    parser.add_argument("--llm-answer-tokens", type=int, default=200)
+    parser.add_argument("--llm-max-running", type=int, default=8)
+    parser.add_argument("--embed-latency-ms", type=float, default=5)
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache on")
+    parser.add_argument("--port", type=int, default=18000, help="App port; the fakes use the next two")
+    parser.add_argument("--workdir", help="Scratch directory (Milvus Lite file, logs); a temp dir by default")
+    parser.add_argument("--output", help="Results JSON, default bench-results/<commit>.json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configs = [name.strip() for name in args.configs.split(",") if name.strip()]
+    unknown = [name for name in configs if name not in CONFIGS]
+    if unknown:
+        parser.error(f"Unknown configs {unknown}, choose from {', '.join(CONFIGS)}")
+    if os.path.exists(os.path.join(APP_DIR, ".env")):
+        print("WARNING: .env found, its values override the benchmark environment (config.py uses override=True)")
+
+    trace = load_trace(args.trace)
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    milvus_uri = os.path.join(workdir, "milvus.db")
+    seed(milvus_uri, chunks=args.chunks)
+
+    app_port, llm_port, embed_port = args.port, args.port + 1, args.port + 2
+    env = dict(os.environ)
+    env.update({
+        "FAKE_LLM_TTFT_MS": str(args.llm_ttft_ms),
+        "FAKE_LLM_TOKENS_PER_SEC": str(args.llm_tokens_per_sec),
+        "FAKE_LLM_ANSWER_TOKENS": str(args.llm_answer_tokens),
+        "FAKE_LLM_MAX_RUNNING": str(args.llm_max_running),
+        "FAKE_EMBED_LATENCY_MS": str(args.embed_latency_ms),
+    })
+    app_env = dict(env)
+    app_env.update({
+        "FLASK_ENV": "dev",
+        "LLM_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "HYDE_LLM_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "EMBEDDING_URL": f"http://127.0.0.1:{embed_port}/embed",
+        "EMBEDDING_WIRE_FORMAT": "binary",
+        "MILVUS_URI_DEV": milvus_uri,
+        "MILVUS_INDEX_PROFILE": "FLAT",
+        "ENABLE_METRICS": "true",
+        "JOB_WORKERS": "0",
+        "JOB_DB_PATH": os.path.join(workdir, "jobs.db"),
+        "ANSWER_CACHE_ENABLED": "true" if args.answer_cache else "false",
+        "ANSWER_CACHE_PATH": os.path.join(workdir, "answers.db"),
+        "COLBERT_STORE_PATH": os.path.join(workdir, "colbert.db"),
+    })
+    for key in ("MILVUS_USERNAME", "MILVUS_PASSWORD", "MILVUS_DB_NAME", "EMBEDDING_CACHE_PATH"):
+        app_env.pop(key, None)
+
+    processes = []
+    try:
+        processes.append(start_process("bench.fake_llm:app", llm_port, env, os.path.join(workdir, "fake_llm.log")))
+        processes.append(start_process("bench.fake_embed:app", embed_port, env, os.path.join(workdir, "fake_embed.log")))
+        wait_healthy(f"http://127.0.0.1:{llm_port}/health", processes[0])
+        wait_healthy(f"http://127.0.0.1:{embed_port}/health", processes[1])
+        processes.append(start_process("runner:asgi_app", app_port, app_env, os.path.join(workdir, "app.log")))
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_healthy(f"{base_url}/health", processes[2])
+
+        results = {}
+        for name in configs:
+            hyde, reranking = CONFIGS[name]
+            print(f"=== {name}: {args.requests} requests at {args.rate}/s ===")
+            for item in trace[:args.warmup]:
+                asyncio.run(replay(base_url, [item], 1000.0, 1, hyde, reranking, args.seed))
+            queue_before = scrape_queue_seconds(base_url)
+            runs, wall = asyncio.run(replay(base_url, trace, args.rate, args.requests, hyde, reranking, args.seed))
+            results[name] = summarize(runs, wall, queue_before, scrape_queue_seconds(base_url))
+            print(json.dumps(results[name], indent=2))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    commit = git_commit()
+    output = args.output or os.path.join(APP_DIR, "bench-results", f"{(commit or 'unknown')[:12]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "settings": {key: value for key, value in vars(args).items() if key not in ("output", "workdir")},
+            "trace_size": len(trace),
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+    print(f"Results written to {output} (logs in {workdir})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Create the `private` and `public` collections in a Milvus Lite file and fill
+them with a synthetic corpus embedded by the fake embedder.
+
+    python -m bench.seed bench-data/milvus.db [--chunks 2000] [--users 20]
+
+Milvus Lite (`pip install "pymilvus[milvus-lite]"`) runs in-process from a
+local file: no Milvus server is needed. It only supports the FLAT/IVF_FLAT/
+AUTOINDEX dense indexes and no server-side model reranker, so reranked
+searches take the WeightedRanker fallback (visible in rerank_fallbacks_total).
+"""
+
+import argparse
+import importlib.util
+import os
+import random
+import uuid
+
+from pymilvus import Collection, connections, utility
+
+from .fake_embed import embed_text
+
+# Same schema and index profiles as scripts/create_db_hybrid.py
+constant_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'main', 'constant')
+
+
+def load_constant(name: str):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(constant_dir, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+TOPICS = {
+    "onboarding": "Karyawan baru mengisi formulir onboarding, menerima laptop dan akun email pada hari pertama.",
+    "leave": "Cuti tahunan diajukan lewat portal HR paling lambat tujuh hari sebelumnya dan disetujui atasan langsung.",
+    "reimbursement": "Klaim reimbursement perjalanan dinas dilampiri kwitansi asli dan diproses dalam sepuluh hari kerja.",
+    "security": "Password harus diganti setiap sembilan puluh hari dan akses VPN wajib memakai autentikasi dua faktor.",
+    "payroll": "Gaji dibayarkan setiap tanggal dua puluh lima, slip gaji tersedia di portal karyawan.",
+    "it_support": "Permintaan bantuan IT dibuat lewat helpdesk, tiket prioritas tinggi ditangani dalam empat jam.",
+    "training": "Setiap karyawan wajib menyelesaikan pelatihan kepatuhan dan keamanan data dalam tiga puluh hari.",
+    "office": "Kantor buka pukul delapan sampai lima, ruang rapat dipesan melalui kalender bersama.",
+}
+
+FILLER = ("sesuai kebijakan perusahaan yang berlaku", "untuk informasi lebih lanjut hubungi tim terkait",
+          "ketentuan ini berlaku untuk seluruh karyawan tetap", "detail prosedur tercantum pada lampiran",
+          "perubahan kebijakan diumumkan melalui email internal")
+
+
+def synthetic_chunks(count: int, users: int, seed: int = 0):
+    """(collection, row) pairs: 1/4 public, the rest private chunks spread over `users` users."""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    for i in range(count):
+        topic = topics[i % len(topics)]
+        text = f"{TOPICS[topic]} {rng.choice(FILLER)}. Bagian {i}."
+        item = embed_text(text)
+        collection = "public" if i % 4 == 0 else "private"
+        yield collection, {
+            "id": str(uuid.uuid4()),
+            "content": text,
+            "vector": item["dense_vecs"].tolist(),
+            "user_id": f"user-{rng.randrange(users)}" if collection == "private" else "public",
+            "document_id": f"{topic}-{i // 50}",
+            "sparse_vector": item["lexical_weights"],
+            "document_name": f"{topic.replace('_', ' ').title()} Handbook.pdf",
+            "page_number": i % 50 + 1,
+        }
+
+
+def seed(uri: str, chunks: int = 2000, users: int = 20, index_profile: str = "FLAT", batch_size: int = 500):
+    schema = load_constant("schema")
+    index = load_constant("index")
+
+    directory = os.path.dirname(uri)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connections.connect(uri=uri)
+    for name in ("private", "public"):
+        if utility.has_collection(name):
+            utility.drop_collection(name)
+
+    collections = {
+        "public": Collection(name="public", schema=schema.build_document_schema()),
+        "private": Collection(name="private", schema=schema.build_document_schema(partition_key=True),
+                              num_partitions=schema.PRIVATE_NUM_PARTITIONS),
+    }
+    for collection in collections.values():
+        collection.create_index("vector", index.get_index_params(index_profile))
+        collection.create_index("sparse_vector", {"index_type": "SPARSE_INVERTED_INDEX", "metric_type": "IP"})
+
+    batches = {"public": [], "private": []}
+    for name, row in synthetic_chunks(chunks, users):
+        batches[name].append(row)
+        if len(batches[name]) >= batch_size:
+            collections[name].insert(batches[name])
+            batches[name] = []
+    for name, rows in batches.items():
+        if rows:
+            collections[name].insert(rows)
+
+    for collection in collections.values():
+        collection.flush()
+        collection.load()
+    print(f"Seeded {chunks} chunks for {users} users into {uri} ({index_profile})")
+    connections.disconnect("default")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a Milvus Lite file with a synthetic corpus")
+    parser.add_argument("uri", help="Milvus Lite file, e.g. bench-data/milvus.db")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--index-profile", default="FLAT", help="FLAT or IVF_FLAT (Milvus Lite)")
+    args = parser.parse_args()
+    seed(args.uri, args.chunks, args.users, args.index_profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -41,29 +41,33 @@
 import unittest
 import uvicorn
 import os
-from asgiref.wsgi import WsgiToAsgi
 
 from app.main import create_app
+from app.main.asgi import create_asgi_app
+from app.main.worker import JOB_WORKER_ENV
 
 # Get environment from FLASK_ENV environment variable, default to 'dev'
 env = os.getenv('FLASK_ENV', 'dev')
-app = create_app(env)
 
-app.app_context().push()
+# Spawned job workers re-import this file before running, and build their own app
+if os.getenv(JOB_WORKER_ENV) != "1":
+    app = create_app(env)
 
-# Wrap Flask WSGI app with ASGI adapter to run with uvicorn (supports async views)
-asgi_app = WsgiToAsgi(app)
+    app.app_context().push()
 
+    # Async front for uvicorn: chat/TTS with admission control, everything else goes
+    # to the Flask app through WsgiToAsgi (supports async views)
+    asgi_app = create_asgi_app(app)
 
-@app.cli.command()
-def test():
-    """Runs the unit tests."""
-    tests = unittest.TestLoader().discover('app/test', pattern='test*.py')
-    result = unittest.TextTestRunner(verbosity=2).run(tests)
+    @app.cli.command()
+    def test():
+        """Runs the unit tests."""
+        tests = unittest.TestLoader().discover('app/test', pattern='test*.py')
+        result = unittest.TextTestRunner(verbosity=2).run(tests)
 
-    if result.wasSuccessful():
-        return 0
-    return 1
+        if result.wasSuccessful():
+            return 0
+        return 1
 
 
 if __name__ == "__main__":
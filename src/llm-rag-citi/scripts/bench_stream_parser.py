@@ -0,0 +1,169 @@
+"""
+Microbenchmark of the chat stream path: <think> tag parsing + SSE framing.
+
+    python scripts/bench_stream_parser.py [--streams tokens.jsonl] [--repeat 5] [--coalesce-ms 30] [--coalesce-bytes 256]
+
+Replays recorded token streams (`--streams`: one JSON list of token strings per
+line, e.g. the `chunk.delta` values logged from an ultrathink answer) or, without
+it, synthetic streams with a long <think> section followed by the answer.
+Compares the old parser, which re-scanned the whole buffer on every token, with
+ThinkTagParser + SSECoalescer from app/main/util/stream.py, reporting µs/token
+and SSE frames sent. The new path is first checked against a reference split of
+the full text (the old parser re-sent earlier thinking text at </think>, so it is
+only timed).
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import time
+
+# Load the stream helpers directly so the app (Milvus, LLM clients, ...) isn't imported
+stream_spec = importlib.util.spec_from_file_location(
+    "stream", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'main', 'util', 'stream.py')
+)
+stream = importlib.util.module_from_spec(stream_spec)
+stream_spec.loader.exec_module(stream)
+
+
+def legacy_parse(tokens, is_thinking=True):
+    """The buffer re-scanning loop generate_chunks used before, kept verbatim as the baseline."""
+    frames = []
+    in_thinking = False
+    thinking_buffer = ""
+    answer_buffer = ""
+    for token in tokens:
+        if not token:
+            continue
+        if not is_thinking:
+            frames.append(stream.sse_event({"answer_token": token}))
+            continue
+        answer_buffer += token
+        if '<think>' in answer_buffer and not in_thinking:
+            before_think = answer_buffer.split('<think>')[0]
+            if before_think:
+                frames.append(stream.sse_event({"answer_token": before_think}))
+            in_thinking = True
+            answer_buffer = answer_buffer.split('<think>', 1)[1]
+        if '</think>' in answer_buffer and in_thinking:
+            parts = answer_buffer.split('</think>', 1)
+            thinking_content = thinking_buffer + parts[0]
+            if thinking_content:
+                frames.append(stream.sse_event({"thinking_token": thinking_content}))
+            thinking_buffer = ""
+            in_thinking = False
+            answer_buffer = parts[1]
+        if in_thinking:
+            if len(answer_buffer) > 50 and '</' not in answer_buffer:
+                frames.append(stream.sse_event({"thinking_token": answer_buffer}))
+                thinking_buffer += answer_buffer
+                answer_buffer = ""
+        elif answer_buffer:
+            if '<' not in answer_buffer[-7:]:
+                frames.append(stream.sse_event({"answer_token": answer_buffer}))
+                answer_buffer = ""
+            elif len(answer_buffer) > 10 and not answer_buffer.endswith(('<', '<t', '<th', '<thi', '<thin', '<think', '<think>')):
+                safe_part = answer_buffer[:-7]
+                if safe_part:
+                    frames.append(stream.sse_event({"answer_token": safe_part}))
+                answer_buffer = answer_buffer[-7:]
+    if answer_buffer:
+        frames.append(stream.sse_event({"thinking_token" if in_thinking else "answer_token": answer_buffer}))
+    return frames
+
+
+def expected_text(tokens):
+    """Reference split of the full text into answer and thinking parts."""
+    text = "".join(tokens)
+    answer, thinking = [], []
+    in_thinking = False
+    while text:
+        tag = "</think>" if in_thinking else "<think>"
+        index = text.find(tag)
+        part = text if index < 0 else text[:index]
+        (thinking if in_thinking else answer).append(part)
+        if index < 0:
+            break
+        text = text[index + len(tag):]
+        in_thinking = not in_thinking
+    return {"answer_token": "".join(answer), "thinking_token": "".join(thinking)}
+
+
+def incremental_parse(tokens, coalesce_ms, coalesce_bytes, is_thinking=True):
+    parser = stream.ThinkTagParser(is_thinking)
+    coalescer = stream.SSECoalescer(coalesce_ms, coalesce_bytes)
+    frames = []
+    for token in tokens:
+        frames.extend(coalescer.add(parser.feed(token)))
+    frames.extend(coalescer.add(parser.flush()))
+    frames.extend(coalescer.flush())
+    return frames
+
+
+def joined_text(frames):
+    text = {"answer_token": "", "thinking_token": ""}
+    for frame in frames:
+        payload = json.loads(frame[len("data: "):])
+        for kind, value in payload.items():
+            text[kind] += value
+    return text
+
+
+def synthetic_streams(count, seed=0):
+    rng = random.Random(seed)
+    words = ["the", "document", "states", "that", "revenue", "grew", "in", "2024", "<", "/", "think", ">", "tabel", "hasil"]
+    streams = []
+    for _ in range(count):
+        thinking = " ".join(rng.choice(words) for _ in range(rng.randint(300, 1500)))
+        answer = " ".join(rng.choice(words) for _ in range(rng.randint(100, 600)))
+        text = f"<think>{thinking}</think>{answer}"
+        tokens, i = [], 0
+        while i < len(text):
+            size = rng.randint(1, 6)
+            tokens.append(text[i:i + size])
+            i += size
+        streams.append(tokens)
+    return streams
+
+
+def load_streams(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def bench(name, parse, streams, repeat):
+    total_tokens = sum(len(tokens) for tokens in streams)
+    best = float("inf")
+    frames = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        frames = sum(len(parse(tokens)) for tokens in streams)
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<28} {best / total_tokens * 1e6:8.2f} µs/token  {frames:8d} frames  ({total_tokens} tokens)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark think-tag parsing and SSE coalescing")
+    parser.add_argument("--streams", help="JSONL file, one list of tokens per line")
+    parser.add_argument("--synthetic", type=int, default=20, help="Synthetic streams when --streams is not given")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--coalesce-ms", type=float, default=30)
+    parser.add_argument("--coalesce-bytes", type=int, default=256)
+    args = parser.parse_args()
+
+    streams = load_streams(args.streams) if args.streams else synthetic_streams(args.synthetic)
+
+    for tokens in streams:
+        assert joined_text(incremental_parse(tokens, args.coalesce_ms, args.coalesce_bytes)) == expected_text(tokens), \
+            "Incremental parser dropped or misplaced text"
+
+    bench("legacy (re-scan)", legacy_parse, streams, args.repeat)
+    bench("incremental, per token", lambda tokens: incremental_parse(tokens, 0, 0), streams, args.repeat)
+    bench(f"incremental, {args.coalesce_ms:g}ms/{args.coalesce_bytes}B",
+          lambda tokens: incremental_parse(tokens, args.coalesce_ms, args.coalesce_bytes), streams, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
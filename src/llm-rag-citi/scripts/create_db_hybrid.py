@@ -1,7 +1,8 @@
 import sys
 import os
+import importlib.util
 from dotenv import load_dotenv, find_dotenv
-from pymilvus import connections, db, utility, Collection, CollectionSchema, FieldSchema, DataType
+from pymilvus import connections, db, utility, Collection
 
 # Load .env from project root (auto-discovery), fallback to project root relative to this script
 env_path = find_dotenv()
@@ -12,7 +13,17 @@ else:
     load_dotenv(os.path.join(base_dir, '..', '.env'))
 
 if len(sys.argv) < 3:
-    raise Exception("Please provide an environment name and a database name, e.g., 'default dev'")
+    raise Exception("Please provide an environment name, a database name and optionally an index profile, e.g., 'default dev HNSW'")
+
+# Index profiles live in the app constants; load the file directly so the app itself isn't imported
+index_spec = importlib.util.spec_from_file_location(
+    "index_profiles", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'main', 'constant', 'index.py')
+)
+index_profiles = importlib.util.module_from_spec(index_spec)
+index_spec.loader.exec_module(index_profiles)
+
+# Profile: 3rd argument, else MILVUS_INDEX_PROFILE (retrieval must use the same one)
+index_profile = (sys.argv[3] if len(sys.argv) > 3 else index_profiles.MILVUS_INDEX_PROFILE).upper()
 
 connections.connect(
     uri=os.getenv('MILVUS_URI_DEV' if sys.argv[1] == 'default' else 'MILVUS_URI_PROD'),
@@ -25,33 +36,28 @@ db_name = sys.argv[2]
 db.create_database(db_name=db_name)
 db.using_database(db_name=db_name)
 
-# create schema with hybrid search support
-id = FieldSchema(name="id", dtype=DataType.VARCHAR, max_length=40, is_primary=True)
-content = FieldSchema(name="content", dtype=DataType.VARCHAR, max_length=4096)
-vector = FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=1024)
-user_id = FieldSchema(name="user_id", dtype=DataType.VARCHAR, max_length=40)
-document_id = FieldSchema(name="document_id", dtype=DataType.VARCHAR, max_length=100)
-sparse_vector = FieldSchema(name="sparse_vector", dtype=DataType.SPARSE_FLOAT_VECTOR)
-document_name_field = FieldSchema(name="document_name", dtype=DataType.VARCHAR, max_length=500)
-page_number_field = FieldSchema(name="page_number", dtype=DataType.INT64)
-
-
-schema = CollectionSchema([
-    id, content, vector, user_id, document_id, sparse_vector, document_name_field, page_number_field
-])
+# create schema with hybrid search support (shared with the migration scripts)
+schema_spec = importlib.util.spec_from_file_location(
+    "document_schema", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'main', 'constant', 'schema.py')
+)
+document_schema = importlib.util.module_from_spec(schema_spec)
+schema_spec.loader.exec_module(document_schema)
 
 # create collections
 public_collection = Collection(
     name="public",
-    schema=schema
+    schema=document_schema.build_document_schema()
 )
+# private is partitioned by user_id, so per-user searches don't scan other users' rows
 private_collection = Collection(
     name="private",
-    schema=schema
+    schema=document_schema.build_document_schema(partition_key=True),
+    num_partitions=document_schema.PRIVATE_NUM_PARTITIONS
 )
 
 # Dense vector index (using IP for hybrid compatibility)
-vector_index = {"index_type": "FLAT", "metric_type": "IP"}
+vector_index = index_profiles.get_index_params(index_profile)
+print(f"Dense vector index profile: {index_profile} {vector_index}")
 
 # Sparse vector index (using IP for hybrid compatibility)
 sparse_index = {"index_type": "SPARSE_INVERTED_INDEX", "metric_type": "IP"}
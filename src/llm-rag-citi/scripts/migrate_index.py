@@ -0,0 +1,237 @@
+"""
+Rebuild the dense `vector` index of a collection with another index profile,
+without taking it offline, and report recall@k against exact (FLAT-equivalent) search.
+
+    python scripts/migrate_index.py default <db_name> <collection> <profile> [--queries questions.txt] [--k 10] [--min-recall 0.95]
+
+The rows are copied into a new collection `<collection>_<profile>_<timestamp>`
+with the same schema and the other indexes, its `vector` index is built with the
+new profile and loaded, and recall is measured on it while the live collection
+keeps serving. Only then is `<collection>` pointed at the copy with
+`utility.alter_alias` (the first run turns the live collection into an alias:
+it is renamed to `<collection>_<old profile>_<timestamp>` and the alias created
+right after, a sub-second gap). The old collection is kept, so a bad index can
+be rolled back by moving the alias back; drop it once the new one is verified.
+
+Stop ingestion (JOB_WORKERS=0, no /document/insert calls) while it runs: the
+switch is aborted unless both collections hold the same number of rows.
+
+Ground truth is computed with NumPy, streaming the stored vectors through
+query_iterator in batches. Query vectors come from `--queries` (one question per
+line, embedded with the BGE-M3 service at EMBEDDING_URL) or, without it, from
+`--sample` randomly chosen stored chunks. `--dry-run` only measures the current
+index. Afterwards set MILVUS_INDEX_PROFILE to the same profile so retrieval uses
+matching search params.
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+
+import httpx
+import numpy as np
+from dotenv import load_dotenv, find_dotenv
+from pymilvus import connections, utility, Collection
+
+# Load .env from project root (auto-discovery), fallback to project root relative to this script
+env_path = find_dotenv()
+if env_path:
+    load_dotenv(env_path)
+else:
+    base_dir = os.path.abspath(os.path.dirname(__file__))
+    load_dotenv(os.path.join(base_dir, '..', '.env'))
+
+# Index profiles live in the app constants; load the file directly so the app itself isn't imported
+index_spec = importlib.util.spec_from_file_location(
+    "index_profiles", os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'main', 'constant', 'index.py')
+)
+index_profiles = importlib.util.module_from_spec(index_spec)
+index_spec.loader.exec_module(index_profiles)
+
+
+def iterate_rows(collection: Collection, fields, batch_size: int):
+    iterator = collection.query_iterator(batch_size=batch_size, expr="", output_fields=fields)
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            yield rows
+    finally:
+        iterator.close()
+
+
+def count_rows(collection: Collection) -> int:
+    return collection.query(expr="", output_fields=["count(*)"], consistency_level="Strong")[0]["count(*)"]
+
+
+def sample_vectors(collection: Collection, size: int, batch_size: int) -> np.ndarray:
+    """Reservoir sample of `size` stored vectors in one pass (only the sample is kept in memory)."""
+    rng = np.random.default_rng(0)
+    sample, seen = [], 0
+    for rows in iterate_rows(collection, ["vector"], batch_size):
+        for row in rows:
+            if len(sample) < size:
+                sample.append(row["vector"])
+            else:
+                slot = rng.integers(0, seen + 1)
+                if slot < size:
+                    sample[slot] = row["vector"]
+            seen += 1
+    return np.asarray(sample, dtype=np.float32)
+
+
+def embed_queries(path: str) -> np.ndarray:
+    with open(path, encoding="utf-8") as f:
+        questions = [line.strip() for line in f if line.strip()]
+    url = f"{os.getenv('EMBEDDING_URL').rstrip('/')}/batch"
+    response = httpx.post(url, json={"contents": questions, "return_sparse": False, "return_colbert_vecs": False}, timeout=300)
+    response.raise_for_status()
+    return np.asarray(response.json()["dense_embeddings"], dtype=np.float32)
+
+
+def exact_top_k(collection: Collection, queries: np.ndarray, k: int, batch_size: int):
+    """Brute-force inner-product top-k, merging a running top-k with one batch of stored vectors at a time."""
+    best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+    best_ids = np.full((len(queries), k), None, dtype=object)
+    for rows in iterate_rows(collection, ["id", "vector"], batch_size):
+        ids = np.asarray([row["id"] for row in rows], dtype=object)
+        scores = queries @ np.asarray([row["vector"] for row in rows], dtype=np.float32).T
+        scores = np.concatenate([best_scores, scores], axis=1)
+        candidates = np.concatenate([best_ids, np.broadcast_to(ids, (len(queries), len(ids)))], axis=1)
+        top = np.argpartition(-scores, kth=k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(scores, top, axis=1)
+        best_ids = np.take_along_axis(candidates, top, axis=1)
+    return [{chunk_id for chunk_id in row if chunk_id is not None} for row in best_ids]
+
+
+def measure(collection: Collection, queries: np.ndarray, exact, k: int, search_params: dict):
+    recalls, latencies = [], []
+    for start in range(0, len(queries), 64):
+        batch = queries[start:start + 64]
+        started = time.perf_counter()
+        results = collection.search(data=batch.tolist(), anns_field="vector", param=search_params, limit=k)
+        latencies.append((time.perf_counter() - started) / len(batch))
+        for hits, truth in zip(results, exact[start:start + 64]):
+            recalls.append(len({hit.id for hit in hits} & truth) / max(len(truth), 1))
+    return {
+        "recall_at_k": float(np.mean(recalls)),
+        "p50_ms_per_query": float(np.percentile(latencies, 50) * 1000),
+    }
+
+
+def resolve_alias(name: str):
+    """The collection behind alias `name`, or None when `name` is a collection itself."""
+    if name in utility.list_collections():
+        return None
+    for collection_name in utility.list_collections():
+        if name in utility.list_aliases(collection_name):
+            return collection_name
+    raise Exception(f"Collection {name} does not exist")
+
+
+def copy_collection(source: Collection, name: str, index_params: dict, batch_size: int) -> Collection:
+    """New collection with the source's schema and indexes (new `vector` index), filled with its rows."""
+    partition_key = any(field.is_partition_key for field in source.schema.fields)
+    target = Collection(
+        name=name, schema=source.schema,
+        **({"num_partitions": len(source.partitions)} if partition_key else {})
+    )
+    for index in source.indexes:
+        if index.field_name != "vector":
+            target.create_index(field_name=index.field_name, index_params=index.params or None, index_name=index.index_name)
+    target.create_index(field_name="vector", index_params=index_params, index_name="vector")
+
+    fields = [field.name for field in source.schema.fields]
+    copied = 0
+    for rows in iterate_rows(source, fields, batch_size):
+        target.insert(data=[{field: row[field] for field in fields} for row in rows])
+        copied += len(rows)
+        print(f"  {copied} rows copied")
+    target.flush()
+    utility.wait_for_index_building_complete(name, index_name="vector")
+    target.load()
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild a collection's dense index on a copy and report recall@k")
+    parser.add_argument("env", help="'default' (MILVUS_URI_DEV) or anything else (MILVUS_URI_PROD)")
+    parser.add_argument("db_name")
+    parser.add_argument("collection")
+    parser.add_argument("profile", choices=sorted(index_profiles.INDEX_PROFILES))
+    parser.add_argument("--queries", help="Text file with one real question per line")
+    parser.add_argument("--sample", type=int, default=200, help="Stored chunks used as queries without --queries")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--min-recall", type=float, default=0.0, help="Keep the alias on the old collection below this recall@k")
+    parser.add_argument("--dry-run", action="store_true", help="Only measure the current index")
+    args = parser.parse_args()
+
+    connections.connect(
+        uri=os.getenv('MILVUS_URI_DEV' if args.env == 'default' else 'MILVUS_URI_PROD'),
+        user=os.getenv('MILVUS_USERNAME'),
+        password=os.getenv('MILVUS_PASSWORD'),
+        db_name=args.db_name,
+    )
+    live_name = resolve_alias(args.collection) or args.collection
+    live = Collection(live_name)
+    live.load()
+    expected = count_rows(live)
+    if expected == 0:
+        raise Exception(f"Collection {args.collection} is empty")
+
+    if args.queries:
+        queries = embed_queries(args.queries)
+    else:
+        queries = sample_vectors(live, args.sample, args.batch_size)
+    print(f"{args.collection} ({live_name}): {expected} vectors, {len(queries)} queries, k={args.k}")
+
+    print("Computing exact top-k...")
+    exact = exact_top_k(live, queries, args.k, args.batch_size)
+
+    current = live.index(index_name="vector").params if live.has_index(index_name="vector") else {}
+    current_profile = current.get("index_type", "FLAT")
+    current_search = index_profiles.get_search_params(current_profile) if current_profile in index_profiles.INDEX_PROFILES else {"metric_type": "IP"}
+    before = measure(live, queries, exact, args.k, current_search)
+    print(f"Current index {current_profile}: {before}")
+
+    if args.dry_run:
+        return
+
+    stamp = int(time.time())
+    copy_name = f"{args.collection}_{args.profile.lower()}_{stamp}"
+    index_params = index_profiles.get_index_params(args.profile)
+    print(f"Building {copy_name} with {args.profile} {index_params} ({args.collection} keeps serving)...")
+    started = time.perf_counter()
+    copy = copy_collection(live, copy_name, index_params, args.batch_size)
+    print(f"Copied, indexed and loaded in {time.perf_counter() - started:.1f}s")
+
+    after = measure(copy, queries, exact, args.k, index_profiles.get_search_params(args.profile))
+    print(f"New index {args.profile}: {after}")
+
+    live_count, copy_count = count_rows(live), count_rows(copy)
+    if live_count != expected or copy_count != live_count:
+        raise Exception(
+            f"Row counts differ ({args.collection} {expected} -> {live_count}, {copy_name} {copy_count}). "
+            f"{args.collection} is untouched; drop {copy_name} and retry with ingestion stopped."
+        )
+    if after["recall_at_k"] < args.min_recall:
+        print(f"Recall below {args.min_recall}: {args.collection} is untouched, inspect or drop {copy_name}")
+        return
+
+    if live_name == args.collection:
+        # First migration: the live collection becomes the alias' first target
+        live_name = f"{args.collection}_{current_profile.lower()}_{stamp}"
+        utility.rename_collection(args.collection, live_name)
+        utility.create_alias(copy_name, args.collection)
+    else:
+        utility.alter_alias(copy_name, args.collection)
+    print(f"Switched: {args.collection} -> {copy_name}, the previous collection is kept as {live_name}")
+    print(f"Roll back with utility.alter_alias('{live_name}', '{args.collection}'), drop {live_name} once the new index is verified")
+    print(f"Set MILVUS_INDEX_PROFILE={args.profile} for the API so retrieval uses the matching search params")
+
+
+if __name__ == "__main__":
+    main()
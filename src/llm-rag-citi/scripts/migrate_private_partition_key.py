@@ -0,0 +1,153 @@
+"""
+Migrate an existing `private` collection to the user_id partition-key schema.
+
+    python scripts/migrate_private_partition_key.py default <db_name> [--drop-old]
+
+Copies every row into a new partition-keyed collection (Milvus routes each row
+to its user's partition on insert), builds the same indexes, then swaps names:
+`private` -> `private_legacy`, new collection -> `private`. Stop ingestion
+(JOB_WORKERS=0, no /document/insert calls) while it runs: the swap is aborted
+unless both collections hold the same rows afterwards (flushed `count(*)` and
+primary-key sets compared).
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+
+from dotenv import load_dotenv, find_dotenv
+from pymilvus import connections, utility, Collection
+
+# Load .env from project root (auto-discovery), fallback to project root relative to this script
+env_path = find_dotenv()
+if env_path:
+    load_dotenv(env_path)
+else:
+    base_dir = os.path.abspath(os.path.dirname(__file__))
+    load_dotenv(os.path.join(base_dir, '..', '.env'))
+
+
+def load_constants(name: str):
+    # Load app constants directly from the file so the app itself isn't imported
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'main', 'constant', f'{name}.py')
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+document_schema = load_constants("schema")
+index_profiles = load_constants("index")
+
+FIELDS = ["id", "content", "vector", "user_id", "document_id", "sparse_vector", "document_name", "page_number"]
+SOURCE = "private"
+TARGET = "private_pk"
+LEGACY = "private_legacy"
+
+
+def count_rows(collection: Collection) -> int:
+    # num_entities includes deleted rows until compaction: ask the query node instead
+    return collection.query(expr="", output_fields=["count(*)"], consistency_level="Strong")[0]["count(*)"]
+
+
+def primary_keys(collection: Collection, batch_size: int) -> set:
+    keys = set()
+    iterator = collection.query_iterator(batch_size=batch_size, expr="", output_fields=["id"])
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            keys.update(row["id"] for row in rows)
+    finally:
+        iterator.close()
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move the private collection to a user_id partition key")
+    parser.add_argument("env", help="'default' (MILVUS_URI_DEV) or anything else (MILVUS_URI_PROD)")
+    parser.add_argument("db_name")
+    parser.add_argument("--profile", default=index_profiles.MILVUS_INDEX_PROFILE, choices=sorted(index_profiles.INDEX_PROFILES))
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--drop-old", action="store_true", help=f"Drop {LEGACY} after the swap")
+    args = parser.parse_args()
+
+    connections.connect(
+        uri=os.getenv('MILVUS_URI_DEV' if args.env == 'default' else 'MILVUS_URI_PROD'),
+        user=os.getenv('MILVUS_USERNAME'),
+        password=os.getenv('MILVUS_PASSWORD'),
+        db_name=args.db_name,
+    )
+
+    source = Collection(SOURCE)
+    if any(field.is_partition_key for field in source.schema.fields):
+        print(f"{SOURCE} already uses a partition key, nothing to do")
+        return
+    if utility.has_collection(TARGET):
+        raise Exception(f"{TARGET} already exists (left over from a failed run?), drop it first")
+    if utility.has_collection(LEGACY):
+        raise Exception(f"{LEGACY} already exists, drop or rename it first")
+
+    source.flush()
+    source.load()
+    expected = count_rows(source)
+
+    target = Collection(
+        name=TARGET,
+        schema=document_schema.build_document_schema(partition_key=True),
+        num_partitions=document_schema.PRIVATE_NUM_PARTITIONS
+    )
+    target.create_index(field_name="id")
+    target.create_index(field_name="vector", index_params=index_profiles.get_index_params(args.profile))
+    target.create_index("sparse_vector", {"index_type": "SPARSE_INVERTED_INDEX", "metric_type": "IP"})
+
+    print(f"Copying {expected} rows from {SOURCE} to {TARGET}...")
+    started = time.perf_counter()
+    copied = 0
+    iterator = source.query_iterator(batch_size=args.batch_size, expr="", output_fields=FIELDS)
+    try:
+        while True:
+            rows = iterator.next()
+            if not rows:
+                break
+            target.insert(data=[{field: row[field] for field in FIELDS} for row in rows])
+            copied += len(rows)
+            print(f"  {copied}/{expected}")
+    finally:
+        iterator.close()
+    target.flush()
+    print(f"Copied {copied} rows in {time.perf_counter() - started:.1f}s")
+
+    source.flush()
+    target.load()
+    source_count, target_count = count_rows(source), count_rows(target)
+    if source_count != expected or target_count != source_count:
+        raise Exception(
+            f"Row counts differ (source {expected} -> {source_count}, target {target_count}, copied {copied}). "
+            f"{SOURCE} is untouched; drop {TARGET} and retry with ingestion stopped."
+        )
+    print("Comparing primary keys...")
+    source_ids, target_ids = primary_keys(source, args.batch_size), primary_keys(target, args.batch_size)
+    if source_ids != target_ids:
+        missing, extra = source_ids - target_ids, target_ids - source_ids
+        raise Exception(
+            f"{len(missing)} ids missing from {TARGET} (e.g. {sorted(missing)[:5]}), "
+            f"{len(extra)} unexpected (e.g. {sorted(extra)[:5]}). "
+            f"{SOURCE} is untouched; drop {TARGET} and retry with ingestion stopped."
+        )
+    print(f"Verified: {target_count} rows, same primary keys in both collections")
+
+    utility.rename_collection(SOURCE, LEGACY)
+    utility.rename_collection(TARGET, SOURCE)
+    print(f"Swapped: {SOURCE} is now partitioned by user_id, the old data is kept as {LEGACY}")
+
+    if args.drop_old:
+        utility.drop_collection(LEGACY)
+        print(f"Dropped {LEGACY}")
+
+
+if __name__ == "__main__":
+    main()
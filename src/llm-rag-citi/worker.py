@@ -0,0 +1,15 @@
+import os
+import sys
+
+from app.main.constant.job import JOB_WORKERS
+from app.main.worker import start_workers
+
+# Get environment from FLASK_ENV environment variable, default to 'dev'
+env = os.getenv('FLASK_ENV', 'dev')
+
+
+if __name__ == "__main__":
+    # Dedicated ingestion workers: run the API with JOB_WORKERS=0 and scale this separately
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else max(JOB_WORKERS, 1)
+    for process in start_workers(env, count):
+        process.join()